@@ -0,0 +1,202 @@
+"""Batch critique jobs for workshops and classes, where dozens of drafts arrive at once.
+
+POST /submit/batch takes the drafts and returns a job ID at once. The job
+plans every draft, retrieves tips for the whole batch in one pass (the
+distinct queries embedded in one call), then critiques the drafts with a
+bounded pool of workers. Each worker takes an LLM scheduler slot in a lane
+of its own job, so a batch shares Ollama fairly with interactive requests
+instead of queueing ahead of them. Results can be polled, or streamed as
+each draft finishes. Once all drafts are done, every draft becomes its own
+conversation and all of them are saved in one transaction.
+
+Jobs live in memory: a restart loses running jobs, and only the last
+BATCH_JOBS_KEPT finished jobs stay available.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from app import models
+from app.database import run_db
+from app.manuscript import ManuscriptCritic, compose_response
+from app.metrics import observe_request
+from app.scheduler import LLM_CONCURRENCY, QueueFull, QueueTimeout
+
+# Drafts accepted per batch
+BATCH_MAX_DRAFTS = int(os.getenv("FORGE_BATCH_MAX_DRAFTS", "200"))
+# Drafts of one batch being critiqued at once
+BATCH_CONCURRENCY = int(os.getenv("FORGE_BATCH_CONCURRENCY", str(LLM_CONCURRENCY)))
+# Finished jobs kept for polling
+BATCH_JOBS_KEPT = int(os.getenv("FORGE_BATCH_JOBS_KEPT", "20"))
+# Seconds a worker waits before asking again for a slot on a full queue
+BUSY_RETRY_SECONDS = 1.0
+
+def save_batch(db, texts, responses):
+    """Save each (draft, critique) as a new conversation, all in one transaction; returns their IDs."""
+    now = datetime.utcnow()
+    conversations = [
+        models.Conversation(title=text[:30] + "...", created_at=now, updated_at=now)
+        for text, response in zip(texts, responses) if response is not None
+    ]
+    db.add_all(conversations)
+    # Assigns the IDs for the messages below
+    db.flush()
+    pairs = [(text, response) for text, response in zip(texts, responses) if response is not None]
+    for conversation, (text, response) in zip(conversations, pairs):
+        db.add_all([
+            models.Message(conversation_id=conversation.id, role="user", content=text, created_at=now),
+            models.Message(conversation_id=conversation.id, role="assistant", content=response, created_at=now),
+        ])
+    db.commit()
+    ids = iter([conversation.id for conversation in conversations])
+    return [next(ids) if response is not None else None for response in responses]
+
+class BatchJob:
+    def __init__(self, texts):
+        self.id = uuid.uuid4().hex
+        self.texts = texts
+        self.status = "queued"
+        self.results = [None] * len(texts)
+        # Indexes of finished drafts, in the order they finished
+        self.finished = []
+        self.failed = 0
+        self.created = time.time()
+        self.started = None
+        self.ended = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def finish_draft(self, index, result):
+        self.results[index] = result
+        self.finished.append(index)
+        if "error" in result:
+            self.failed += 1
+        self.notify()
+
+    async def wait_for_change(self):
+        await self._changed.wait()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def progress(self):
+        elapsed = ((self.ended or time.time()) - self.started) if self.started else 0.0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.texts),
+            "completed": len(self.finished),
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "drafts_per_minute": round(len(self.finished) / elapsed * 60, 1) if elapsed else None,
+        }
+
+    def snapshot(self):
+        """Progress plus the results so far, in draft order."""
+        return dict(self.progress(), results=[result for result in self.results if result is not None])
+
+class BatchJobs:
+    """In-memory registry of batch jobs and the tasks running them."""
+
+    def __init__(self, kept=BATCH_JOBS_KEPT):
+        self.kept = kept
+        self._jobs = OrderedDict()
+        self._tasks = set()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def start(self, job, runner):
+        self._jobs[job.id] = job
+        finished = [job_id for job_id, other in self._jobs.items() if other.done]
+        for job_id in finished[:max(len(finished) - self.kept, 0)]:
+            del self._jobs[job_id]
+        task = asyncio.create_task(runner.run(job))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self):
+        return {"jobs": len(self._jobs), "running": sum(1 for job in self._jobs.values() if job.status == "running")}
+
+class BatchCritic:
+    def __init__(self, planner, librarian, coach, scheduler, fast_path, concurrency=None):
+        self.planner = planner
+        self.librarian = librarian
+        self.coach = coach
+        self.scheduler = scheduler
+        self.fast_path = fast_path
+        self.concurrency = concurrency or BATCH_CONCURRENCY
+
+    async def slot(self, job):
+        """An LLM slot in the job's own lane; a batch waits out a busy queue rather than failing."""
+        while True:
+            try:
+                await self.scheduler.acquire(job.id)
+                return
+            except QueueTimeout:
+                continue
+            except QueueFull:
+                await asyncio.sleep(BUSY_RETRY_SECONDS)
+
+    async def critique(self, job, text, plan, tips):
+        """Returns (response, source)."""
+        if self.coach.is_writing_request(text):
+            return self.coach.refusal_message, "refusal"
+        answer, source = self.fast_path.answer(plan["classification"], text)
+        if answer is not None:
+            return answer, source
+        await self.slot(job)
+        try:
+            if plan["classification"] == "manuscript":
+                summary, sections = await ManuscriptCritic(self.coach, self.librarian, scheduler=self.scheduler).critique(text, plan["dimensions"])
+                return compose_response(summary, sections), "model"
+            # A new conversation: no history or summary yet
+            return await self.coach.chat(text, tips, []), "model"
+        finally:
+            self.scheduler.release()
+
+    async def run(self, job):
+        job.status = "running"
+        job.started = time.time()
+        job.notify()
+        try:
+            plans = [self.planner.plan(text) for text in job.texts]
+            tips = await self.librarian.aretrieve_tips_many([
+                plan["dimensions"] if plan["classification"] == "submission" else []
+                for plan in plans
+            ], job.texts)
+            pending = iter(range(len(job.texts)))
+            responses = [None] * len(job.texts)
+
+            async def worker():
+                for index in pending:
+                    try:
+                        response, source = await self.critique(job, job.texts[index], plans[index], tips[index])
+                    except Exception as e:
+                        job.finish_draft(index, {"index": index, "plan": plans[index], "error": str(e)})
+                        continue
+                    self.fast_path.record(source)
+                    responses[index] = response
+                    job.finish_draft(index, {"index": index, "plan": plans[index], "tips": tips[index],
+                                             "response": response})
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(job.texts)))))
+            conversation_ids = await run_db(save_batch, job.texts, responses)
+            for result, conversation_id in zip(job.results, conversation_ids):
+                result["conversation_id"] = conversation_id
+            job.status = "done"
+        except Exception as e:
+            print(f"Batch job {job.id} failed: {e}")
+            job.status = "failed"
+        finally:
+            job.ended = time.time()
+            observe_request("submit_batch", job.ended - job.started)
+            job.notify()
@@ -1,23 +1,59 @@
-import os
+"""Clean scraped tips and merge them into the guides corpus.
+
+    python -m app.clean_guides [--workers 4] [--prune]
+
+Raw scraper output (data/raw_scraped_data/*.json, or *.jsonl with one
+result per line) is streamed to a process pool: each worker cleans and
+validates a file or a block of lines and computes a MinHash signature for
+every valid tip. The parent drops tips that are near-duplicates of a guide
+already kept, found through locality-sensitive hashing of the signatures
+instead of comparing every pair, and adds the rest to the corpus (appended
+when the corpus is JSONL). With --prune, near-duplicates among the existing
+guides are dropped as well and the corpus is rewritten.
+"""
+import argparse
 import json
+import os
 import re
+import time
+import zlib
 from glob import glob
+from multiprocessing import Pool
+
+import numpy as np
+
+from app.guides import GUIDES_PATH, add_guides, iter_guides, write_guides
 
-data_dir = "data"
-guides_path = os.path.join(data_dir, "guides.json")
-raw_dir = os.path.join(data_dir, "raw_scraped_data")
-raw_files = glob(os.path.join(raw_dir, "*.json"))
+RAW_DIR = os.path.join("data", "raw_scraped_data")
+# Worker processes; defaults to one per CPU
+CLEAN_WORKERS = int(os.getenv("FORGE_CLEAN_WORKERS", "0")) or os.cpu_count()
+# Estimated Jaccard similarity of word trigrams above which two tips count as the same;
+# one changed word in a 30-word tip leaves about 0.8
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("FORGE_NEAR_DUPLICATE_THRESHOLD", "0.7"))
+# Lines of a JSONL file sent to a worker at once
+BATCH_LINES = 500
+# 20 bands of 5 rows: a pair at 0.7 similarity shares a band 97% of the time, one at 0.3 only 5%
+LSH_BANDS = 20
+LSH_ROWS = 5
+NUM_PERM = LSH_BANDS * LSH_ROWS
+# Hash permutations h -> a * h + b mod 2**32 (a odd, so each one is a bijection)
+_PERM_A, _PERM_B = np.random.RandomState(1).randint(0, 2 ** 32, size=(2, NUM_PERM), dtype=np.uint64).astype(np.uint32)
+_PERM_A |= 1
 
 # Generic field names to ignore
 GENERIC = {"query", "answer", "results", "images", "response_time", "request_id", "follow_up_questions", "untitled"}
 
+URL_RE = re.compile(r"https?://\S+")
+SPACE_RE = re.compile(r"\s+")
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
 def clean_text(text):
     # Remove URLs
-    text = re.sub(r"https?://\S+", "", text)
+    text = URL_RE.sub("", text)
     # Remove non-ASCII
     text = text.encode("ascii", errors="ignore").decode()
     # Remove excessive whitespace
-    text = re.sub(r"\s+", " ", text).strip()
+    text = SPACE_RE.sub(" ", text).strip()
     return text
 
 
@@ -40,56 +76,154 @@ def is_valid_tip(tip):
     if title in GENERIC and len(content) < 30:
         return False
     # Filter out generic intros
-    for phrase in GENERIC_PHRASES:
-        if phrase in content:
-            return False
-    # Prefer tips with actionable verbs (not too strict)
-    if not any(verb in content for verb in ACTION_VERBS):
-        if len(content) < 40:
-            return False
+    # (substring scans: at these list sizes CPython's `in` beats a combined regex)
+    if any(phrase in content for phrase in GENERIC_PHRASES):
+        return False
+    # Prefer tips with actionable verbs (not too strict); only short tips need one
+    if len(content) < 40 and not any(verb in content for verb in ACTION_VERBS):
+        return False
     return True
 
-def load_existing_guides():
-    try:
-        with open(guides_path, "r") as f:
-            return json.load(f)
-    except Exception:
-        return []
-
-def main():
-    all_tips = []
-    for raw_file in raw_files:
-        with open(raw_file, "r") as f:
-            data = json.load(f)
-            # If the file has a 'results' array, use it
-            entries = data.get("results") if isinstance(data, dict) and "results" in data else data
-            if not isinstance(entries, list):
-                continue
-            for entry in entries:
-                if isinstance(entry, dict):
-                    title = clean_text(entry.get("title", "Untitled"))
-                    # Prefer 'content', fallback to 'snippet' if present
-                    content = clean_text(entry.get("content", entry.get("snippet", "")))
-                else:
-                    title = "Untitled"
-                    content = clean_text(str(entry))
-                tip = {"title": title, "content": content}
-                if is_valid_tip(tip):
-                    all_tips.append(tip)
-    # Deduplicate by content
+def shingle_hashes(text):
+    """Hashes of the text's word trigrams (its words, for texts under three words)."""
+    words = WORD_RE.findall(text.lower())
+    shingles = {" ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+    # crc32 rather than hash(): signatures must agree across worker processes
+    return [zlib.crc32(s.encode()) for s in shingles]
+
+def minhash_many(texts):
+    """MinHash signatures, one row per text, computed for all texts in one numpy pass."""
+    if not texts:
+        return np.empty((0, NUM_PERM), dtype=np.uint32)
+    per_text = [shingle_hashes(text) for text in texts]
+    starts = np.cumsum([0] + [len(hashes) for hashes in per_text[:-1]])
+    hashes = np.fromiter((h for hashes in per_text for h in hashes), dtype=np.uint32)
+    # uint32 arithmetic wraps, which is the mod 2**32
+    permuted = np.multiply.outer(hashes, _PERM_A)
+    permuted += _PERM_B
+    return np.minimum.reduceat(permuted, starts, axis=0)
+
+def entry_to_tip(entry):
+    if isinstance(entry, dict):
+        title = clean_text(entry.get("title", "Untitled"))
+        # Prefer 'content', fallback to 'snippet' if present
+        content = clean_text(entry.get("content", entry.get("snippet", "")))
+    else:
+        title = "Untitled"
+        content = clean_text(str(entry))
+    return {"title": title, "content": content}
+
+def read_unit(unit):
+    kind, payload = unit
+    if kind == "lines":
+        return [json.loads(line) for line in payload if line.strip()]
+    with open(payload, "r") as f:
+        data = json.load(f)
+    # If the file has a 'results' array, use it
+    entries = data.get("results") if isinstance(data, dict) and "results" in data else data
+    return entries if isinstance(entries, list) else []
+
+def process_unit(unit):
+    """Worker: returns (entries read, [(tip, signature)] for the valid ones)."""
+    entries = read_unit(unit)
+    tips = [tip for tip in map(entry_to_tip, entries) if is_valid_tip(tip)]
+    return len(entries), list(zip(tips, minhash_many([tip["content"] for tip in tips])))
+
+def sign_guides(guides):
+    """Worker: signatures for guides already in the corpus, which are not re-validated."""
+    return list(zip(guides, minhash_many([guide["content"] for guide in guides])))
+
+def iter_units(raw_dir):
+    """Raw files as work units, JSONL files split into blocks of lines."""
+    for path in sorted(glob(os.path.join(raw_dir, "*.json"))):
+        yield ("file", path)
+    for path in sorted(glob(os.path.join(raw_dir, "*.jsonl"))):
+        with open(path, "r") as f:
+            while True:
+                lines = [line for _, line in zip(range(BATCH_LINES), f)]
+                if not lines:
+                    break
+                yield ("lines", lines)
+
+def iter_batches(items, size=BATCH_LINES):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class NearDuplicateIndex:
+    """LSH over MinHash signatures: finds kept tips similar to a new one without comparing all pairs."""
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.min_matches = threshold * NUM_PERM
+        # One table per band, keyed by the band's rows
+        self.buckets = [{} for _ in range(LSH_BANDS)]
+        self.signatures = []
+
+    def add_unless_duplicate(self, signature):
+        """Index the signature and return False, or return True if a similar one is indexed."""
+        raw = signature.tobytes()
+        width = len(raw) // LSH_BANDS
+        keys = [raw[band * width:(band + 1) * width] for band in range(LSH_BANDS)]
+        checked = set()
+        for table, key in zip(self.buckets, keys):
+            for i in table.get(key, ()):
+                if i not in checked:
+                    checked.add(i)
+                    if np.count_nonzero(self.signatures[i] == signature) >= self.min_matches:
+                        return True
+        i = len(self.signatures)
+        self.signatures.append(signature)
+        for table, key in zip(self.buckets, keys):
+            table.setdefault(key, []).append(i)
+        return False
+
+def main(raw_dir=RAW_DIR, guides_path=GUIDES_PATH, workers=CLEAN_WORKERS, prune=False):
+    start = time.perf_counter()
+    index = NearDuplicateIndex()
     seen = set()
-    unique_tips = []
-    for tip in all_tips:
-        if tip["content"] not in seen:
-            unique_tips.append(tip)
-            seen.add(tip["content"])
-    # Merge with existing guides
-    existing = load_existing_guides()
-    existing_contents = set(t["content"] for t in existing)
-    merged = existing + [tip for tip in unique_tips if tip["content"] not in existing_contents]
-    with open(guides_path, "w") as f:
-        json.dump(merged, f, indent=2)
-    print(f"Saved {len(merged)} total tips to {guides_path}")
+    kept_existing, new_tips = [], []
+    existing_count = read = valid = 0
+    with Pool(workers) as pool:
+        # Existing guides go into the index first, so scraped tips are checked against them
+        for batch in pool.imap(sign_guides, iter_batches(iter_guides(guides_path))):
+            for guide, signature in batch:
+                existing_count += 1
+                duplicate = guide["content"] in seen or index.add_unless_duplicate(signature)
+                seen.add(guide["content"])
+                if not (prune and duplicate):
+                    kept_existing.append(guide)
+        for entries, tips in pool.imap(process_unit, iter_units(raw_dir)):
+            read += entries
+            valid += len(tips)
+            for tip, signature in tips:
+                if tip["content"] in seen or index.add_unless_duplicate(signature):
+                    continue
+                seen.add(tip["content"])
+                new_tips.append(tip)
+
+    if prune and len(kept_existing) < existing_count:
+        write_guides(kept_existing + new_tips, guides_path)
+    else:
+        add_guides(new_tips, guides_path)
+    elapsed = time.perf_counter() - start
+    print(f"Read {read} scraped entries: {valid} valid tips, {valid - len(new_tips)} duplicates or "
+          f"near-duplicates, {len(new_tips)} new.")
+    if prune:
+        print(f"Pruned {existing_count - len(kept_existing)} near-duplicates from {existing_count} existing guides.")
+    print(f"Saved {len(kept_existing) + len(new_tips)} total tips to {guides_path} in {elapsed:.2f}s "
+          f"({(read + existing_count) / elapsed:.0f} tips/s, {workers} workers)")
+    return new_tips
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--guides", default=GUIDES_PATH, help="corpus to merge into; a .jsonl path is appended to")
+    parser.add_argument("--workers", type=int, default=CLEAN_WORKERS)
+    parser.add_argument("--prune", action="store_true", help="also drop near-duplicates among the existing guides")
+    args = parser.parse_args()
+    main(args.raw_dir, args.guides, args.workers, args.prune)
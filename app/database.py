@@ -1,23 +1,112 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
 
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/forge.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("FORGE_DATABASE_URL", "sqlite:///./data/forge.db")
+# Threads available for database work issued from async endpoints
+DB_THREADS = int(os.getenv("FORGE_DB_THREADS", "4"))
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# PRAGMAs applied to every new connection. "default" leaves SQLite's own
+# settings (rollback journal, synchronous=FULL). "performance" uses WAL so
+# readers never block the writer, and synchronous=NORMAL, which in WAL mode
+# can only lose the last commits on power loss, never corrupt the database.
+SQLITE_PROFILES = {
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": int(os.getenv("FORGE_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        # Negative values are KiB rather than pages
+        "cache_size": int(os.getenv("FORGE_SQLITE_CACHE_SIZE", "-65536")),
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+SQLITE_PROFILE = os.getenv("FORGE_SQLITE_PROFILE", "performance")
+
+def create_db_engine(url=SQLALCHEMY_DATABASE_URL, profile=SQLITE_PROFILE):
+    pragmas = SQLITE_PROFILES[profile]
+    database = make_url(url).database
+    if not database or database == ":memory:" or "mode=memory" in url:
+        # An in-memory database lives and dies with its connection: every
+        # thread has to share the one connection
+        pool_options = {"poolclass": StaticPool}
+    else:
+        # Every DB thread can hold a connection; the overflow covers sync
+        # endpoints, which run on FastAPI's own thread pool
+        pool_options = {"pool_size": DB_THREADS, "max_overflow": DB_THREADS * 2}
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_options)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="forge-db")
+
+def init_db():
+    """Create missing tables, columns and indexes.
+
+    create_all() skips tables that already exist, so columns and indexes
+    added to the models later are created here one by one; this is the
+    migration path for forge.db files made by older versions. New columns
+    must be nullable (or have a server default) for ADD COLUMN to work.
+    """
+    from app import models  # noqa: F401 - registers the models on Base
+
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # Full-text search over messages and titles, kept current by triggers
+    from app.search import create_search_index
+    with engine.begin() as connection:
+        create_search_index(connection)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+async def run_db(fn, *args):
+    """Run fn(db, *args) with its own session on the DB thread pool, without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, _with_session, fn, *args)
+
+def submit_db(fn, *args):
+    """Fire-and-forget variant of run_db, safe to call from cleanup code that cannot await."""
+    return db_executor.submit(_with_session, fn, *args)
@@ -0,0 +1,160 @@
+"""Content-addressed embedding cache shared by ingestion and serving.
+
+Vectors are stored in SQLite keyed by model name, kind (query or document,
+since some models embed them differently) and a hash of the text, so an
+unchanged guide or a repeated query never goes back to Ollama. Query
+vectors are also kept in an in-memory LRU for the hot query set.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+# Empty keeps the cache in memory only
+EMBED_CACHE_PATH = os.getenv("FORGE_EMBED_CACHE_PATH", "data/embedding_cache.db")
+# Query vectors kept in memory
+EMBED_CACHE_SIZE = int(os.getenv("FORGE_EMBED_CACHE_SIZE", "1024"))
+
+def _pack(vector):
+    return array("f", vector).tobytes()
+
+def _unpack(blob):
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, model_name=None, path=EMBED_CACHE_PATH, memory_size=EMBED_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, "model", type(embeddings).__name__)
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, kind, text):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{digest}"
+
+    def _lookup(self, keys):
+        """Cached vectors for keys, None where missing."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            missing = [key for key in keys if key not in found]
+            # SQLite caps bound parameters per statement, so look up in slices
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, _unpack(blob)) for key, blob in rows)
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return [found.get(key) for key in keys]
+
+    def _store(self, keys, vectors, remember=False):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, _pack(vector)) for key, vector in zip(keys, vectors)],
+            )
+            self._db.commit()
+            if remember:
+                for key, vector in zip(keys, vectors):
+                    self._remember(key, vector)
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _missing(self, texts, cached):
+        # Deduplicate so repeated texts in one call are embedded once
+        return list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+
+    def _merge(self, texts, cached, missing, vectors):
+        computed = dict(zip(missing, vectors))
+        return [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("document", text) for text in texts]
+        cached = self._lookup(keys)
+        missing = self._missing(texts, cached)
+        vectors = self.embeddings.embed_documents(missing) if missing else []
+        if missing:
+            self._store([self._key("document", text) for text in missing], vectors)
+        return self._merge(texts, cached, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        vector = self._lookup([key])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._store([key], [vector], remember=True)
+        else:
+            with self._lock:
+                self._remember(key, vector)
+        return vector
+
+    # Cache reads and writes are blocking SQLite calls, so async callers use a thread
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("document", text) for text in texts]
+        cached = await asyncio.to_thread(self._lookup, keys)
+        missing = self._missing(texts, cached)
+        vectors = await self.embeddings.aembed_documents(missing) if missing else []
+        if missing:
+            await asyncio.to_thread(self._store, [self._key("document", text) for text in missing], vectors)
+        return self._merge(texts, cached, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+        vector = (await asyncio.to_thread(self._lookup, [key]))[0]
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self._store, [key], [vector], True)
+        else:
+            with self._lock:
+                self._remember(key, vector)
+        return vector
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Query vectors for several texts, with the uncached ones embedded in one request.
+
+        Ollama embeds a query exactly like a one-text document batch, so the
+        misses go out as a single embed_documents call and are cached as queries.
+        """
+        keys = [self._key("query", text) for text in texts]
+        cached = await asyncio.to_thread(self._lookup, keys)
+        missing = self._missing(texts, cached)
+        vectors = await self.embeddings.aembed_documents(missing) if missing else []
+        if missing:
+            await asyncio.to_thread(self._store, [self._key("query", text) for text in missing], vectors, True)
+        return self._merge(texts, cached, missing, vectors)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
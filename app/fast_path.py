@@ -0,0 +1,97 @@
+"""Answers for greetings and questions about Forge that skip the LLM.
+
+A bare "hello" or "what can you do?" used to load the conversation history
+and wait for a phi3 generation of several seconds. Their answers do not
+depend on the conversation, so FastPathResponder gives them in
+milliseconds, without history, retrieval or a scheduler slot:
+
+- "templates" (the default): fixed answers per classification;
+- "cache": the first message of a given wording goes to the model as
+  before, and repeats of it reuse that answer from a small LRU;
+- "off": everything goes to the model.
+
+The planner only puts a message in these classes when the whole message is a
+greeting or a question about Forge (see AgentAPlanner), so a draft that
+merely opens with "Hi" still reaches the coach.
+"""
+import os
+import re
+from collections import OrderedDict
+
+from app.metrics import SUBMIT_REPLIES
+
+# "templates", "cache" or "off"
+FAST_PATH_MODE = os.getenv("FORGE_FAST_PATH", "templates")
+# Prior model answers kept in "cache" mode
+FAST_PATH_CACHE_SIZE = int(os.getenv("FORGE_FAST_PATH_CACHE_SIZE", "64"))
+FAST_PATH_CLASSIFICATIONS = ("greeting", "question_about_forge")
+
+TEMPLATES = {
+    "greeting": (
+        "Hello! I'm Forge, your writing coach. Paste a piece of your writing (50 words or more) and "
+        "I'll critique its pacing, dialogue and show-don't-tell, or ask me anything about the craft.\n\n"
+        "What are you working on?"
+    ),
+    "question_about_forge": (
+        "I'm Forge, an AI writing coach. Here's what I can do:\n"
+        "- **Critique your drafts**: paste 50 words or more and I'll look at pacing, dialogue and "
+        "show-don't-tell, with advice from a library of writing guides\n"
+        "- **Critique long manuscripts** section by section\n"
+        "- **Answer questions** about writing techniques, structure and character\n"
+        "- **Brainstorm** ideas for your project with you\n\n"
+        "What I won't do is write for you: my job is to help you improve YOUR writing. "
+        "Would you like to share something you've written?"
+    ),
+}
+
+PUNCTUATION_RE = re.compile(r"[^\w\s']+")
+
+def normalize_question(text):
+    return " ".join(PUNCTUATION_RE.sub(" ", text.lower()).split())
+
+class FastPathResponder:
+    def __init__(self, mode=FAST_PATH_MODE, cache_size=FAST_PATH_CACHE_SIZE, templates=TEMPLATES):
+        self.mode = mode
+        self.cache_size = cache_size
+        self.templates = templates
+        self._answers = OrderedDict()
+        # Replies by source: "model", "template", "answer_cache" or "refusal"
+        self.replies = {}
+
+    def answer(self, classification, text):
+        """Returns (answer, source) for a message the model need not see, else (None, None)."""
+        if self.mode == "off" or classification not in FAST_PATH_CLASSIFICATIONS:
+            return None, None
+        if self.mode == "templates" and classification in self.templates:
+            return self.templates[classification], "template"
+        key = (classification, normalize_question(text))
+        answer = self._answers.get(key)
+        if answer is None:
+            return None, None
+        self._answers.move_to_end(key)
+        return answer, "answer_cache"
+
+    def remember(self, classification, text, answer):
+        """Keep a model answer to a fast-path message for repeats of it ("cache" mode)."""
+        if self.mode != "cache" or classification not in FAST_PATH_CLASSIFICATIONS or not answer:
+            return
+        key = (classification, normalize_question(text))
+        self._answers[key] = answer
+        self._answers.move_to_end(key)
+        while len(self._answers) > self.cache_size:
+            self._answers.popitem(last=False)
+
+    def record(self, source):
+        """Count one reply by where it came from."""
+        self.replies[source] = self.replies.get(source, 0) + 1
+        SUBMIT_REPLIES.inc(1, source)
+
+    def stats(self):
+        total = sum(self.replies.values())
+        without_llm = total - self.replies.get("model", 0)
+        return {
+            "mode": self.mode,
+            "cached_answers": len(self._answers),
+            "replies": dict(self.replies),
+            "without_llm_share": round(without_llm / total, 3) if total else None,
+        }
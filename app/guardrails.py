@@ -0,0 +1,99 @@
+"""Guardrail primitives for the coach: copied-span detection and phrase matching."""
+import re
+from collections import deque
+
+WORD_RE = re.compile(r"\w+")
+# Words per shingle: a copied run must be at least this long to register
+SHINGLE_SIZE = 8
+# Output is a rewrite if it repeats this many consecutive words of the user's text...
+MAX_COPIED_SPAN = 30
+# ...or if this share of its words sit inside copied runs
+MAX_COPIED_FRACTION = 0.5
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+def fingerprint(words, shingle_size=SHINGLE_SIZE):
+    """Hashes of every run of `shingle_size` consecutive words."""
+    # zip over shifted views builds the shingles without a Python-level loop
+    return set(map(hash, zip(*(words[i:] for i in range(shingle_size)))))
+
+class CopyDetector:
+    """Finds runs of output that repeat the user's text word for word.
+
+    The user text is indexed once as a set of shingle hashes; output is fed
+    incrementally (e.g. as streamed chunks) and each new word costs one hash
+    and one set lookup, so a check is linear in the length of both texts.
+    """
+
+    def __init__(self, user_text, shingle_size=SHINGLE_SIZE):
+        self.shingle_size = shingle_size
+        self.fingerprints = fingerprint(tokenize(user_text), shingle_size)
+        self._window = deque(maxlen=shingle_size)
+        self._pending = ""  # Word cut off at the end of the last chunk
+        self._run = 0  # Consecutive matching shingles
+        self._covered_until = 0
+        self.words_seen = 0
+        self.copied_words = 0
+        self.longest_span = 0
+
+    def feed(self, text):
+        text = self._pending + text
+        words = tokenize(text)
+        # A word touching the end of the chunk may continue in the next one
+        if words and WORD_RE.match(text[-1:]):
+            self._pending = words.pop()
+        else:
+            self._pending = ""
+        for word in words:
+            self._add_word(word)
+
+    def finish(self):
+        if self._pending:
+            self._add_word(self._pending)
+            self._pending = ""
+
+    def _add_word(self, word):
+        self._window.append(word)
+        self.words_seen += 1
+        if len(self._window) < self.shingle_size:
+            return
+        if self.fingerprints and hash(tuple(self._window)) in self.fingerprints:
+            self._run += 1
+            self.longest_span = max(self.longest_span, self._run + self.shingle_size - 1)
+            # The shingle covers the last shingle_size words; count only the new ones
+            start = max(self.words_seen - self.shingle_size, self._covered_until)
+            self.copied_words += self.words_seen - start
+            self._covered_until = self.words_seen
+        else:
+            self._run = 0
+
+    def is_rewrite(self, final=True):
+        """Whether the output so far is a rewrite.
+
+        Pass final=False mid-stream: the copied share of a few opening words
+        says little about the whole reply, so only long runs count then.
+        """
+        if self.longest_span >= MAX_COPIED_SPAN:
+            return True
+        if not final or self.words_seen < 2 * self.shingle_size:
+            return False
+        return self.copied_words / self.words_seen >= MAX_COPIED_FRACTION
+
+class PhraseMatcher:
+    """Case-insensitive matcher for a list of phrases, compiled into one regex.
+
+    Phrases only match as whole words, so "write a" does not fire on "write about".
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        # Longest first, so overlapping phrases report the most specific match
+        alternatives = "|".join(re.escape(p) for p in sorted(self.phrases, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+        self.max_length = max((len(p) for p in self.phrases), default=0)
+
+    def search(self, text, start=0):
+        """First matching phrase at or after `start`, or None."""
+        match = self.pattern.search(text, start)
+        return match.group(0).lower() if match else None
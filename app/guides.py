@@ -0,0 +1,51 @@
+"""Reading and writing the writing-guides corpus.
+
+The corpus is a JSON array (data/guides.json) or, for large corpora, JSON
+Lines with one {"title", "content"} object per line. The JSONL form is read
+one line at a time, and new guides are appended to it instead of
+rewriting the whole file.
+"""
+import json
+import os
+
+GUIDES_PATH = os.getenv("FORGE_GUIDES_PATH", "data/guides.json")
+
+def guide_text(item):
+    """The text a guide is searched and shown by."""
+    return f"{item['title']}: {item['content']}"
+
+def is_jsonl(path):
+    return path.endswith(".jsonl")
+
+def iter_guides(path=GUIDES_PATH):
+    """Yield the guides in path; nothing if the file does not exist."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        if not is_jsonl(path):
+            yield from json.load(f)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def add_guides(new_guides, path=GUIDES_PATH):
+    """Add new_guides to the corpus at path."""
+    if is_jsonl(path):
+        with open(path, "a") as f:
+            for guide in new_guides:
+                f.write(json.dumps(guide) + "\n")
+        return
+    write_guides(list(iter_guides(path)) + list(new_guides), path)
+
+def write_guides(guides, path=GUIDES_PATH):
+    """Replace the corpus at path, through a temporary file so a crash never leaves half of it."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        if is_jsonl(path):
+            for guide in guides:
+                f.write(json.dumps(guide) + "\n")
+        else:
+            json.dump(guides, f, indent=2)
+    os.replace(tmp_path, path)
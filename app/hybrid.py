@@ -0,0 +1,142 @@
+"""Hybrid retrieval: tips picked for what the submission says, not only for its dimensions.
+
+Two ranked lists of guides are merged by reciprocal rank fusion (RRF):
+
+- BM25 over the guides, queried with the submission's most distinctive
+  words. The index is built in memory once at startup and needs no Ollama call.
+- Vector search with an excerpt of the submission, which costs one embedding.
+
+Only the embedding depends on Ollama. A request waits at most
+RETRIEVAL_BUDGET seconds for it and goes on with the BM25 list alone if it
+is late. The fused tips are kept while they fit in TIP_TOKEN_BUDGET.
+
+This puts an embedding call back on the /submit hot path, which the cached
+dimension queries had taken off it: every new submission text misses the
+embedding cache, so it adds up to RETRIEVAL_BUDGET seconds (and a call
+competing with generation on Ollama) to each request, in exchange for tips
+that fit the text. FORGE_RETRIEVAL_MODE=dimensions goes back to the cached
+queries and no embedding per request.
+
+The cached results of the fixed dimension queries are not fused: mixed in,
+their generic tips outranked the ones that match the text. They are only
+the fallback when both lists come back empty, which takes a text with no
+word found in the guides whose vector search was also late or failed. Any
+BM25 match, however weak, is used instead, so in practice the fallback is
+rare.
+"""
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from app.guides import GUIDES_PATH, guide_text, iter_guides
+from app.memory import estimate_tokens
+
+# "hybrid" retrieves for the submission text; "dimensions" searches only the fixed dimension queries
+RETRIEVAL_MODE = os.getenv("FORGE_RETRIEVAL_MODE", "hybrid")
+# Seconds a request waits for vector search before using the BM25 results alone
+RETRIEVAL_BUDGET = float(os.getenv("FORGE_RETRIEVAL_BUDGET", "0.3"))
+# Seconds a batch job waits for the one embedding call covering all its drafts; nobody is waiting on it
+BATCH_RETRIEVAL_BUDGET = float(os.getenv("FORGE_BATCH_RETRIEVAL_BUDGET", "60"))
+# Estimated tokens of tips added to a prompt (one tip is about 60)
+TIP_TOKEN_BUDGET = int(os.getenv("FORGE_TIP_TOKEN_BUDGET", "250"))
+
+# Submission words in the BM25 query, and words of the submission embedded for vector search
+LEXICAL_QUERY_TERMS = 48
+EXCERPT_WORDS = 200
+# Ranked results taken from each list, and RRF's rank offset (60 is the usual choice)
+FUSION_DEPTH = 10
+RRF_K = 60
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z]+")
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each even every few for from further had has
+have having he her here hers herself him himself his how i if in into is it its itself just like me more
+most much my myself never no nor not now of off on once one only or other our ours ourselves out over own
+really same she should so some such than that the their theirs them themselves then there these they this
+those through to too under until up upon us very was we were what when where which while who whom why will
+with would you your yours yourself yourselves
+""".split())
+
+def tokenize(text):
+    return [word for word in TOKEN_RE.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+def excerpt(text, words=EXCERPT_WORDS):
+    """The opening of text, short enough for one embedding (mxbai-embed-large reads 512 tokens)."""
+    return " ".join(text.split()[:words])
+
+class BM25Index:
+    """Okapi BM25 over a list of texts, with postings held in memory."""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.lengths = []
+        self.postings = defaultdict(list)
+        for index, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            self.lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                self.postings[term].append((index, count))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0
+        total = len(self.texts)
+        self.idf = {term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for term, docs in self.postings.items()}
+
+    @classmethod
+    def from_guides(cls, path=GUIDES_PATH):
+        # Guides are deduplicated by text, as ingest does by content hash
+        return cls(dict.fromkeys(guide_text(item) for item in iter_guides(path)))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def query_terms(self, text, count=LEXICAL_QUERY_TERMS):
+        """The words of text that say most about it: used there, rare across the guides.
+
+        Repeats count logarithmically, so a character's name said forty
+        times does not crowd out the rest of the query.
+        """
+        counts = Counter(term for term in tokenize(text) if term in self.idf)
+        return sorted(counts, key=lambda term: (1 + math.log(counts[term])) * self.idf[term], reverse=True)[:count]
+
+    def search(self, terms, k=FUSION_DEPTH):
+        """Texts of the k best matches for terms, best first."""
+        scores = defaultdict(float)
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, count in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[index] / self.average_length)
+                scores[index] += idf * count * (BM25_K1 + 1) / (count + norm)
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [self.texts[index] for index in best]
+
+def build_lexical_index(path=GUIDES_PATH):
+    """The BM25 index over the guides, or None in "dimensions" mode or without a corpus."""
+    if RETRIEVAL_MODE != "hybrid":
+        return None
+    index = BM25Index.from_guides(path)
+    return index if len(index) else None
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K):
+    """Merge ranked lists of texts; a text scores 1 / (k + rank) in each list it appears in."""
+    scores = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, text in enumerate(ranked, start=1):
+            scores[text] += 1 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def within_token_budget(tips, budget=TIP_TOKEN_BUDGET):
+    """The leading tips whose estimated tokens fit in budget; always at least one."""
+    kept, used = [], 0
+    for tip in tips:
+        tokens = estimate_tokens(tip)
+        if kept and used + tokens > budget:
+            break
+        kept.append(tip)
+        used += tokens
+    return kept
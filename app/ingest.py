@@ -1,42 +1,97 @@
+import asyncio
+import hashlib
 import json
 import os
+import time
 from langchain_community.vectorstores import Chroma
-from langchain_ollama.embeddings import OllamaEmbeddings
 from langchain_core.documents import Document
+from app.guides import GUIDES_PATH, guide_text, iter_guides
+from app.rag import DB_PATH, bump_store_version, get_embeddings
+from app.vector_index import INDEX_PATH, write_index
 
-DATA_PATH = "data/guides.json"
-DB_PATH = "data/chroma_db"
+# Texts per embedding request, and embedding requests in flight at once
+EMBED_BATCH_SIZE = int(os.getenv("FORGE_EMBED_BATCH_SIZE", "32"))
+EMBED_CONCURRENCY = int(os.getenv("FORGE_EMBED_CONCURRENCY", "4"))
+
+def guide_to_document(item):
+    return Document(
+        page_content=guide_text(item),
+        metadata={"title": item['title']}
+    )
+
+def document_id(doc):
+    # Content hash: unchanged guides keep their ID, edited guides get a new one
+    payload = json.dumps([doc.page_content, doc.metadata], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def embed_in_batches(embeddings, texts, batch_size=EMBED_BATCH_SIZE, concurrency=EMBED_CONCURRENCY):
+    """Embed texts in batches, with up to `concurrency` batches in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed_batch(batch):
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
 
 def ingest():
-    if not os.path.exists(DATA_PATH):
-        print(f"Data file not found at {DATA_PATH}")
+    if not os.path.exists(GUIDES_PATH):
+        print(f"Data file not found at {GUIDES_PATH}")
         return
 
+    start = time.perf_counter()
     print("Loading data...")
-    with open(DATA_PATH, "r") as f:
-        data = json.load(f)
-
-    documents = []
-    for item in data:
-        doc = Document(
-            page_content=f"{item['title']}: {item['content']}",
-            metadata={"title": item['title']}
-        )
-        documents.append(doc)
+    # Identical guides collapse onto one ID
+    documents = {}
+    for item in iter_guides(GUIDES_PATH):
+        doc = guide_to_document(item)
+        documents[document_id(doc)] = doc
 
-    print(f"Loaded {len(documents)} documents.")
+    print(f"Loaded {len(documents)} unique documents.")
 
     print("Initializing embeddings...")
-    embeddings = OllamaEmbeddings(model="mxbai-embed-large")
+    embeddings = get_embeddings()
 
-    print("Creating/Updating Vector Store...")
-    vectorstore = Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        persist_directory=DB_PATH
-    )
-    
-    print("Ingestion complete!")
+    vectorstore = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
+    existing_ids = set(vectorstore.get(include=[])["ids"])
+
+    new_ids = [doc_id for doc_id in documents if doc_id not in existing_ids]
+    stale_ids = [doc_id for doc_id in existing_ids if doc_id not in documents]
+    print(f"{len(new_ids)} new or changed, {len(stale_ids)} removed, "
+          f"{len(existing_ids) - len(stale_ids)} unchanged.")
+
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+
+    if new_ids:
+        print(f"Embedding {len(new_ids)} documents "
+              f"(batch size {EMBED_BATCH_SIZE}, concurrency {EMBED_CONCURRENCY})...")
+        new_docs = [documents[doc_id] for doc_id in new_ids]
+        # Fills the embedding cache; add_texts below then embeds from it without calling Ollama
+        asyncio.run(embed_in_batches(embeddings, [doc.page_content for doc in new_docs]))
+        for i in range(0, len(new_ids), EMBED_BATCH_SIZE):
+            batch = slice(i, i + EMBED_BATCH_SIZE)
+            vectorstore.add_texts(
+                [doc.page_content for doc in new_docs[batch]],
+                metadatas=[doc.metadata for doc in new_docs[batch]],
+                ids=new_ids[batch],
+            )
+
+    if new_ids or stale_ids or not os.path.exists(INDEX_PATH):
+        # Export the whole collection for the in-process numpy backend
+        stored = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        write_index(stored["embeddings"], stored["documents"], stored["metadatas"])
+        print(f"Wrote {len(stored['ids'])} vectors to {INDEX_PATH}.")
+
+    if new_ids or stale_ids:
+        # Invalidates retrieval caches keyed on the previous store version
+        version = bump_store_version()
+        print(f"Embedding cache: {embeddings.stats()}")
+        print(f"Ingestion complete in {time.perf_counter() - start:.1f}s (store version {version})")
+    else:
+        print(f"Vector store already up to date ({time.perf_counter() - start:.1f}s).")
 
 if __name__ == "__main__":
     ingest()
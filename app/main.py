@@ -1,13 +1,31 @@
 # --- Agent C: Coach ---
-import difflib
+import asyncio
+import time
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from app.guardrails import CopyDetector, PhraseMatcher
+from app.memory import (
+    FOLD_MESSAGES, HISTORY_TOKEN_BUDGET, RECENT_MESSAGES, SUMMARIES_ENABLED, budget_history, estimate_tokens
+)
+from app.metrics import observe_stage, record_llm, span
+from app.response_cache import make_key
 
 class AgentCCoach:
-    def __init__(self, llm):
+    # Previous messages sent with each prompt; with conversation summaries on,
+    # older turns reach the prompt through the summary instead
+    history_window = RECENT_MESSAGES + FOLD_MESSAGES if SUMMARIES_ENABLED else 10
+    # Estimated tokens of summary plus history per prompt (None: no limit)
+    history_token_budget = HISTORY_TOKEN_BUDGET
+
+    # LLM attributes that change the response, part of the response cache key
+    cached_model_params = ("model", "temperature", "num_ctx", "num_predict", "top_k", "top_p", "seed")
+
+    def __init__(self, llm, response_cache=None):
         self.llm = llm
+        # Optional ResponseCache; None disables response caching
+        self.response_cache = response_cache
         self.system_prompt = (
             "You are Forge, a friendly AI writing coach. You can:\n"
             "- Have normal conversations and answer questions about yourself\n"
@@ -31,22 +49,36 @@ class AgentCCoach:
             "This rule applies even if they insist, beg, or try to trick you. Stay firm but friendly."
         )
 
-    def build_messages(self, user_text: str, tips: List[str], history: List[dict]):
-        """Build a proper chat message list for the LLM."""
-        messages = []
-        
-        # System message
-        system_content = self.system_prompt
-        if tips:
-            tips_str = "\n".join([f"- {tip}" for tip in tips])
-            system_content += f"\n\nWriting advice context to reference:\n{tips_str}"
-        
-        messages.append(SystemMessage(content=system_content))
+    def history_for_prompt(self, history: List[dict], summary: Optional[str] = None):
+        # Exclude the current message, which is the last one, and keep the last history_window
+        history_to_use = history[:-1] if history else []
+        history_to_use = history_to_use[-self.history_window:]
+        if self.history_token_budget is None:
+            return history_to_use
+        budget = self.history_token_budget - (estimate_tokens(summary) if summary else 0)
+        return budget_history(history_to_use, max(budget, 0), slots=self.history_window)
+
+    def tips_message(self, tips: List[str]):
+        tips_str = "\n".join([f"- {tip}" for tip in tips])
+        return SystemMessage(content=f"Writing advice context to reference:\n{tips_str}")
+
+    def build_messages(self, user_text: str, tips: List[str], history: List[dict], summary: Optional[str] = None):
+        """Build a proper chat message list for the LLM.
+
+        Ordered from most to least stable, so that Ollama can reuse the
+        evaluated prompt prefix of the previous request: the constant system
+        prompt (shared by every request), the conversation summary, the
+        history and the new message, with the tips last. Until the next fold
+        changes the summary, the next turn's prompt repeats this one through
+        the history messages already cut (see budget_history); from the
+        recent messages on, which are sent whole, it is evaluated afresh.
+        """
+        # Kept byte-identical across requests: nothing is ever appended to it
+        messages = [SystemMessage(content=self.system_prompt)]
+        if summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
         
-        # Add conversation history (exclude the current message which is the last one)
-        # Take last 10 messages for context (5 exchanges)
-        history_to_use = history[:-1] if history else []  # Exclude current message
-        for msg in history_to_use[-10:]:
+        for msg in self.history_for_prompt(history, summary):
             if msg['role'] == 'user':
                 messages.append(HumanMessage(content=msg['content']))
             elif msg['role'] == 'assistant':
@@ -54,83 +86,213 @@ class AgentCCoach:
         
         # Add current user message
         messages.append(HumanMessage(content=user_text))
+        if tips:
+            messages.append(self.tips_message(tips))
         
         return messages
 
+    # Phrases that mark a response as a story/creative writing
+    story_indicators = [
+        "once upon a time",
+        "there lived",
+        "one day,",
+        "long ago,",
+        "in a land",
+        "the end.",
+        "chapter 1",
+        "chapter one",
+    ]
+    story_matcher = PhraseMatcher(story_indicators)
+
+    # Phrases that mark a request for the coach to write something
+    request_patterns = [
+        "write me", "write a", "write an", "write for me",
+        "create a story", "create a poem", "create a narrative",
+        "give me a story", "tell me a story",
+        "make up a", "compose a", "draft a",
+        "can you write", "could you write", "would you write",
+        "i want you to write", "please write",
+    ]
+    request_matcher = PhraseMatcher(request_patterns)
+
+    def is_rewrite(self, user_text, output):
+        # Block if output repeats long contiguous runs of the user's text
+        detector = CopyDetector(user_text)
+        detector.feed(output)
+        detector.finish()
+        return detector.is_rewrite()
+
+    def is_story(self, output, start=0):
+        return self.story_matcher.search(output, start) is not None
+
     def check_guardrails(self, user_text, output):
-        # Block if output contains large contiguous blocks of user text (>50% similarity)
-        seq = difflib.SequenceMatcher(None, user_text, output)
-        if seq.quick_ratio() > 0.5:
+        if self.is_rewrite(user_text, output):
             return False, "rewrite"
         
         # Check if response looks like a story/creative writing
-        story_indicators = [
-            "once upon a time",
-            "there lived",
-            "one day,",
-            "long ago,",
-            "in a land",
-            "the end.",
-            "chapter 1",
-            "chapter one",
-        ]
-        output_lower = output.lower()
-        for indicator in story_indicators:
-            if indicator in output_lower:
-                return False, "story"
+        if self.is_story(output):
+            return False, "story"
         
         return True, None
 
+    def violation_message(self, violation_type):
+        """Replacement text shown when a guardrail blocks the output."""
+        if violation_type == "rewrite":
+            return "[Blocked: Output too similar to user text. Rewrite attempt detected.]"
+        return (
+            "I noticed I was about to generate creative content, which isn't my role. "
+            "As your writing coach, I'm here to help improve YOUR writing, not write for you.\n\n"
+            "How can I help you with your own writing project today?"
+        )
+
     def is_writing_request(self, user_text: str) -> bool:
         """Check if user is asking for creative writing."""
-        request_patterns = [
-            "write me", "write a", "write an", "write for me",
-            "create a story", "create a poem", "create a narrative",
-            "give me a story", "tell me a story",
-            "make up a", "compose a", "draft a",
-            "can you write", "could you write", "would you write",
-            "i want you to write", "please write",
-        ]
-        user_lower = user_text.lower()
-        return any(pattern in user_lower for pattern in request_patterns)
+        return self.request_matcher.search(user_text) is not None
 
-    async def chat(self, user_text: str, tips: List[str], history: List[dict]):
+    refusal_message = (
+        "I appreciate your interest, but as your writing coach, I can't write stories, "
+        "poems, or other creative content for you. My role is to help you become a better "
+        "writer by critiquing YOUR work and offering guidance.\n\n"
+        "Here's what I can do instead:\n"
+        "- **Brainstorm ideas** with you for your story\n"
+        "- **Critique your drafts** and provide feedback\n"
+        "- **Answer questions** about writing techniques\n"
+        "- **Offer advice** on plot, character development, dialogue, etc.\n\n"
+        "Would you like to share something you've written, or discuss ideas for your project?"
+    )
+
+    def cache_key(self, user_text: str, tips: List[str], history: List[dict], summary: Optional[str] = None):
+        params = {name: getattr(self.llm, name, None) for name in self.cached_model_params}
+        params["system_prompt"] = self.system_prompt
+        params["summary"] = summary
+        return make_key(user_text, tips, self.history_for_prompt(history, summary), params)
+
+    async def cached_response(self, user_text: str, tips: List[str], history: List[dict], summary: Optional[str] = None):
+        """Returns (cache key, cached response); both None when caching is off."""
+        if self.response_cache is None:
+            return None, None
+        key = self.cache_key(user_text, tips, history, summary)
+        return key, await self.response_cache.aget(key)
+
+    async def chat(self, user_text: str, tips: List[str], history: List[dict], summary: Optional[str] = None):
         # Pre-check: If user is asking for creative writing, refuse immediately
         if self.is_writing_request(user_text):
-            return (
-                "I appreciate your interest, but as your writing coach, I can't write stories, "
-                "poems, or other creative content for you. My role is to help you become a better "
-                "writer by critiquing YOUR work and offering guidance.\n\n"
-                "Here's what I can do instead:\n"
-                "- **Brainstorm ideas** with you for your story\n"
-                "- **Critique your drafts** and provide feedback\n"
-                "- **Answer questions** about writing techniques\n"
-                "- **Offer advice** on plot, character development, dialogue, etc.\n\n"
-                "Would you like to share something you've written, or discuss ideas for your project?"
-            )
+            return self.refusal_message
+
+        key, cached = await self.cached_response(user_text, tips, history, summary)
+        if cached is not None:
+            return cached
         
-        messages = self.build_messages(user_text, tips, history)
-        response = await self.llm.ainvoke(messages)
-        response_text = response.content if hasattr(response, 'content') else str(response)
+        messages = self.build_messages(user_text, tips, history, summary)
+        response_text = await self.invoke(messages)
         
         # Post-check guardrails
-        passed, violation_type = self.check_guardrails(user_text, response_text)
+        with span("guardrails"):
+            passed, violation_type = self.check_guardrails(user_text, response_text)
         if not passed:
-            if violation_type == "rewrite":
-                return "[Blocked: Output too similar to user text. Rewrite attempt detected.]"
-            elif violation_type == "story":
-                return (
-                    "I noticed I was about to generate creative content, which isn't my role. "
-                    "As your writing coach, I'm here to help improve YOUR writing, not write for you.\n\n"
-                    "How can I help you with your own writing project today?"
-                )
+            return self.violation_message(violation_type)
+
+        if key is not None:
+            await self.response_cache.aput(key, response_text)
         
         return response_text
 
+    async def invoke(self, messages):
+        """One LLM call, timed and with Ollama's token counts recorded."""
+        with span("generate"):
+            response = await self.llm.ainvoke(messages)
+        record_llm(getattr(response, "response_metadata", None))
+        return response.content if hasattr(response, 'content') else str(response)
+
+    async def stream_messages(self, user_text: str, messages):
+        """Stream the reply to `messages` as events: {"type": "token"} chunks, or one {"type": "blocked"}.
+
+        Guardrails check the output against `user_text` as it streams.
+        """
+        guard = StreamingGuardrail(self, user_text)
+        stream = self.llm.astream(messages)
+        started = time.perf_counter()
+        waiting = True
+        try:
+            with span("generate"):
+                async for chunk in stream:
+                    # Ollama's final chunk carries the token counts and durations
+                    record_llm(getattr(chunk, "response_metadata", None))
+                    text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                    if not text:
+                        continue
+                    if waiting:
+                        observe_stage("first_token", started)
+                        waiting = False
+                    passed, violation_type = guard.feed(text)
+                    if not passed:
+                        yield {"type": "blocked", "violation": violation_type,
+                               "content": self.violation_message(violation_type)}
+                        return
+                    yield {"type": "token", "content": text}
+            passed, violation_type = guard.finish()
+            if not passed:
+                yield {"type": "blocked", "violation": violation_type,
+                       "content": self.violation_message(violation_type)}
+        finally:
+            # Closing the stream aborts the Ollama request if we stopped early
+            await stream.aclose()
+
+    async def stream_chat(self, user_text: str, tips: List[str], history: List[dict], summary: Optional[str] = None):
+        """Streaming form of chat(), with the events of stream_messages()."""
+        if self.is_writing_request(user_text):
+            yield {"type": "token", "content": self.refusal_message}
+            return
+
+        key, cached = await self.cached_response(user_text, tips, history, summary)
+        if cached is not None:
+            yield {"type": "token", "content": cached, "cached": True}
+            return
+
+        parts = []
+        async for item in self.stream_messages(user_text, self.build_messages(user_text, tips, history, summary)):
+            if item["type"] == "blocked":
+                key = None
+            else:
+                parts.append(item["content"])
+            yield item
+        if key is not None:
+            await self.response_cache.aput(key, "".join(parts))
+
+class StreamingGuardrail:
+    """Incremental form of AgentCCoach.check_guardrails for streamed output."""
+
+    def __init__(self, coach, user_text):
+        self.coach = coach
+        self.output = ""
+        self.copies = CopyDetector(user_text)
+
+    def feed(self, chunk):
+        start = max(0, len(self.output) - self.coach.story_matcher.max_length)
+        self.output += chunk
+        # Only the tail can hold an indicator that was not there before
+        if self.coach.is_story(self.output, start):
+            return False, "story"
+        self.copies.feed(chunk)
+        if self.copies.is_rewrite(final=False):
+            return False, "rewrite"
+        return True, None
+
+    def finish(self):
+        self.copies.finish()
+        if self.copies.is_rewrite():
+            return False, "rewrite"
+        return True, None
+
 # --- Agent B: Librarian ---
 class AgentBLibrarian:
-    def __init__(self, retriever):
+    def __init__(self, retriever, cache=None, lexical=None):
         self.retriever = retriever
+        self.cache = cache if cache is not None else RetrievalCache()
+        # BM25 index over the guides; None retrieves for the dimensions only (see app/hybrid.py)
+        self.lexical = lexical
+        self.late_searches = 0
+        self.failed_searches = 0
 
     def dimension_to_query(self, dimension):
         # Map critique dimension to conceptual search query
@@ -141,27 +303,148 @@ class AgentBLibrarian:
         }
         return mapping.get(dimension, f"writing advice about {dimension}")
 
+    def search(self, query):
+        # Dimension queries are constant, so their results only change when the store does
+        docs = self.cache.get(query)
+        if docs is None:
+            docs = self.retriever.invoke(query)
+            self.cache.put(query, docs)
+        return docs
+
+    async def asearch(self, query):
+        docs = self.cache.get(query)
+        if docs is None:
+            with span("vector_search"):
+                docs = await self.retriever.ainvoke(query)
+            self.cache.put(query, docs)
+        return docs
+
+    async def warm(self, dimensions):
+        """Precompute results for the fixed dimension queries."""
+        await self.aretrieve_tips(dimensions)
+
     def retrieve_tips(self, dimensions):
         tips = []
         for dim in dimensions:
             query = self.dimension_to_query(dim)
-            docs = self.retriever.invoke(query)
+            docs = self.search(query)
             for doc in docs[:1]:  # Only take top result per dimension for brevity
                 tips.append(doc.page_content)
         return tips
 
+    async def aretrieve_tips(self, dimensions, text=None):
+        """Async retrieve_tips: all dimensions are searched concurrently.
+
+        Given the submission `text` and a lexical index, the tips are
+        retrieved for the text instead (see app/hybrid.py); the dimension
+        tips are only the fallback when neither BM25 nor vector search
+        returns anything for it.
+        """
+        if text is not None and self.lexical is not None and dimensions:
+            tips = self.fuse(text, await self.within_budget(self.vector_search(excerpt(text))))
+            if tips:
+                return tips
+        queries = [self.dimension_to_query(dim) for dim in dimensions]
+        results = await asyncio.gather(*(self.asearch(query) for query in queries))
+        return [doc.page_content for docs in results for doc in docs[:1]]
+
+    async def vector_search(self, query):
+        # Uncached: submission excerpts are rarely searched twice
+        with span("vector_search"):
+            return await self.retriever.ainvoke(query)
+
+    async def within_budget(self, search, budget=None):
+        """The result of search, or None if it fails or takes longer than `budget` seconds (RETRIEVAL_BUDGET by default)."""
+        try:
+            # Looked up at call time: app.hybrid is imported below the agents
+            return await asyncio.wait_for(search, RETRIEVAL_BUDGET if budget is None else budget)
+        except asyncio.TimeoutError:
+            self.late_searches += 1
+        except Exception as e:
+            # The lexical results still give tips while Ollama is failing
+            self.failed_searches += 1
+            print(f"Vector search failed: {e}")
+        return None
+
+    def fuse(self, text, vector_docs):
+        """Tips for text: its BM25 matches and vector search results merged by RRF, within the token budget."""
+        with span("lexical_search"):
+            lexical = self.lexical.search(self.lexical.query_terms(text))
+        vector = [doc.page_content for doc in vector_docs or []]
+        return within_token_budget(reciprocal_rank_fusion([lexical, vector]))
+
+    def stats(self):
+        return {
+            "mode": "hybrid" if self.lexical is not None else "dimensions",
+            "lexical_documents": len(self.lexical) if self.lexical is not None else 0,
+            "budget_seconds": RETRIEVAL_BUDGET,
+            # Submissions that went on without vector results
+            "late_searches": self.late_searches,
+            "failed_searches": self.failed_searches,
+        }
+
+    async def aretrieve_tips_many(self, dimension_lists, texts=None):
+        """aretrieve_tips for several submissions at once.
+
+        The distinct queries not in the cache are searched together, with
+        their embeddings requested in one call; so are the excerpts of
+        `texts` in hybrid mode, within BATCH_RETRIEVAL_BUDGET rather than the
+        interactive budget.
+        """
+        queries = {query: None for dims in dimension_lists for query in map(self.dimension_to_query, dims)}
+        for query in queries:
+            queries[query] = self.cache.get(query)
+        missing = [query for query, docs in queries.items() if docs is None]
+        if missing:
+            with span("vector_search"):
+                found = await abatch_retrieve(self.retriever, missing)
+            for query, docs in zip(missing, found):
+                self.cache.put(query, docs)
+                queries[query] = docs
+        tips = [
+            [doc.page_content for dim in dims for doc in queries[self.dimension_to_query(dim)][:1]]
+            for dims in dimension_lists
+        ]
+        if texts is not None and self.lexical is not None:
+            hybrid = [index for index, dims in enumerate(dimension_lists) if dims]
+            if not hybrid:
+                return tips
+            found = await self.within_budget(abatch_retrieve(self.retriever, [excerpt(texts[i]) for i in hybrid]),
+                                             BATCH_RETRIEVAL_BUDGET)
+            for index, vector_docs in zip(hybrid, found or [None] * len(hybrid)):
+                tips[index] = self.fuse(texts[index], vector_docs) or tips[index]
+        return tips
+
+from contextlib import asynccontextmanager, nullcontext
 from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from app.rag import get_rag_chain, Chroma, ChatOllama
-from app.database import engine, Base, get_db
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, selectinload
+from app.rag import RetrievalCache, abatch_retrieve, chat_model_options, embedding_cache_stats, get_chat_model, get_retriever, CHAT_MODEL, EMBED_MODEL, OLLAMA_KEEP_ALIVE
+from app.ollama_pool import chat_pool, embed_pool, pools
+from app.search import search
+from app.hybrid import BATCH_RETRIEVAL_BUDGET, RETRIEVAL_BUDGET, build_lexical_index, excerpt, reciprocal_rank_fusion, within_token_budget
+from app.database import init_db, get_db, run_db, submit_db
+from app.response_cache import ResponseCache, RESPONSE_CACHE_ENABLED
+from app.manuscript import ManuscriptCritic, MANUSCRIPT_MIN_WORDS, compose_response
+from app.metrics import METRICS_ENABLED, observe_request, render_metrics, start_request_timings
+from app.scheduler import ClientDisconnected, InflightRequests, LLMScheduler, QueueFull, QueueTimeout
+from app.memory import ConversationMemory
+from app.fast_path import FastPathResponder, normalize_question
+from app.batch import BATCH_MAX_DRAFTS, BatchCritic, BatchJob, BatchJobs
 from app import models
 import uvicorn
+import json
+import os
 import re
+import time
+
+# Reference point for the cold start figures reported by /health
+PROCESS_START = time.perf_counter()
 
-# Initialize Database
-models.Base.metadata.create_all(bind=engine)
+# Initialize Database (also adds indexes missing from older forge.db files)
+init_db()
 
 # --- Agent A: Planner ---
 class AgentAPlanner:
@@ -169,16 +452,38 @@ class AgentAPlanner:
         # Dimensions for critique
         self.dimensions = ["Pacing", "Dialogue", "Show-Don't-Tell"]
 
+    # Matched against the whole message, lowercased with punctuation removed
+    # (normalize_question): "hi" must be the message, not a substring of
+    # "this", and "Hi, can you look at my opening?" is a conversation. These
+    # classes are answered from templates (app/fast_path.py), so they only
+    # take messages that are nothing but a greeting or a question about Forge.
+    greeting_pattern = (
+        r"(?:hi|hello|hey|hiya|howdy|greetings|good (?:morning|afternoon|evening))"
+        r"(?: there| forge| again| everyone| all)*(?: how are you(?: doing)?(?: today)?)?"
+    )
+    greeting_re = re.compile(greeting_pattern)
+    forge_question_re = re.compile(
+        rf"(?:{greeting_pattern} )?(?:forge )?(?:"
+        r"who are you|what are you|who is forge|what is forge|what's forge|what is this|"
+        r"what (?:do|can) you do|what can you help(?: me)? with|how (?:can|do) you help(?: me)?|"
+        r"how does (?:forge|this|it) work|tell me about (?:yourself|forge)|"
+        r"are you (?:an ai|a bot|a robot|a person|human|real)"
+        r")(?: forge)?"
+    )
+
     def classify(self, text: str):
         word_count = len(re.findall(r'\w+', text))
         
         # Simple heuristic for now, can be improved with LLM classification
+        if word_count >= MANUSCRIPT_MIN_WORDS:
+            # Too long for one prompt: critiqued chunk by chunk
+            return {"type": "manuscript", "dimensions": self.dimensions}
         if word_count < 50:
-            lower_text = text.lower()
-            if any(greeting in lower_text for greeting in ["hello", "hi", "hey", "greetings"]):
-                return {"type": "greeting", "dimensions": []}
-            elif "forge" in lower_text or "who are you" in lower_text or "what do you do" in lower_text:
+            normalized = normalize_question(text)
+            if self.forge_question_re.fullmatch(normalized):
                 return {"type": "question_about_forge", "dimensions": []}
+            elif self.greeting_re.fullmatch(normalized):
+                return {"type": "greeting", "dimensions": []}
             else:
                 return {"type": "conversation", "dimensions": []}
         else:
@@ -192,7 +497,120 @@ class AgentAPlanner:
             "dimensions": result["dimensions"]
         }
 
-app = FastAPI(title="Forge AI Writing Coach")
+# --- Startup ---
+# "background": serve immediately and build components in a lifespan task
+# (/submit answers 503 until they are ready). "blocking": finish building
+# them before the server accepts requests.
+STARTUP_MODE = os.getenv("FORGE_STARTUP_MODE", "background")
+# Preload the models into Ollama at startup so the first request skips model load
+WARM_MODELS = os.getenv("FORGE_WARM_MODELS", "1") == "1"
+
+planner = AgentAPlanner()
+response_cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
+# Bounds the requests generating with Ollama at once; see app/scheduler.py
+llm_scheduler = LLMScheduler()
+inflight = InflightRequests()
+memory = ConversationMemory(llm_scheduler)
+# Template (or cached) answers for greetings and questions about Forge
+fast_path = FastPathResponder()
+batch_jobs = BatchJobs()
+# Short replies that skip the scheduler queue
+CHEAP_CLASSIFICATIONS = ("greeting", "question_about_forge")
+# Saved as the reply of a stream whose client left before the first token
+INTERRUPTED_REPLY = "[Interrupted: the reply was not generated.]"
+retriever = None
+llm = None
+librarian = None
+coach = None
+
+# Readiness per component: "pending", "ready", "skipped" or "failed: <reason>"
+component_status = {
+    "planner": "ready",
+    "librarian": "pending",
+    "coach": "pending",
+    "chat_model": "pending" if WARM_MODELS else "skipped",
+    "embedding_model": "pending" if WARM_MODELS else "skipped",
+}
+startup_timings = {}
+
+async def start_component(name, factory):
+    """Run an async factory, recording readiness and time since process start."""
+    try:
+        result = await factory()
+    except Exception as e:
+        component_status[name] = f"failed: {e}"
+        print(f"Error initializing {name}: {e}")
+        return None
+    component_status[name] = "ready"
+    startup_timings[name] = round(time.perf_counter() - PROCESS_START, 3)
+    return result
+
+async def build_librarian():
+    # Opening the Chroma client or index files is blocking disk work
+    retriever, lexical = await asyncio.gather(asyncio.to_thread(get_retriever),
+                                              asyncio.to_thread(build_lexical_index))
+    return AgentBLibrarian(retriever, lexical=lexical)
+
+async def build_coach():
+    return AgentCCoach(await asyncio.to_thread(get_chat_model), response_cache)
+
+async def warm_chat_model():
+    from ollama import AsyncClient
+    # An empty prompt only loads the model; with different options than the
+    # chat requests use, Ollama would load it again on the first of them.
+    # Every server in the pool is warmed; the ones that fail are ejected.
+    await chat_pool().each(lambda url: AsyncClient(host=url).generate(
+        model=CHAT_MODEL, prompt="", keep_alive=OLLAMA_KEEP_ALIVE, options=chat_model_options()
+    ))
+
+async def warm_embedding_model():
+    from ollama import AsyncClient
+    await embed_pool().each(lambda url: AsyncClient(host=url).embed(
+        model=EMBED_MODEL, input="warm up", keep_alive=OLLAMA_KEEP_ALIVE
+    ))
+
+async def start_librarian():
+    global librarian, retriever
+    built = await start_component("librarian", build_librarian)
+    if built is None:
+        return
+    # Serving starts now; the model warm-up may still be running
+    librarian, retriever = built, built.retriever
+    try:
+        await librarian.warm(planner.dimensions)
+    except Exception as e:
+        # Not fatal: the cache fills on the first submission instead
+        print(f"Could not warm retrieval cache: {e}")
+
+async def start_coach():
+    global coach, llm
+    built = await start_component("coach", build_coach)
+    if built is not None:
+        coach, llm = built, built.llm
+
+async def initialize_components():
+    """Build the agents, each made available as soon as it is ready, and warm the models meanwhile."""
+    steps = [start_librarian(), start_coach()]
+    if WARM_MODELS:
+        steps += [start_component("chat_model", warm_chat_model),
+                  start_component("embedding_model", warm_embedding_model)]
+    await asyncio.gather(*steps)
+    startup_timings["total"] = round(time.perf_counter() - PROCESS_START, 3)
+    print(f"Agentic flow initialized in {startup_timings['total']}s: {component_status}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_task = asyncio.create_task(initialize_components())
+    # Health probes of the Ollama servers, for as long as the app runs
+    probe_tasks = [asyncio.create_task(pool.run_probes()) for pool in pools()]
+    if STARTUP_MODE == "blocking":
+        await init_task
+    yield
+    init_task.cancel()
+    for task in probe_tasks:
+        task.cancel()
+
+app = FastAPI(title="Forge AI Writing Coach", lifespan=lifespan)
 
 # Add CORS middleware to allow frontend to connect
 app.add_middleware(
@@ -203,31 +621,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize dependencies for agents
-try:
-    rag_chain = get_rag_chain()
-    # For agentic flow, get retriever and llm separately
-    embeddings = None
-    try:
-        from langchain_community.embeddings import OllamaEmbeddings
-        embeddings = OllamaEmbeddings(model="mxbai-embed-large")
-    except Exception:
-        pass
-    vectorstore = Chroma(persist_directory="data/chroma_db", embedding_function=embeddings) if embeddings else None
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3}) if vectorstore else None
-    llm = ChatOllama(model="phi3", temperature=0.3)
-    planner = AgentAPlanner()
-    librarian = AgentBLibrarian(retriever)
-    coach = AgentCCoach(llm)
-    print("Agentic flow initialized successfully.")
-except Exception as e:
-    print(f"Error initializing agentic flow: {e}")
-    rag_chain = None
-    retriever = None
-    llm = None
-    planner = None
-    librarian = None
-    coach = None
+def not_ready_response():
+    if any(status == "pending" for status in component_status.values()):
+        return JSONResponse({"error": "Agentic flow is still starting.", "components": component_status},
+                            status_code=503, headers={"Retry-After": "2"})
+    return JSONResponse({"error": "Agentic flow not initialized.", "components": component_status}, status_code=500)
+
+def busy_response(exc):
+    if isinstance(exc, QueueFull):
+        return JSONResponse({"error": "Forge is busy, please try again shortly.", "scheduler": llm_scheduler.stats()},
+                            status_code=429, headers={"Retry-After": "5"})
+    return JSONResponse({"error": "Timed out waiting for the model.", "scheduler": llm_scheduler.stats()},
+                        status_code=503, headers={"Retry-After": "10"})
 
 # Pydantic Models
 class MessageBase(BaseModel):
@@ -256,9 +661,52 @@ class Conversation(ConversationBase):
     class Config:
         from_attributes = True
 
+class ConversationSummary(ConversationBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ConversationPage(BaseModel):
+    items: List[ConversationSummary]
+    # Pass back as `cursor` to get the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+class MessagePage(BaseModel):
+    # Oldest first within the page
+    items: List[Message]
+    # Pass back as `before_id` to get the previous (older) page; None on the first page
+    next_before_id: Optional[int] = None
+
+class SearchHit(BaseModel):
+    # "message", or "conversation" for a title match
+    kind: str
+    conversation_id: int
+    title: Optional[str] = None
+    message_id: Optional[int] = None
+    role: Optional[str] = None
+    created_at: Optional[datetime] = None
+    # HTML-escaped, with the matched words in <mark> tags
+    snippet: str
+    # bm25; lower is a better match
+    score: float
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    # Pass back as `offset` to get the next page; None on the last page
+    next_offset: Optional[int] = None
+
 class SubmitRequest(BaseModel):
     text: str
     conversation_id: Optional[int] = None
+    # Include a per-stage timing breakdown in the response
+    timings: bool = False
+
+class BatchSubmitRequest(BaseModel):
+    # One draft per entry; each becomes its own conversation
+    texts: List[str]
 
 @app.get("/")
 async def root():
@@ -267,23 +715,79 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Detailed health check"""
+    """Detailed health check with per-component readiness"""
     return {
         "status": "ok",
+        "ready": bool(planner and librarian and coach),
         "agents": {
             "planner": planner is not None,
             "librarian": librarian is not None,
             "coach": coach is not None
-        }
+        },
+        "components": component_status,
+        # Seconds from process start until each component became ready
+        "startup_seconds": startup_timings,
+        "caches": {
+            "retrieval": librarian.cache.stats() if librarian else None,
+            "response": response_cache.stats() if response_cache else None,
+            "embedding": embedding_cache_stats(),
+        },
+        "retrieval": librarian.stats() if librarian else None,
+        "scheduler": dict(llm_scheduler.stats(), **inflight.stats()),
+        "memory": memory.stats(),
+        "fast_path": fast_path.stats(),
+        "batch": batch_jobs.stats(),
+        "ollama": {pool.name: pool.stats() for pool in pools()},
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Stage latency histograms and Ollama token counters, in Prometheus text format."""
+    if not METRICS_ENABLED:
+        return PlainTextResponse("# Metrics are disabled (FORGE_METRICS=0)\n", status_code=404)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # --- Chat Persistence Endpoints ---
 
 @app.get("/chats", response_model=List[Conversation])
 def get_chats(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    chats = db.query(models.Conversation).order_by(models.Conversation.updated_at.desc()).offset(skip).limit(limit).all()
+    # Load all messages in one extra query instead of one per conversation
+    chats = (
+        db.query(models.Conversation)
+        .options(selectinload(models.Conversation.messages))
+        .order_by(models.Conversation.updated_at.desc())
+        .offset(skip).limit(limit).all()
+    )
     return chats
 
+def encode_cursor(conversation):
+    return f"{conversation.updated_at.isoformat()}_{conversation.id}"
+
+def decode_cursor(cursor: str):
+    try:
+        updated_at, chat_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(updated_at), int(chat_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/chats/summary", response_model=ConversationPage)
+def get_chat_summaries(cursor: Optional[str] = None, limit: int = 50, db: Session = Depends(get_db)):
+    """Lightweight sidebar listing, most recently updated first, without messages.
+
+    Keyset-paginated on (updated_at, id), so deep pages cost the same as the first.
+    """
+    limit = max(1, min(limit, 200))
+    query = db.query(models.Conversation)
+    if cursor:
+        updated_at, chat_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            models.Conversation.updated_at < updated_at,
+            and_(models.Conversation.updated_at == updated_at, models.Conversation.id < chat_id),
+        ))
+    chats = query.order_by(models.Conversation.updated_at.desc(), models.Conversation.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(chats[limit - 1]) if len(chats) > limit else None
+    return ConversationPage(items=chats[:limit], next_cursor=next_cursor)
+
 @app.get("/chats/{chat_id}", response_model=Conversation)
 def get_chat(chat_id: int, db: Session = Depends(get_db)):
     chat = db.query(models.Conversation).filter(models.Conversation.id == chat_id).first()
@@ -291,6 +795,28 @@ def get_chat(chat_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Conversation not found")
     return chat
 
+def recent_messages(db: Session, conversation_id: int, limit: int, before_id: Optional[int] = None,
+                    after_id: Optional[int] = None):
+    """The last `limit` messages of a conversation (between `after_id` and `before_id`), oldest first."""
+    query = db.query(models.Message).filter(models.Message.conversation_id == conversation_id)
+    if before_id is not None:
+        query = query.filter(models.Message.id < before_id)
+    if after_id is not None:
+        query = query.filter(models.Message.id > after_id)
+    newest_first = query.order_by(models.Message.created_at.desc(), models.Message.id.desc()).limit(limit).all()
+    return newest_first[::-1]
+
+@app.get("/chats/{chat_id}/messages", response_model=MessagePage)
+def get_chat_messages(chat_id: int, before_id: Optional[int] = None, limit: int = 50, db: Session = Depends(get_db)):
+    """Newest page of a conversation's messages; page backwards with `before_id`."""
+    if not db.query(models.Conversation.id).filter(models.Conversation.id == chat_id).first():
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    limit = max(1, min(limit, 200))
+    messages = recent_messages(db, chat_id, limit + 1, before_id)
+    if len(messages) > limit:
+        return MessagePage(items=messages[1:], next_before_id=messages[1].id)
+    return MessagePage(items=messages)
+
 @app.post("/chats", response_model=Conversation)
 def create_chat(chat: ConversationCreate, db: Session = Depends(get_db)):
     db_chat = models.Conversation(title=chat.title)
@@ -308,34 +834,36 @@ def delete_chat(chat_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"status": "success"}
 
-# --- Main Interaction Endpoint ---
-
-@app.post("/submit")
-async def submit(request: SubmitRequest, db: Session = Depends(get_db)):
-    user_text = request.text
-    conversation_id = request.conversation_id
+@app.get("/search", response_model=SearchPage)
+def search_chats(q: str, limit: int = 20, offset: int = 0, db: Session = Depends(get_db)):
+    """Messages and conversation titles matching every word of `q`, best match first (see app/search.py)."""
+    limit = max(1, min(limit, 100))
+    hits, next_offset = search(db, q, limit, max(offset, 0))
+    return SearchPage(items=hits, next_offset=next_offset)
 
-    if not (planner and librarian and coach):
-        return JSONResponse({"error": "Agentic flow not initialized."}, status_code=500)
-    if not user_text:
-        return JSONResponse({"error": "No text provided."}, status_code=400)
+# --- Main Interaction Endpoint ---
 
-    # Get or create conversation
+def get_or_create_conversation(db: Session, user_text: str, conversation_id: Optional[int]):
+    conversation = None
     if conversation_id:
         conversation = db.query(models.Conversation).filter(models.Conversation.id == conversation_id).first()
-        if not conversation:
-            # Fallback to creating new if ID invalid
-            conversation = models.Conversation(title=user_text[:30] + "...")
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-    else:
+    if not conversation:
+        # Fallback to creating new if ID missing or invalid
         conversation = models.Conversation(title=user_text[:30] + "...")
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-    
-    conversation_id = conversation.id
+        # Assigns the ID without committing, so it lands in the caller's transaction
+        db.flush()
+    return conversation
+
+def start_exchange(db: Session, user_text: str, conversation_id: Optional[int], history_limit: int):
+    """Get or create the conversation, save the user message and return (conversation_id, history, summary).
+
+    History is the last `history_limit` messages not yet folded into the
+    summary, including the one just saved.
+    """
+    conversation = get_or_create_conversation(db, user_text, conversation_id)
+    conversation_id, summary = conversation.id, conversation.summary
+    summarized_through = conversation.summary_message_id
 
     # Save User Message
     user_msg = models.Message(conversation_id=conversation_id, role="user", content=user_text)
@@ -343,36 +871,345 @@ async def submit(request: SubmitRequest, db: Session = Depends(get_db)):
     db.commit()
 
     # Retrieve History
-    history_msgs = db.query(models.Message).filter(models.Message.conversation_id == conversation_id).order_by(models.Message.created_at).all()
+    history_msgs = recent_messages(db, conversation_id, history_limit, after_id=summarized_through)
     history = [{"role": m.role, "content": m.content} for m in history_msgs]
+    return conversation_id, history, summary
 
-    # Step 1: Plan
-    plan = planner.plan(user_text)
-    classification = plan.get("classification")
-    dimensions = plan.get("dimensions", [])
-
-    # Step 2: Retrieve Tips (if needed)
-    tips = []
-    if classification == "submission":
-        tips = librarian.retrieve_tips(dimensions)
+def load_history(db: Session, conversation_id: Optional[int], history_limit: int):
+    """(history, summary) of an existing conversation: its last `history_limit` messages not yet summarized.
 
-    # Step 3: Generate Response
-    response_text = await coach.chat(user_text, tips, history)
+    Read-only, so it can run while the request waits for an LLM slot.
+    """
+    conversation = db.get(models.Conversation, conversation_id) if conversation_id else None
+    if conversation is None:
+        return [], None
+    history_msgs = recent_messages(db, conversation.id, history_limit, after_id=conversation.summary_message_id)
+    return [{"role": m.role, "content": m.content} for m in history_msgs], conversation.summary
 
-    # Save Assistant Message
+def finish_exchange(db: Session, conversation_id: int, response_text: str):
+    """Save the assistant message and bump the conversation timestamp."""
     assistant_msg = models.Message(conversation_id=conversation_id, role="assistant", content=response_text)
     db.add(assistant_msg)
     
     # Update conversation timestamp
+    db.query(models.Conversation).filter(models.Conversation.id == conversation_id).update(
+        {"updated_at": datetime.utcnow()}
+    )
+    db.commit()
+
+def record_exchange(db: Session, user_text: str, conversation_id: Optional[int], response_text: str):
+    """Save a whole exchange in one transaction, for replies that need no history."""
+    conversation = get_or_create_conversation(db, user_text, conversation_id)
+    conversation_id = conversation.id
+    db.add(models.Message(conversation_id=conversation_id, role="user", content=user_text))
+    db.add(models.Message(conversation_id=conversation_id, role="assistant", content=response_text))
     conversation.updated_at = datetime.utcnow()
     db.commit()
+    return conversation_id
+
+def submit_response(payload, timings, started):
+    observe_request("submit", time.perf_counter() - started)
+    if timings is not None:
+        payload = dict(payload, timings=timings.as_dict())
+    return JSONResponse(payload)
+
+def remember_answer(plan, user_text, response_text):
+    """Count a model reply, and keep it for repeats when it answers a fast-path class."""
+    fast_path.record("model")
+    if response_text not in (coach.violation_message("rewrite"), coach.violation_message("story")):
+        fast_path.remember(plan.get("classification"), user_text, response_text)
+
+def llm_slot(plan, conversation_id):
+    """Scheduler slot for generating the reply; cheap replies skip the queue."""
+    if plan.get("classification") in CHEAP_CLASSIFICATIONS:
+        return nullcontext()
+    return llm_scheduler.slot(conversation_id)
+
+async def history_stage(conversation_id, history_limit):
+    with span("history"):
+        return await run_db(load_history, conversation_id, history_limit)
+
+async def retrieval_stage(plan, user_text):
+    # Manuscripts retrieve per chunk (see ManuscriptCritic), not for the whole text
+    if plan.get("classification") != "submission":
+        return []
+    with span("retrieval"):
+        return await librarian.aretrieve_tips(plan.get("dimensions", []), user_text)
+
+async def generate_submission(user_text: str, conversation_id: Optional[int], plan: dict):
+    """The /submit stages after planning, run as a small graph.
+
+    History loading and retrieval need only the plan, so they run together
+    while the request waits for its LLM slot; generation needs all three.
+    The exchange is saved once the reply exists, so a request that is
+    turned away or cancelled (see InflightRequests) leaves no trace.
+    """
+    stages = [asyncio.ensure_future(history_stage(conversation_id, coach.history_window)),
+              asyncio.ensure_future(retrieval_stage(plan, user_text))]
+    try:
+        async with llm_slot(plan, conversation_id):
+            (history, summary), tips = await asyncio.gather(*stages)
+            if plan.get("classification") == "manuscript":
+                overview, sections = await ManuscriptCritic(coach, librarian, scheduler=llm_scheduler).critique(user_text, plan.get("dimensions", []))
+                response_text = compose_response(overview, sections)
+            else:
+                # The new message ends the history, as it will once saved
+                history = history + [{"role": "user", "content": user_text}]
+                response_text = await coach.chat(user_text, tips, history, summary)
+    finally:
+        for stage in stages:
+            stage.cancel()
 
-    return JSONResponse({
+    with span("save"):
+        conversation_id = await run_db(record_exchange, user_text, conversation_id, response_text)
+    memory.schedule(coach.llm, conversation_id)
+    remember_answer(plan, user_text, response_text)
+
+    return {
         "conversation_id": conversation_id,
         "plan": plan,
         "tips": tips,
         "response": response_text
-    })
+    }
+
+@app.post("/submit")
+async def submit(request: SubmitRequest, http_request: Request):
+    started = time.perf_counter()
+    user_text = request.text
+
+    if not (planner and librarian and coach):
+        return not_ready_response()
+    if not user_text:
+        return JSONResponse({"error": "No text provided."}, status_code=400)
+
+    timings = start_request_timings() if request.timings else None
+
+    if coach.is_writing_request(user_text):
+        # Deterministic refusal: no history, retrieval or generation needed
+        with span("save"):
+            conversation_id = await run_db(record_exchange, user_text, request.conversation_id, coach.refusal_message)
+        fast_path.record("refusal")
+        return submit_response({
+            "conversation_id": conversation_id,
+            "plan": planner.plan(user_text),
+            "tips": [],
+            "response": coach.refusal_message
+        }, timings, started)
+
+    # Step 1: Plan
+    with span("plan"):
+        plan = planner.plan(user_text)
+
+    answer, source = fast_path.answer(plan["classification"], user_text)
+    if answer is not None:
+        # Greetings and questions about Forge: no history, retrieval or generation
+        with span("save"):
+            conversation_id = await run_db(record_exchange, user_text, request.conversation_id, answer)
+        fast_path.record(source)
+        return submit_response({
+            "conversation_id": conversation_id,
+            "plan": plan,
+            "tips": [],
+            "response": answer
+        }, timings, started)
+
+    # The same text sent again to the same conversation while the first is
+    # still being answered (a double submit) shares the first one's reply
+    key = (request.conversation_id, user_text) if request.conversation_id else None
+    try:
+        payload = await inflight.run(key, lambda: generate_submission(user_text, request.conversation_id, plan),
+                                     http_request.is_disconnected)
+    except (QueueFull, QueueTimeout) as exc:
+        return busy_response(exc)
+    except ClientDisconnected:
+        # Nobody is left to read it; 499 is the status proxies log for this
+        return JSONResponse({"error": "Client disconnected."}, status_code=499)
+    return submit_response(payload, timings, started)
+
+class FinishingStreamingResponse(StreamingResponse):
+    """StreamingResponse that awaits `finish` once sending ends, whether or not the body was read."""
+
+    def __init__(self, content, finish, **kwargs):
+        super().__init__(content, **kwargs)
+        self.finish = finish
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.finish()
+
+@app.post("/submit/stream")
+async def submit_stream(request: SubmitRequest):
+    """Streaming variant of /submit: newline-delimited JSON events.
+
+    Emits "conversation", "plan" and "tips" events up front, then "token"
+    events as the model generates, an optional "blocked" event if a guardrail
+    cuts the stream, and a final "done" event with the full response (and the
+    timing breakdown, when the request asked for it).
+    Manuscripts first emit a "sections" event with the number of chunks and
+    one "section" event per chunk critique; the tokens are then the summary.
+    """
+    started = time.perf_counter()
+    user_text = request.text
+
+    if not (planner and librarian and coach):
+        return not_ready_response()
+    if not user_text:
+        return JSONResponse({"error": "No text provided."}, status_code=400)
+
+    timings = start_request_timings() if request.timings else None
+
+    with span("plan"):
+        plan = planner.plan(user_text)
+    # Replies that need no model: a refusal, or a fast-path answer
+    if coach.is_writing_request(user_text):
+        canned, source = coach.refusal_message, "refusal"
+    else:
+        canned, source = fast_path.answer(plan["classification"], user_text)
+
+    # Held until the stream ends; taken before anything is saved, so a
+    # rejected request leaves no trace
+    slot = nullcontext() if canned is not None else llm_slot(plan, request.conversation_id)
+    try:
+        await slot.__aenter__()
+    except (QueueFull, QueueTimeout) as exc:
+        return busy_response(exc)
+
+    async def start_stage():
+        # Database work runs on the DB thread pool so the event loop stays free
+        with span("history"):
+            return await run_db(start_exchange, user_text, request.conversation_id, coach.history_window + 1)
+
+    tips = []
+    try:
+        if canned is not None:
+            # Saved up front, no history or retrieval needed
+            with span("save"):
+                conversation_id = await run_db(record_exchange, user_text, request.conversation_id, canned)
+            fast_path.record(source)
+        else:
+            # Independent stages: the history and the tips need only the plan
+            (conversation_id, history, summary), tips = await asyncio.gather(
+                start_stage(), retrieval_stage(plan, user_text)
+            )
+    except BaseException:
+        await slot.__aexit__(None, None, None)
+        raise
+
+    async def canned_reply():
+        yield {"type": "token", "content": canned}
+
+    if canned is not None:
+        replies = canned_reply()
+    elif plan.get("classification") == "manuscript":
+        replies = ManuscriptCritic(coach, librarian, scheduler=llm_scheduler).stream(user_text, plan.get("dimensions", []))
+    else:
+        replies = coach.stream_chat(user_text, tips, history, summary)
+
+    def event(payload):
+        return json.dumps(payload) + "\n"
+
+    parts = []
+    sections = {}
+    finished = False
+
+    def response_text():
+        if sections:
+            return compose_response("".join(parts), [sections[i] for i in sorted(sections)])
+        return "".join(parts)
+
+    async def finish():
+        """Release the slot and save what was generated; runs once, however the response ends."""
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        await slot.__aexit__(None, None, None)
+        # Not awaited: a cancelled stream cannot wait on the write
+        if canned is None:
+            # A blank reply would sit in the history and the search index as if it were one
+            submit_db(finish_exchange, conversation_id, response_text() or INTERRUPTED_REPLY)
+            # Only folds in messages older than the recent window, so it
+            # does not need to wait for the write above
+            memory.schedule(coach.llm, conversation_id)
+
+    async def events():
+        try:
+            yield event({"type": "conversation", "conversation_id": conversation_id})
+            yield event({"type": "plan", "plan": plan})
+            yield event({"type": "tips", "tips": tips})
+            async for item in replies:
+                if item["type"] == "section":
+                    sections[item["index"]] = item["content"]
+                elif item["type"] == "blocked":
+                    # Drop what was streamed so far; the replacement is what gets saved
+                    parts[:] = [item["content"]]
+                elif item["type"] == "token":
+                    parts.append(item["content"])
+                yield event(item)
+            done = {"type": "done", "conversation_id": conversation_id, "response": response_text()}
+            if canned is None:
+                remember_answer(plan, user_text, done["response"])
+            observe_request("submit_stream", time.perf_counter() - started)
+            if timings is not None:
+                done["timings"] = timings.as_dict()
+            yield event(done)
+        finally:
+            # Completion, guardrail cut or client disconnect mid-stream
+            await finish()
+
+    # finish() also runs if the body is never started: a client gone before
+    # the headers were sent, or a failed send of them
+    return FinishingStreamingResponse(events(), finish, media_type="application/x-ndjson")
+
+@app.post("/submit/batch")
+async def submit_batch(request: BatchSubmitRequest):
+    """Start a batch critique job; returns 202 with the job ID to poll or stream."""
+    if not (planner and librarian and coach):
+        return not_ready_response()
+    if not request.texts or any(not text for text in request.texts):
+        return JSONResponse({"error": "Every draft needs text."}, status_code=400)
+    if len(request.texts) > BATCH_MAX_DRAFTS:
+        return JSONResponse({"error": f"At most {BATCH_MAX_DRAFTS} drafts per batch."}, status_code=400)
+
+    job = BatchJob(request.texts)
+    batch_jobs.start(job, BatchCritic(planner, librarian, coach, llm_scheduler, fast_path))
+    return JSONResponse(job.progress(), status_code=202)
+
+def get_batch_job(job_id: str):
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+@app.get("/submit/batch/{job_id}")
+async def batch_status(job_id: str):
+    """Progress of a batch job and the results finished so far, in draft order."""
+    return get_batch_job(job_id).snapshot()
+
+@app.get("/submit/batch/{job_id}/stream")
+async def batch_stream(job_id: str):
+    """Newline-delimited JSON: a "result" event per draft as it finishes (earlier ones first), then "done".
+
+    The "done" event carries the final progress and the conversation ID of
+    each draft, which exist once the whole batch has been saved.
+    """
+    job = get_batch_job(job_id)
+
+    async def events():
+        sent = 0
+        while True:
+            while sent < len(job.finished):
+                yield json.dumps(dict(job.results[job.finished[sent]], type="result")) + "\n"
+                sent += 1
+            if job.done:
+                break
+            await job.wait_for_change()
+        conversation_ids = [result.get("conversation_id") if result else None for result in job.results]
+        yield json.dumps(dict(job.progress(), type="done", conversation_ids=conversation_ids)) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=False, loop="asyncio")
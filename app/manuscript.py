@@ -0,0 +1,167 @@
+"""Long-manuscript mode: chunked, parallel critique reduced into one summary.
+
+A chapter-length submission does not fit phi3's context window in one
+prompt, and prompt evaluation slows down as it grows. Instead the text is
+split into scene/paragraph chunks, each chunk is critiqued on its own (with
+its own retrieved tips) under a concurrency bound, and the section
+critiques are reduced into a single overall critique.
+
+The caller holds one LLM scheduler slot for the manuscript. Chunk calls
+beyond the first only run alongside it on spare slots borrowed from the
+scheduler, so a manuscript never has more calls at Ollama than the slots
+it holds.
+"""
+import asyncio
+import os
+import re
+from contextlib import asynccontextmanager
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# Submissions at least this long are critiqued in manuscript mode
+MANUSCRIPT_MIN_WORDS = int(os.getenv("FORGE_MANUSCRIPT_MIN_WORDS", "2000"))
+# Target words per chunk
+CHUNK_WORDS = int(os.getenv("FORGE_MANUSCRIPT_CHUNK_WORDS", "1500"))
+# Chunk critiques sent to Ollama at once, when the scheduler has spare slots
+MANUSCRIPT_CONCURRENCY = int(os.getenv("FORGE_MANUSCRIPT_CONCURRENCY", "2"))
+
+# Lines such as "***", "* * *", "#" or "Chapter 2" start a new scene
+SCENE_BREAK_RE = re.compile(
+    r"^\s*(?:[*#~-](?:\s*[*#~-])*|chapter\s+[\w-]+(?:\s*[:.\-].{0,80})?)\s*$", re.IGNORECASE | re.MULTILINE
+)
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|(?<=[.!?][\"')\]])\s+")
+QUOTE_RE = re.compile(r"[\"“”]")
+
+def word_count(text):
+    return len(re.findall(r"\w+", text))
+
+def split_into_chunks(text, target_words=CHUNK_WORDS):
+    """Split text into chunks of about target_words, never crossing a scene break.
+
+    Paragraphs are packed whole; a paragraph longer than the target is split
+    at sentence boundaries.
+    """
+    chunks = []
+    for scene in SCENE_BREAK_RE.split(text):
+        pieces = []
+        for paragraph in PARAGRAPH_RE.split(scene):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if word_count(paragraph) > target_words:
+                pieces.extend(SENTENCE_RE.split(paragraph))
+            else:
+                pieces.append(paragraph)
+
+        current, current_words = [], 0
+        for piece in pieces:
+            words = word_count(piece)
+            if current and current_words + words > target_words:
+                chunks.append("\n\n".join(current))
+                current, current_words = [], 0
+            current.append(piece)
+            current_words += words
+        if current:
+            chunks.append("\n\n".join(current))
+    return chunks
+
+def chunk_dimensions(chunk, dimensions):
+    # Dialogue advice only helps sections that have dialogue
+    has_dialogue = len(QUOTE_RE.findall(chunk)) >= 2
+    return [dim for dim in dimensions if dim != "Dialogue" or has_dialogue]
+
+def compose_response(summary, sections):
+    """The stored reply: overall critique followed by the per-section notes."""
+    notes = "\n\n".join(f"**Section {i + 1}**\n{critique}" for i, critique in enumerate(sections))
+    return f"{summary}\n\n### Section notes\n\n{notes}"
+
+class ManuscriptCritic:
+    def __init__(self, coach, librarian, concurrency=MANUSCRIPT_CONCURRENCY, scheduler=None):
+        self.coach = coach
+        self.librarian = librarian
+        self.concurrency = concurrency
+        self.scheduler = scheduler
+        # The caller's own slot; without a scheduler, the bound alone
+        self.held = asyncio.Semaphore(1 if scheduler is not None else concurrency)
+        self.borrowed = 0
+
+    @asynccontextmanager
+    async def llm_call(self):
+        """Room for one Ollama call: a spare scheduler slot if one is free, else the caller's."""
+        if (self.scheduler is not None and self.borrowed < self.concurrency - 1
+                and self.scheduler.try_acquire()):
+            self.borrowed += 1
+            try:
+                yield
+            finally:
+                self.borrowed -= 1
+                self.scheduler.release()
+            return
+        async with self.held:
+            yield
+
+    def chunk_messages(self, chunk, index, total, tips):
+        # Same static system prompt as the coach's other prompts, so Ollama can reuse its evaluation
+        messages = [
+            SystemMessage(content=self.coach.system_prompt),
+            HumanMessage(content=(
+                f"This is section {index + 1} of {total} of a longer manuscript.\n\n{chunk}\n\n"
+                "Critique this section in 3-5 short bullet points. Do not rewrite it."
+            )),
+        ]
+        if tips:
+            messages.append(self.coach.tips_message(tips))
+        return messages
+
+    def summary_messages(self, sections):
+        notes = "\n\n".join(f"Section {i + 1}:\n{critique}" for i, critique in enumerate(sections))
+        return [
+            SystemMessage(content=self.coach.system_prompt),
+            HumanMessage(content=(
+                f"These are your critiques of the {len(sections)} sections of my manuscript:\n\n{notes}\n\n"
+                "Combine them into one overall critique covering Pacing, Dialogue and Show-Don't-Tell. "
+                "Lead with the most important issues across the whole piece."
+            )),
+        ]
+
+    async def critique_chunk(self, chunk, index, total, dimensions):
+        tips = await self.librarian.aretrieve_tips(chunk_dimensions(chunk, dimensions), chunk)
+        async with self.llm_call():
+            critique = await self.coach.invoke(self.chunk_messages(chunk, index, total, tips))
+        passed, violation_type = self.coach.check_guardrails(chunk, critique)
+        if not passed:
+            critique = self.coach.violation_message(violation_type)
+        return index, critique
+
+    async def stream(self, text, dimensions):
+        """Yields a "sections" event, one "section" event per chunk as it finishes,
+        then the summary as "token" events (or one "blocked" event)."""
+        chunks = split_into_chunks(text)
+        yield {"type": "sections", "total": len(chunks)}
+
+        sections = [None] * len(chunks)
+        tasks = [asyncio.ensure_future(self.critique_chunk(chunk, i, len(chunks), dimensions))
+                 for i, chunk in enumerate(chunks)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, critique = await next_done
+                sections[index] = critique
+                yield {"type": "section", "index": index, "total": len(chunks), "content": critique}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        async for item in self.coach.stream_messages(text, self.summary_messages(sections)):
+            yield item
+
+    async def critique(self, text, dimensions):
+        """Non-streaming form of stream(); returns (summary, section critiques)."""
+        sections, parts = [], []
+        async for item in self.stream(text, dimensions):
+            if item["type"] == "section":
+                sections.append((item["index"], item["content"]))
+            elif item["type"] == "token":
+                parts.append(item["content"])
+            elif item["type"] == "blocked":
+                parts = [item["content"]]
+        return "".join(parts), [critique for _, critique in sorted(sections)]
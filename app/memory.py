@@ -0,0 +1,180 @@
+"""Rolling conversation summaries that keep the coach's prompt size bounded.
+
+The coach used to resend the last ten raw messages every turn. Those often
+include whole pasted drafts, so prompt evaluation grew with the length of
+the conversation instead of the new turn. Now each conversation keeps a
+compact summary on models.Conversation, updated in the background by
+folding in the messages that have left the recent-turn window. The prompt
+holds the summary and the turns not yet folded into it: the most recent
+ones whole, older ones each cut to its share of a token budget.
+
+Messages are folded in blocks of FOLD_MESSAGES rather than one exchange at
+a time: between folds the summary and the messages already cut stay the
+same, so each prompt repeats the previous one up to the recent messages,
+which lets Ollama reuse that evaluated prefix instead of re-reading the
+whole history. A message that leaves the recent window is cut from then
+on, so the prefix ends where it was sent whole the turn before.
+"""
+import asyncio
+import os
+import re
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app import models
+from app.database import run_db
+from app.metrics import detach_request_timings, record_llm, span
+from app.scheduler import QueueFull, QueueTimeout
+
+# Set to 0 to send the last ten messages and no summary; they are still fitted
+# to HISTORY_TOKEN_BUDGET like any history (see budget_history)
+SUMMARIES_ENABLED = os.getenv("FORGE_CONVERSATION_SUMMARIES", "1") == "1"
+# Raw messages always sent with each prompt when summaries are on
+RECENT_MESSAGES = int(os.getenv("FORGE_MEMORY_RECENT_MESSAGES", "4"))
+# Messages folded into the summary at once; prompts carry between
+# RECENT_MESSAGES and RECENT_MESSAGES + FOLD_MESSAGES - 1 raw messages
+FOLD_MESSAGES = int(os.getenv("FORGE_MEMORY_FOLD_MESSAGES", "4"))
+# Estimated tokens of history (summary plus recent messages) per prompt
+HISTORY_TOKEN_BUDGET = int(os.getenv("FORGE_HISTORY_TOKEN_BUDGET", "1200"))
+# History messages longer than this (pasted drafts, long critiques) are cut down
+OLD_MESSAGE_TOKENS = int(os.getenv("FORGE_OLD_MESSAGE_TOKENS", "200"))
+SUMMARY_TOKENS = 300
+MIN_FRAGMENT_TOKENS = 50
+
+WORD_RE = re.compile(r"\S+")
+
+def estimate_tokens(text):
+    # phi3's tokenizer averages about 1.3 tokens per English word
+    return int(len(WORD_RE.findall(text)) * 1.3) + 1
+
+def truncate_to_tokens(text, max_tokens):
+    """Keep the start and end of text within about max_tokens, marking the cut."""
+    words = text.split()
+    keep = max(int(max_tokens / 1.3), 2)
+    if len(words) <= keep:
+        return text
+    head, tail = keep * 2 // 3, keep - keep * 2 // 3
+    omitted = len(words) - head - tail
+    return " ".join(words[:head]) + f" [... {omitted} words omitted ...] " + " ".join(words[-tail:])
+
+def budget_history(messages, budget=HISTORY_TOKEN_BUDGET, old_message_tokens=OLD_MESSAGE_TOKENS, slots=None,
+                   recent=RECENT_MESSAGES):
+    """Fit messages (oldest first) into about `budget` tokens.
+
+    The last `recent` messages are kept whole where they fit, so a follow-up
+    question still sees the reply it refers to. Older ones are each cut on
+    their own to an equal share of the budget for `slots` messages (the most
+    ever passed; at most old_message_tokens). Once the budget is spent, the
+    message that overflows it is cut to fit and older ones are dropped.
+    """
+    # One share spare for the "[... omitted ...]" marks
+    share = min(old_message_tokens, budget // ((slots or len(messages)) + 1))
+    kept = []
+    used = 0
+    for position, msg in enumerate(reversed(messages)):
+        content = msg["content"]
+        if position >= recent:
+            content = truncate_to_tokens(content, share)
+        tokens = estimate_tokens(content)
+        if used + tokens > budget:
+            # Keep what fits of the first message that does not, unless that is a mere fragment
+            if budget - used >= MIN_FRAGMENT_TOKENS:
+                kept.append({"role": msg["role"], "content": truncate_to_tokens(content, budget - used)})
+            break
+        kept.append({"role": msg["role"], "content": content})
+        used += tokens
+    return kept[::-1]
+
+def load_unsummarized(db, conversation_id, recent, limit):
+    """Returns (summary, messages to fold in): the oldest `limit` of those not yet
+    summarized and older than the last `recent`."""
+    conversation = db.query(models.Conversation).filter(models.Conversation.id == conversation_id).first()
+    if conversation is None:
+        return None, []
+    query = db.query(models.Message).filter(models.Message.conversation_id == conversation_id)
+    if conversation.summary_message_id:
+        query = query.filter(models.Message.id > conversation.summary_message_id)
+    foldable = max(query.count() - recent, 0)
+    pending = query.order_by(models.Message.id.asc()).limit(min(foldable, limit)).all()
+    return conversation.summary, [{"id": m.id, "role": m.role, "content": m.content} for m in pending]
+
+def save_summary(db, conversation_id, summary, last_message_id):
+    db.query(models.Conversation).filter(models.Conversation.id == conversation_id).update(
+        {"summary": summary, "summary_message_id": last_message_id}, synchronize_session=False
+    )
+    db.commit()
+
+class ConversationMemory:
+    def __init__(self, scheduler, recent=RECENT_MESSAGES, fold=FOLD_MESSAGES):
+        self.scheduler = scheduler
+        self.recent = recent
+        self.fold = fold
+        self._updating = set()
+        self._tasks = set()
+        self.updates = 0
+        self.skipped = 0
+
+    def summary_messages(self, summary, messages):
+        transcript = "\n\n".join(
+            f"{msg['role'].capitalize()}: {truncate_to_tokens(msg['content'], OLD_MESSAGE_TOKENS)}" for msg in messages
+        )
+        return [
+            SystemMessage(content=(
+                "You keep the memory of a conversation between a writer and Forge, their writing coach. "
+                "Write a compact summary that lets the coach continue the conversation: the writer's "
+                "project, characters and goals, the feedback already given, and open questions. "
+                "Do not quote or rewrite the writer's text."
+            )),
+            HumanMessage(content=(
+                f"Summary so far:\n{summary or '(none yet)'}\n\nNew messages:\n{transcript}\n\n"
+                f"Reply with the updated summary only, in at most {int(SUMMARY_TOKENS / 1.3)} words."
+            )),
+        ]
+
+    async def update(self, llm, conversation_id):
+        """Fold messages that left the recent window into the stored summary, one block at a time.
+
+        A conversation with a long backlog (a skipped update, or one from
+        before summaries) catches up block by block, so no prompt or query
+        grows with it.
+        """
+        while True:
+            summary, pending = await run_db(load_unsummarized, conversation_id, self.recent, self.fold)
+            if len(pending) < self.fold:
+                return
+            # A background job: a busy server skips it and catches up after a later exchange
+            try:
+                async with self.scheduler.slot(conversation_id):
+                    with span("summarize"):
+                        response = await llm.ainvoke(self.summary_messages(summary, pending))
+            except (QueueFull, QueueTimeout):
+                self.skipped += 1
+                return
+            record_llm(getattr(response, "response_metadata", None))
+            text = response.content if hasattr(response, 'content') else str(response)
+            await run_db(save_summary, conversation_id, truncate_to_tokens(text.strip(), SUMMARY_TOKENS),
+                         pending[-1]["id"])
+            self.updates += 1
+
+    async def _run(self, llm, conversation_id):
+        # Not part of the request that scheduled it
+        detach_request_timings()
+        try:
+            await self.update(llm, conversation_id)
+        except Exception as e:
+            print(f"Could not update summary for conversation {conversation_id}: {e}")
+        finally:
+            self._updating.discard(conversation_id)
+
+    def schedule(self, llm, conversation_id):
+        """Update the conversation's summary in the background, unless an update is already running."""
+        if not SUMMARIES_ENABLED or conversation_id in self._updating:
+            return
+        self._updating.add(conversation_id)
+        task = asyncio.create_task(self._run(llm, conversation_id))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self):
+        return {"enabled": SUMMARIES_ENABLED, "updates": self.updates, "skipped": self.skipped,
+                "running": len(self._updating)}
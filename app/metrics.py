@@ -0,0 +1,216 @@
+"""Per-stage latency spans and Prometheus-style metrics for the agent pipeline.
+
+`span(stage)` times one stage of a request (planning, retrieval, generation,
+guardrails, database work). Every span is observed into a histogram served
+by /metrics, and, when a request asked for it, also recorded in that
+request's RequestTimings, which is returned with the response. Ollama's
+token counts and eval durations are picked out of each reply's
+response_metadata by `record_llm`.
+
+With FORGE_METRICS=0 and no per-request timings, `span` returns a shared
+no-op context manager, so instrumented code pays only a function call.
+"""
+import contextvars
+import os
+import time
+
+METRICS_ENABLED = os.getenv("FORGE_METRICS", "1") == "1"
+
+# Upper bounds in seconds; Ollama generations take seconds, SQLite and cached lookups microseconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labelvalues, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                labels = _labels(self.labelnames + ("le",), labelvalues + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _labels(self.labelnames + ("le",), labelvalues + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount, *labelvalues):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+class Gauge:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+REQUEST_SECONDS = Histogram("forge_request_seconds", "End-to-end request latency.", ["endpoint"])
+STAGE_SECONDS = Histogram("forge_stage_seconds", "Latency of each pipeline stage.", ["stage"])
+LLM_TOKENS = Counter("forge_llm_tokens_total", "Tokens evaluated by Ollama.", ["kind"])
+LLM_EVAL_SECONDS = Histogram("forge_llm_eval_seconds", "Ollama time per reply, by phase.", ["phase"])
+LLM_QUEUED = Gauge("forge_llm_queue_depth", "Requests waiting for an LLM slot.")
+LLM_ACTIVE = Gauge("forge_llm_active", "Requests holding an LLM slot.")
+LLM_REJECTED = Counter("forge_llm_rejected_total", "Requests turned away by the LLM scheduler.", ["reason"])
+SUBMIT_REPLIES = Counter(
+    "forge_submit_replies_total", "Submissions answered, by reply source; all but \"model\" skip Ollama.", ["source"]
+)
+REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS, LLM_TOKENS, LLM_EVAL_SECONDS, LLM_QUEUED, LLM_ACTIVE, LLM_REJECTED,
+            SUBMIT_REPLIES]
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class RequestTimings:
+    """Spans and Ollama usage recorded for one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = []
+        self.llm = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "prompt_eval_seconds": 0.0, "eval_seconds": 0.0, "load_seconds": 0.0}
+
+    def add(self, stage, start, seconds):
+        self.spans.append({"stage": stage, "start": round(start - self.start, 6), "seconds": round(seconds, 6)})
+
+    def as_dict(self):
+        return {
+            "total_seconds": round(time.perf_counter() - self.start, 6),
+            # Concurrent stages (such as the retrieval queries) overlap, so spans carry their start offset
+            "spans": self.spans,
+            "llm": self.llm,
+        }
+
+_current = contextvars.ContextVar("forge_request_timings", default=None)
+
+def start_request_timings():
+    """Record this request's spans (and those of the tasks it starts) into a new RequestTimings."""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+def _observe(stage, started, timings):
+    seconds = time.perf_counter() - started
+    if METRICS_ENABLED:
+        STAGE_SECONDS.observe(seconds, stage)
+    if timings is not None:
+        timings.add(stage, started, seconds)
+
+def detach_request_timings():
+    """Stop recording into the request's timings from this task, e.g. a background job it started."""
+    _current.set(None)
+
+class _Span:
+    __slots__ = ("stage", "timings", "started")
+
+    def __init__(self, stage, timings):
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _observe(self.stage, self.started, self.timings)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(stage):
+    timings = _current.get()
+    if timings is None and not METRICS_ENABLED:
+        return _NO_SPAN
+    return _Span(stage, timings)
+
+def observe_stage(stage, started):
+    """Record a stage that began at perf_counter() value `started` and ends now."""
+    timings = _current.get()
+    if timings is not None or METRICS_ENABLED:
+        _observe(stage, started, timings)
+
+def observe_request(endpoint, seconds):
+    if METRICS_ENABLED:
+        REQUEST_SECONDS.observe(seconds, endpoint)
+
+def record_llm(metadata):
+    """Record the token counts and eval durations Ollama reports with a finished reply."""
+    if not metadata or "eval_count" not in metadata:
+        return
+    timings = _current.get()
+    if timings is None and not METRICS_ENABLED:
+        return
+    prompt_tokens = metadata.get("prompt_eval_count") or 0
+    completion_tokens = metadata.get("eval_count") or 0
+    # Ollama reports durations in nanoseconds
+    phases = {
+        "prompt_eval": (metadata.get("prompt_eval_duration") or 0) / 1e9,
+        "eval": (metadata.get("eval_duration") or 0) / 1e9,
+        "load": (metadata.get("load_duration") or 0) / 1e9,
+    }
+    if METRICS_ENABLED:
+        LLM_TOKENS.inc(prompt_tokens, "prompt")
+        LLM_TOKENS.inc(completion_tokens, "completion")
+        for phase, seconds in phases.items():
+            LLM_EVAL_SECONDS.observe(seconds, phase)
+    if timings is not None:
+        llm = timings.llm
+        llm["calls"] += 1
+        llm["prompt_tokens"] += prompt_tokens
+        llm["completion_tokens"] += completion_tokens
+        llm["prompt_eval_seconds"] += phases["prompt_eval"]
+        llm["eval_seconds"] += phases["eval"]
+        llm["load_seconds"] += phases["load"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -9,7 +9,10 @@ class Conversation(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, default="New Conversation")
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Rolling summary of the messages up to summary_message_id (see app/memory.py)
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
 
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
 
@@ -23,3 +26,8 @@ class Message(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     conversation = relationship("Conversation", back_populates="messages")
+
+    __table_args__ = (
+        # Serves per-conversation history queries ordered by time
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
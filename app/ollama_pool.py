@@ -0,0 +1,321 @@
+"""Pools of Ollama servers for chat and embedding calls.
+
+FORGE_OLLAMA_URLS lists the servers to spread calls over. Each call goes to
+the available server with the fewest calls outstanding (ties take turns),
+so a slow or busy box gets less new work. A server that cannot be reached,
+times out or answers with a 5xx is ejected for EJECT_SECONDS and the call
+is retried on another one; a stream is only retried if it failed before
+its first chunk, since the tokens already sent cannot be taken back. Any
+other error (a 4xx: a bad request, a model that is not pulled) would come
+back the same from every server, so it is raised at once and the server
+stays in the pool. A background task probes every server's
+/api/tags each PROBE_INTERVAL seconds, ejecting unreachable ones and
+bringing recovered ones back early. If every server is ejected, calls still
+go to the one due back first rather than failing outright.
+
+With FORGE_OLLAMA_EMBED_URLS set, embeddings get a pool of their own, so
+ingestion and query embeddings do not queue behind generations.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+# The single Ollama server used when FORGE_OLLAMA_URLS is not set
+OLLAMA_URL = os.getenv("FORGE_OLLAMA_URL", "http://localhost:11434")
+# Comma-separated Ollama servers for chat, and for embeddings unless FORGE_OLLAMA_EMBED_URLS is set
+OLLAMA_URLS = os.getenv("FORGE_OLLAMA_URLS", OLLAMA_URL)
+OLLAMA_EMBED_URLS = os.getenv("FORGE_OLLAMA_EMBED_URLS", "")
+# Servers a call is tried on before its error is raised
+POOL_ATTEMPTS = int(os.getenv("FORGE_OLLAMA_ATTEMPTS", "3"))
+# Seconds a failed server gets no calls (unless a probe finds it healthy first)
+EJECT_SECONDS = float(os.getenv("FORGE_OLLAMA_EJECT_SECONDS", "30"))
+# Seconds between health probes, and the probe's own timeout
+PROBE_INTERVAL = float(os.getenv("FORGE_OLLAMA_PROBE_INTERVAL", "10"))
+PROBE_TIMEOUT = 2.0
+
+# How langchain_community's Ollama clients report an HTTP error status
+STATUS_RE = re.compile(r"status code (\d{3})")
+
+def parse_urls(value):
+    return [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+
+def http_status(error):
+    """The HTTP status an Ollama client error carries, or None."""
+    # ollama.ResponseError has status_code, as does a requests response
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        match = STATUS_RE.search(str(error))
+        status = int(match.group(1)) if match else None
+    return status
+
+def backend_failed(error):
+    """Whether error is the server's fault (unreachable, timed out, 5xx) rather than the request's."""
+    import aiohttp
+    import httpx
+    status = http_status(error)
+    if status is not None:
+        return status >= 500
+    # OSError covers ConnectionError, TimeoutError and requests' errors
+    return isinstance(error, (OSError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, httpx.TransportError))
+
+class Backend:
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        # time.monotonic() until which the backend gets no calls
+        self.ejected_until = 0.0
+        self.served = 0
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.ejected_until
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "available": self.available,
+            "outstanding": self.outstanding,
+            "served": self.served,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+class OllamaPool:
+    def __init__(self, urls, name="chat", attempts=POOL_ATTEMPTS, eject_seconds=EJECT_SECONDS,
+                 probe_timeout=PROBE_TIMEOUT):
+        if not urls:
+            raise ValueError(f"No Ollama servers configured for the {name} pool")
+        self.name = name
+        self.backends = [Backend(url) for url in urls]
+        self.attempts = max(1, min(attempts, len(self.backends)))
+        self.eject_seconds = eject_seconds
+        self.probe_timeout = probe_timeout
+        # Sync calls (ingestion, Chroma's query embedding) run on worker threads
+        self._lock = threading.Lock()
+        self._turn = 0
+
+    def acquire(self, tried=()):
+        """The least loaded backend not in `tried`, with the call counted as outstanding on it."""
+        with self._lock:
+            candidates = [backend for backend in self.backends if backend not in tried]
+            available = [backend for backend in candidates if backend.available]
+            if not available:
+                available = [min(candidates, key=lambda backend: backend.ejected_until)]
+            # Start the scan at a rotating offset so idle backends take turns
+            self._turn = (self._turn + 1) % len(available)
+            ordered = available[self._turn:] + available[:self._turn]
+            backend = min(ordered, key=lambda backend: backend.outstanding)
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend, error=None, served=True):
+        with self._lock:
+            backend.outstanding -= 1
+            if error is not None:
+                # A refused request (4xx) says nothing about the server's health
+                if backend_failed(error):
+                    self._eject(backend, error)
+            elif served:
+                backend.served += 1
+                backend.ejected_until = 0.0
+
+    def _eject(self, backend, error):
+        backend.failures += 1
+        backend.last_error = str(error) or type(error).__name__
+        backend.ejected_until = time.monotonic() + self.eject_seconds
+
+    def _give_up(self, backend, error, tried):
+        if not backend_failed(error):
+            # The request itself was refused: every server would answer the same
+            return True
+        if len(tried) >= self.attempts:
+            return True
+        print(f"Ollama {self.name} server {backend.url} failed ({error}); retrying on another")
+        return False
+
+    async def call(self, fn):
+        """await fn(backend) on the least loaded backend, retrying on another one if it fails."""
+        tried = []
+        while True:
+            backend = self.acquire(tried)
+            tried.append(backend)
+            try:
+                result = await fn(backend)
+            except Exception as e:
+                self.release(backend, e)
+                if self._give_up(backend, e, tried):
+                    raise
+                continue
+            except BaseException:
+                # Cancelled by the caller: not the backend's fault
+                self.release(backend, served=False)
+                raise
+            self.release(backend)
+            return result
+
+    def call_sync(self, fn):
+        """Blocking form of call()."""
+        tried = []
+        while True:
+            backend = self.acquire(tried)
+            tried.append(backend)
+            try:
+                result = fn(backend)
+            except Exception as e:
+                self.release(backend, e)
+                if self._give_up(backend, e, tried):
+                    raise
+                continue
+            except BaseException:
+                self.release(backend, served=False)
+                raise
+            self.release(backend)
+            return result
+
+    async def stream(self, fn):
+        """Yield from the async iterator fn(backend); only a stream that failed before its first item is retried."""
+        tried = []
+        while True:
+            backend = self.acquire(tried)
+            tried.append(backend)
+            stream = fn(backend)
+            started = False
+            try:
+                async for item in stream:
+                    started = True
+                    yield item
+            except Exception as e:
+                self.release(backend, e)
+                if started or self._give_up(backend, e, tried):
+                    raise
+                continue
+            except BaseException:
+                # The consumer closed the stream early: close ours too, which aborts the Ollama request
+                self.release(backend, served=False)
+                await stream.aclose()
+                raise
+            self.release(backend)
+            return
+
+    async def each(self, fn):
+        """await fn(url) on every backend (e.g. to load the model), ejecting the ones that fail (see backend_failed).
+
+        Raises the first error if no backend succeeded.
+        """
+        results = await asyncio.gather(*(fn(backend.url) for backend in self.backends), return_exceptions=True)
+        errors = [(backend, result) for backend, result in zip(self.backends, results)
+                  if isinstance(result, Exception)]
+        with self._lock:
+            for backend, error in errors:
+                if backend_failed(error):
+                    self._eject(backend, error)
+        if len(errors) == len(self.backends):
+            raise errors[0][1]
+
+    async def probe(self, backend):
+        from ollama import AsyncClient
+        try:
+            await asyncio.wait_for(AsyncClient(host=backend.url).list(), self.probe_timeout)
+        except Exception as e:
+            with self._lock:
+                self._eject(backend, e)
+            return False
+        with self._lock:
+            backend.ejected_until = 0.0
+        return True
+
+    async def run_probes(self, interval=PROBE_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.gather(*(self.probe(backend) for backend in self.backends))
+
+    def stats(self):
+        return {
+            "backends": [backend.stats() for backend in self.backends],
+            "available": sum(1 for backend in self.backends if backend.available),
+        }
+
+class PooledChatModel:
+    """The ChatOllama calls Forge makes (ainvoke, astream, invoke), spread over a pool.
+
+    Each backend gets its own client from `factory(url)`. Model settings
+    (model, temperature, num_ctx, ...) are read from the first one, since
+    every client is built with the same settings.
+    """
+
+    def __init__(self, pool, factory):
+        self.pool = pool
+        self.factory = factory
+        self._clients = {}
+        self._settings = self.client(pool.backends[0])
+
+    def client(self, backend):
+        if backend.url not in self._clients:
+            self._clients[backend.url] = self.factory(backend.url)
+        return self._clients[backend.url]
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the pool wrapper itself
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._settings, name)
+
+    async def ainvoke(self, messages, **kwargs):
+        return await self.pool.call(lambda backend: self.client(backend).ainvoke(messages, **kwargs))
+
+    def invoke(self, messages, **kwargs):
+        return self.pool.call_sync(lambda backend: self.client(backend).invoke(messages, **kwargs))
+
+    def astream(self, messages, **kwargs):
+        # Returned rather than iterated here, so closing it reaches the backend's stream
+        return self.pool.stream(lambda backend: self.client(backend).astream(messages, **kwargs))
+
+class PooledEmbeddings(Embeddings):
+    """OllamaEmbeddings spread over a pool; `model` names the model, for the embedding cache key."""
+
+    def __init__(self, pool, factory, model):
+        self.pool = pool
+        self.factory = factory
+        self.model = model
+        self._clients = {}
+
+    def client(self, backend):
+        if backend.url not in self._clients:
+            self._clients[backend.url] = self.factory(backend.url)
+        return self._clients[backend.url]
+
+    def embed_documents(self, texts):
+        return self.pool.call_sync(lambda backend: self.client(backend).embed_documents(texts))
+
+    def embed_query(self, text):
+        return self.pool.call_sync(lambda backend: self.client(backend).embed_query(text))
+
+    async def aembed_documents(self, texts):
+        return await self.pool.call(lambda backend: self.client(backend).aembed_documents(texts))
+
+    async def aembed_query(self, text):
+        return await self.pool.call(lambda backend: self.client(backend).aembed_query(text))
+
+_pools = {}
+
+def chat_pool():
+    if "chat" not in _pools:
+        _pools["chat"] = OllamaPool(parse_urls(OLLAMA_URLS), "chat")
+    return _pools["chat"]
+
+def embed_pool():
+    """The embedding pool; the chat pool itself unless FORGE_OLLAMA_EMBED_URLS is set."""
+    if "embed" not in _pools:
+        _pools["embed"] = OllamaPool(parse_urls(OLLAMA_EMBED_URLS), "embed") if OLLAMA_EMBED_URLS else chat_pool()
+    return _pools["embed"]
+
+def pools():
+    """The distinct pools in use."""
+    distinct = {id(pool): pool for pool in (chat_pool(), embed_pool())}
+    return list(distinct.values())
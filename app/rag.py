@@ -1,56 +1,150 @@
-from langchain_community.llms import Ollama
-from langchain_community.chat_models import ChatOllama
-from langchain_community.vectorstores import Chroma
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough, RunnableParallel
-from langchain_community.embeddings import OllamaEmbeddings
+import asyncio
+import os
+import time
 
-# Re-export for use in main.py
-__all__ = ['get_rag_chain', 'Chroma', 'Ollama', 'ChatOllama', 'OllamaEmbeddings']
+__all__ = ['RetrievalCache', 'chat_model_options', 'get_chat_model', 'get_embeddings', 'embedding_cache_stats',
+           'get_vectorstore', 'get_retriever', 'abatch_retrieve', 'get_store_version', 'bump_store_version']
+
+CHAT_MODEL = "phi3"
+EMBED_MODEL = "mxbai-embed-large"
+# How long Ollama keeps a model loaded after its last request
+OLLAMA_KEEP_ALIVE = os.getenv("FORGE_OLLAMA_KEEP_ALIVE", "30m")
+# Context window and CPU threads for the chat model; unset uses Ollama's
+# defaults. Every request must send the same values: a change makes Ollama
+# reload the model and drop its prompt cache.
+OLLAMA_NUM_CTX = int(os.getenv("FORGE_OLLAMA_NUM_CTX", "0")) or None
+OLLAMA_NUM_THREAD = int(os.getenv("FORGE_OLLAMA_NUM_THREAD", "0")) or None
+
+# "chroma" searches data/chroma_db; "numpy" searches the memory-mapped
+# matrix that ingest.py exports next to it (see app/vector_index.py)
+RETRIEVER_BACKEND = os.getenv("FORGE_RETRIEVER_BACKEND", "chroma")
+RETRIEVER_K = 3
 
 DB_PATH = "data/chroma_db"
+# Written by ingest.py every time it changes the vector store
+VERSION_PATH = os.path.join(DB_PATH, "VERSION")
+
+def keep_alive_seconds(value=OLLAMA_KEEP_ALIVE):
+    """A keep-alive such as "30m", "1h" or "-1" in seconds; OllamaEmbeddings only takes an integer."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+# LangChain integrations are imported inside the factories: they take most of
+# a second to import, which would otherwise delay the server accepting requests.
+
+def chat_model_options():
+    """The Ollama options get_chat_model() sends, for requests made without it (the warm-up)."""
+    options = {"num_ctx": OLLAMA_NUM_CTX, "num_thread": OLLAMA_NUM_THREAD}
+    return {name: value for name, value in options.items() if value is not None}
+
+def get_chat_model():
+    """ChatOllama spread over the chat pool of Ollama servers (see app/ollama_pool.py)."""
+    from langchain_community.chat_models import ChatOllama
+    from app.ollama_pool import PooledChatModel, chat_pool
+    return PooledChatModel(chat_pool(), lambda url: ChatOllama(
+        base_url=url, model=CHAT_MODEL, temperature=0.3, keep_alive=OLLAMA_KEEP_ALIVE, **chat_model_options()
+    ))
+
+_embeddings = None
+
+def get_embeddings():
+    """Process-wide embedding function, backed by the on-disk embedding cache.
+
+    ingest.py and the server use the same client and cache file, so a text
+    embedded once is never sent to Ollama again.
+    """
+    global _embeddings
+    if _embeddings is None:
+        from langchain_ollama import OllamaEmbeddings
+        from app.embedding_cache import CachedEmbeddings
+        from app.ollama_pool import PooledEmbeddings, embed_pool
+        _embeddings = CachedEmbeddings(PooledEmbeddings(embed_pool(), lambda url: OllamaEmbeddings(
+            base_url=url, model=EMBED_MODEL, keep_alive=keep_alive_seconds()
+        ), EMBED_MODEL))
+    return _embeddings
+
+def embedding_cache_stats():
+    return _embeddings.stats() if _embeddings is not None else None
 
-def get_rag_chain():
-    # 1. Initialize Embeddings using Ollama
-    embeddings = OllamaEmbeddings(model="mxbai-embed-large")
-
-    # 2. Load Vector Store
-    vectorstore = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-
-    # 3. Initialize LLM (Ollama)
-    llm = Ollama(model="phi3")
-
-    # 4. Define Prompt
-    template = """
-    You are a helpful and expert writing coach named Forge. 
-    Your goal is to help the user improve their writing by providing constructive critique and tips.
-    
-    Use the following pieces of retrieved context (writing guides) to analyze the user's text and provide specific feedback.
-    If the context doesn't apply, rely on your general knowledge but prioritize the guides.
-    
-    Context:
-    {context}
-    
-    User Text:
-    {input}
-    
-    Critique:
+def get_vectorstore():
+    from langchain_community.vectorstores import Chroma
+    return Chroma(persist_directory=DB_PATH, embedding_function=get_embeddings())
+
+def get_retriever(backend=RETRIEVER_BACKEND):
+    if backend == "numpy":
+        from app.vector_index import VectorIndex, VectorIndexRetriever
+        return VectorIndexRetriever(index=VectorIndex(), embeddings=get_embeddings(), k=RETRIEVER_K)
+    if backend == "chroma":
+        return get_vectorstore().as_retriever(search_kwargs={"k": RETRIEVER_K})
+    raise ValueError(f"Unknown retriever backend: {backend}")
+
+async def abatch_retrieve(retriever, queries):
+    """Documents for each query, with all the query embeddings requested at once where the retriever allows."""
+    if hasattr(retriever, "abatch_search"):
+        return await retriever.abatch_search(queries)
+    vectorstore = getattr(retriever, "vectorstore", None)
+    embeddings = getattr(vectorstore, "embeddings", None)
+    if not hasattr(embeddings, "aembed_queries"):
+        return await asyncio.gather(*(retriever.ainvoke(query) for query in queries))
+    vectors = await embeddings.aembed_queries(queries)
+    k = retriever.search_kwargs.get("k", RETRIEVER_K)
+    return await asyncio.to_thread(lambda: [vectorstore.similarity_search_by_vector(vector, k) for vector in vectors])
+
+def get_store_version():
+    """Current vector store version, "0" if the store was never versioned."""
+    try:
+        with open(VERSION_PATH, "r") as f:
+            return f.read().strip() or "0"
+    except OSError:
+        return "0"
+
+def bump_store_version():
+    os.makedirs(DB_PATH, exist_ok=True)
+    version = str(time.time_ns())
+    with open(VERSION_PATH, "w") as f:
+        f.write(version)
+    return version
+
+class RetrievalCache:
+    """Retrieved documents keyed by (query, vector store version).
+
+    Entries from an older store version are dropped as soon as a newer
+    version is seen, so re-running ingest.py invalidates the cache.
     """
-    prompt = ChatPromptTemplate.from_template(template)
-
-    # 5. Create Chain using LCEL
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
-
-    rag_chain_from_docs = (
-        RunnablePassthrough.assign(context=(lambda x: format_docs(x["context"])))
-        | prompt
-        | llm
-    )
-
-    rag_chain_with_source = RunnableParallel(
-        {"context": retriever, "input": RunnablePassthrough()}
-    ).assign(answer=rag_chain_from_docs)
-    
-    return rag_chain_with_source
\ No newline at end of file
+
+    def __init__(self):
+        self._entries = {}
+        self._version = None
+        self._version_mtime = None
+        self.hits = 0
+        self.misses = 0
+
+    def version(self):
+        # Only re-read the version file when it changed on disk
+        try:
+            mtime = os.stat(VERSION_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._version is None or mtime != self._version_mtime:
+            self._version_mtime = mtime
+            version = get_store_version()
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+        return self._version
+
+    def get(self, query):
+        docs = self._entries.get((query, self.version()))
+        if docs is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return docs
+
+    def put(self, query, docs):
+        self._entries[(query, self.version())] = docs
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
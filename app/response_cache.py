@@ -0,0 +1,116 @@
+"""Opt-in cache of coach responses for repeated submissions.
+
+A response is reused only when everything that shaped it is the same: the
+normalised user text, the retrieved tips, the history window sent with the
+prompt and the model parameters. Entries live in an in-memory LRU with a
+TTL, backed by an optional SQLite file that survives restarts.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+RESPONSE_CACHE_ENABLED = os.getenv("FORGE_RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_SIZE = int(os.getenv("FORGE_RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("FORGE_RESPONSE_CACHE_TTL", str(24 * 3600)))
+# Empty string disables the on-disk tier
+RESPONSE_CACHE_PATH = os.getenv("FORGE_RESPONSE_CACHE_PATH", "data/response_cache.db")
+# The disk tier holds this many times as many entries as memory
+DISK_SIZE_FACTOR = 16
+
+def normalize_text(text):
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def make_key(user_text, tips, history, params):
+    payload = json.dumps(
+        {"text": normalize_text(user_text), "tips": tips, "history": history, "params": params},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, path=RESPONSE_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._db = None
+        self._puts = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_expires ON response_cache (expires_at)")
+            self._db.commit()
+
+    def _remember(self, key, expires_at, response):
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, expires_at FROM response_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    self._remember(key, row[1], row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, response)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO response_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, expires_at),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._prune()
+            self._db.commit()
+
+    def _prune(self):
+        self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+        # Keep the entries that expire last, i.e. the most recently written
+        self._db.execute(
+            "DELETE FROM response_cache WHERE key NOT IN "
+            "(SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT ?)",
+            (self.max_entries * DISK_SIZE_FACTOR,),
+        )
+
+    # The disk tier is blocking I/O, so async callers go through a thread
+
+    async def aget(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key, response):
+        await asyncio.to_thread(self.put, key, response)
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "entries": len(self._entries)}
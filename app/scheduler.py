@@ -0,0 +1,227 @@
+"""Admission control in front of Ollama.
+
+Ollama runs only a few generations at once; past that, requests sent to it
+queue up inside the server with no bound, and under load they all time out
+together. LLMScheduler hands out a fixed number of LLM slots instead:
+
+- requests beyond the concurrency limit wait in a fair queue, which
+  round-robins between conversations so one busy conversation cannot starve
+  the others;
+- when the queue is full a request is turned away at once (429), and a
+  request that waited longer than the queue timeout gives up (503), in both
+  cases before anything is written to the database.
+
+InflightRequests lets a repeated submission (same conversation, same text,
+e.g. a double-clicked send button) share the result of the one already
+running instead of generating a second reply. It also watches each caller's
+connection: once every client waiting on a reply has disconnected (a closed
+tab, or a resubmit that did not join in time), the work is cancelled, which
+gives up its queue place or aborts its Ollama request.
+"""
+import asyncio
+import os
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from app.metrics import LLM_ACTIVE, LLM_QUEUED, LLM_REJECTED, span
+
+# Requests that may hold an LLM slot at once; match Ollama's OLLAMA_NUM_PARALLEL
+LLM_CONCURRENCY = int(os.getenv("FORGE_LLM_CONCURRENCY", "2"))
+# Requests that may wait for a slot before new ones get a 429
+LLM_QUEUE_DEPTH = int(os.getenv("FORGE_LLM_QUEUE_DEPTH", "32"))
+# Seconds a request may wait for a slot before it gets a 503
+LLM_QUEUE_TIMEOUT = float(os.getenv("FORGE_LLM_QUEUE_TIMEOUT", "30"))
+# Cancel a reply's work once every client waiting for it has disconnected
+CANCEL_ON_DISCONNECT = os.getenv("FORGE_CANCEL_ON_DISCONNECT", "1") == "1"
+# Seconds between checks of a waiting client's connection
+DISCONNECT_POLL_INTERVAL = 0.25
+# Seconds abandoned work keeps running for a resubmit of the same text to join it
+ABANDON_GRACE = 1.0
+
+class QueueFull(Exception):
+    pass
+
+class QueueTimeout(Exception):
+    pass
+
+class ClientDisconnected(Exception):
+    pass
+
+class LLMScheduler:
+    def __init__(self, concurrency=LLM_CONCURRENCY, max_depth=LLM_QUEUE_DEPTH, timeout=LLM_QUEUE_TIMEOUT):
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.timeout = timeout
+        self.active = 0
+        self.depth = 0
+        # Fairness key -> waiting futures; served round-robin, oldest lane first
+        self._lanes = OrderedDict()
+        self.served = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _update_gauges(self):
+        LLM_QUEUED.set(self.depth)
+        LLM_ACTIVE.set(self.active)
+
+    async def acquire(self, key=None):
+        """Wait for a slot. `key` groups requests for fairness (None: a lane of its own)."""
+        if self.active < self.concurrency and not self.depth:
+            self.active += 1
+            self.served += 1
+            self._update_gauges()
+            return
+        if self.depth >= self.max_depth:
+            self.rejected += 1
+            LLM_REJECTED.inc(1, "queue_full")
+            raise QueueFull()
+
+        future = asyncio.get_running_loop().create_future()
+        lane_key = key if key is not None else object()
+        self._lanes.setdefault(lane_key, deque()).append(future)
+        self.depth += 1
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                self._remove(lane_key, future)
+            if isinstance(exc, asyncio.TimeoutError):
+                self.timed_out += 1
+                LLM_REJECTED.inc(1, "timeout")
+                raise QueueTimeout() from None
+            raise
+        self.served += 1
+
+    def try_acquire(self):
+        """Take a slot only if one is free and nobody is queued for it; never waits."""
+        if self.active < self.concurrency and not self.depth:
+            self.active += 1
+            self.served += 1
+            self._update_gauges()
+            return True
+        return False
+
+    def _remove(self, lane_key, future):
+        lane = self._lanes.get(lane_key)
+        if lane is None or future not in lane:
+            return
+        lane.remove(future)
+        self.depth -= 1
+        if not lane:
+            del self._lanes[lane_key]
+        self._update_gauges()
+
+    def release(self):
+        # Hand the slot straight to the next waiter, so `active` never drops
+        # below the limit while requests are queued
+        while self._lanes:
+            lane_key, lane = next(iter(self._lanes.items()))
+            future = lane.popleft()
+            self.depth -= 1
+            if lane:
+                self._lanes.move_to_end(lane_key)
+            else:
+                del self._lanes[lane_key]
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def slot(self, key=None):
+        with span("queue_wait"):
+            await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queued": self.depth,
+            "concurrency": self.concurrency,
+            "max_depth": self.max_depth,
+            "served": self.served,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+class Inflight:
+    def __init__(self, task):
+        self.task = task
+        self.callers = 0
+
+class InflightRequests:
+    """Shares one running computation between callers that use the same key.
+
+    The work is cancelled once no caller is waiting for it any more; with a
+    key, only after ABANDON_GRACE seconds, so a resubmit can still join it.
+    """
+
+    def __init__(self, cancel_abandoned=CANCEL_ON_DISCONNECT, poll_interval=DISCONNECT_POLL_INTERVAL,
+                 grace=ABANDON_GRACE):
+        self.cancel_abandoned = cancel_abandoned
+        self.poll_interval = poll_interval
+        self.grace = grace
+        self._running = {}
+        self.joined = 0
+        self.disconnected = 0
+        self.cancelled = 0
+
+    async def run(self, key, factory, is_disconnected=None):
+        """await factory(), or the same key's running call of it.
+
+        `is_disconnected` is polled while waiting (Starlette's
+        Request.is_disconnected); ClientDisconnected is raised once it
+        returns True.
+        """
+        entry = self._running.get(key) if key is not None else None
+        if entry is None:
+            entry = Inflight(asyncio.ensure_future(factory()))
+            if key is not None:
+                self._running[key] = entry
+                entry.task.add_done_callback(lambda _: self._forget(key, entry))
+        else:
+            self.joined += 1
+        entry.callers += 1
+        try:
+            # The task is never cancelled with one caller: others may still be waiting on it
+            return await self._wait(entry.task, is_disconnected)
+        finally:
+            entry.callers -= 1
+            if self.cancel_abandoned and not entry.callers and not entry.task.done():
+                if key is None:
+                    self._abandon(entry)
+                else:
+                    asyncio.get_running_loop().call_later(self.grace, self._abandon, entry)
+
+    async def _wait(self, task, is_disconnected):
+        if is_disconnected is None or not self.cancel_abandoned:
+            return await asyncio.shield(task)
+        while True:
+            done, _ = await asyncio.wait([task], timeout=self.poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                self.disconnected += 1
+                raise ClientDisconnected()
+
+    def _abandon(self, entry):
+        if not entry.callers and not entry.task.done():
+            self.cancelled += 1
+            entry.task.cancel()
+
+    def _forget(self, key, entry):
+        if self._running.get(key) is entry:
+            del self._running[key]
+
+    def stats(self):
+        return {"in_flight": len(self._running), "joined": self.joined,
+                "disconnected": self.disconnected, "cancelled": self.cancelled}
@@ -1,69 +1,30 @@
 # Tavily Reddit Scraper for Writing Tips
-import json
-import time
 import os
 from tavily import TavilyClient
 from dotenv import load_dotenv
 from pathlib import Path
+from app.scraper import ScrapeJob, scrape
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
 
-DATA_PATH = "data/guides.json"
 SUBREDDITS = ["writing", "screenwriting"]
 SEARCH_QUERIES = ["writing tips", "resources", "advice", "how to write"]
 MAX_RESULTS = 100  # per subreddit/query
-RATE_LIMIT_SLEEP = 2  # seconds between requests
 
-def scrape_reddit_writing_tips():
-	api_key = os.getenv("TAVILY_API_KEY")
-	if not api_key:
-		raise RuntimeError("TAVILY_API_KEY not set in environment.")
-	client = TavilyClient(api_key=api_key)
-	all_tips = []
-	for subreddit in SUBREDDITS:
-		for query in SEARCH_QUERIES:
-			print(f"Scraping r/{subreddit} for '{query}'...")
-			try:
-				results = client.search(
-					query=f"{query} site:reddit.com/r/{subreddit}",
-					max_results=MAX_RESULTS,
-					timeout=30
-				)
-				# Save raw results for inspection
-				raw_path = f"data/raw_scraped_data/raw_reddit_{subreddit}_{query.replace(' ', '_')}.json"
-				with open(raw_path, "w") as rawf:
-					json.dump(results, rawf, indent=2)
-				# Filter and sanitize results
-				for post in results:
-					if isinstance(post, dict):
-						title = post.get("title", "Untitled")
-						content = post.get("snippet", "")
-						# Only save if content is not a generic field name or empty
-						if content and content.lower() not in ["query", "answer", "results", "images", "response_time", "request_id", "follow_up_questions"]:
-							tip = {"title": title, "content": content}
-							all_tips.append(tip)
-					elif isinstance(post, str):
-						# Only save if string looks like a tip (not a field name)
-						if post and post.lower() not in ["query", "answer", "results", "images", "response_time", "request_id", "follow_up_questions"]:
-							tip = {"title": "Untitled", "content": post}
-							all_tips.append(tip)
-				time.sleep(RATE_LIMIT_SLEEP)
-			except Exception as e:
-				print(f"Error scraping {subreddit} for '{query}': {e}")
-				time.sleep(RATE_LIMIT_SLEEP * 2)
-	print(f"Total tips scraped: {len(all_tips)}")
-	# Load existing tips
-	try:
-		with open(DATA_PATH, "r") as f:
-			existing = json.load(f)
-	except Exception:
-		existing = []
-	# Merge and deduplicate
-	titles = set(tip["title"] for tip in existing)
-	new_tips = [tip for tip in all_tips if tip["title"] not in titles]
-	merged = existing + new_tips
-	with open(DATA_PATH, "w") as f:
-		json.dump(merged, f, indent=2)
-	print(f"Saved {len(merged)} total tips to {DATA_PATH}")
+def reddit_jobs():
+	return [
+		ScrapeJob(source=subreddit, query=query, search_query=f"{query} site:reddit.com/r/{subreddit}")
+		for subreddit in SUBREDDITS
+		for query in SEARCH_QUERIES
+	]
+
+def scrape_reddit_writing_tips(client=None):
+	# Any client with a Tavily-style search() works, e.g. a stub for offline runs
+	if client is None:
+		api_key = os.getenv("TAVILY_API_KEY")
+		if not api_key:
+			raise RuntimeError("TAVILY_API_KEY not set in environment.")
+		client = TavilyClient(api_key=api_key)
+	return scrape(client, "reddit", reddit_jobs(), max_results=MAX_RESULTS)
 
 if __name__ == "__main__":
 	scrape_reddit_writing_tips()
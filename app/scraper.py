@@ -0,0 +1,200 @@
+"""Shared asyncio engine for the Tavily scrapers (scrape_reddit.py, scrape_websites.py).
+
+Each scraper turns its sources and queries into ScrapeJobs. The engine runs
+them concurrently under a token-bucket rate limit, retries failed searches
+with exponential backoff, and appends every finished (source, query) pair
+with its tips to a checkpoint file, so a rerun after a crash or Ctrl-C
+skips the pairs already done. The search client is any object with a
+Tavily-style `search(query, max_results, timeout)` method, sync or async,
+so the engine can run offline against a stub.
+"""
+import asyncio
+import inspect
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+
+from app.guides import GUIDES_PATH, add_guides, iter_guides
+
+RAW_DIR = "data/raw_scraped_data"
+# Requests per second across all workers, and how many may go out back to back
+SCRAPE_RATE = float(os.getenv("FORGE_SCRAPE_RATE", "0.5"))
+SCRAPE_BURST = int(os.getenv("FORGE_SCRAPE_BURST", "2"))
+# Searches in flight at once
+SCRAPE_CONCURRENCY = int(os.getenv("FORGE_SCRAPE_CONCURRENCY", "4"))
+# Attempts per search, with exponential backoff between them
+SCRAPE_ATTEMPTS = int(os.getenv("FORGE_SCRAPE_ATTEMPTS", "4"))
+SCRAPE_TIMEOUT = 30
+
+# Tavily response fields that older scraper versions mistook for results
+FIELD_NAMES = {"query", "answer", "results", "images", "response_time", "request_id", "follow_up_questions"}
+
+@dataclass(frozen=True)
+class ScrapeJob:
+    source: str
+    query: str
+    # The query sent to the search API, e.g. "writing tips site:reddit.com/r/writing"
+    search_query: str
+
+    @property
+    def key(self):
+        return f"{self.source}|{self.query}"
+
+    def raw_path(self, prefix):
+        slug = f"{self.source}_{self.query}".replace(".", "_").replace("/", "_").replace(" ", "_")
+        return os.path.join(RAW_DIR, f"raw_{prefix}_{slug}.json")
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+@dataclass
+class RetryPolicy:
+    attempts: int = SCRAPE_ATTEMPTS
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt):
+        # Full jitter keeps workers that failed together from retrying together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class Checkpoint:
+    """Append-only JSONL record of finished jobs and the tips each produced."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash; that job runs again
+                        continue
+                    self.done[entry["key"]] = entry["tips"]
+
+    def record(self, job, tips):
+        self.done[job.key] = tips
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"key": job.key, "tips": tips}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def extract_tips(response):
+    """Tips ({"title", "content"}) from a Tavily search response."""
+    results = response.get("results", []) if isinstance(response, dict) else response
+    tips = []
+    for post in results or []:
+        if isinstance(post, dict):
+            title = post.get("title", "Untitled")
+            content = post.get("content") or post.get("snippet", "")
+            if content and content.lower() not in FIELD_NAMES:
+                tips.append({"title": title, "content": content})
+        elif isinstance(post, str):
+            if post and post.lower() not in FIELD_NAMES:
+                tips.append({"title": "Untitled", "content": post})
+    return tips
+
+def merge_guides(tips, path=GUIDES_PATH):
+    """Add tips whose title is not in the guides file yet; returns how many were added."""
+    titles = set(tip["title"] for tip in iter_guides(path))
+    new_tips = []
+    for tip in tips:
+        if tip["title"] not in titles:
+            titles.add(tip["title"])
+            new_tips.append(tip)
+    add_guides(new_tips, path)
+    return len(new_tips)
+
+class Scraper:
+    def __init__(self, client, name, rate=SCRAPE_RATE, burst=SCRAPE_BURST, concurrency=SCRAPE_CONCURRENCY,
+                 retry=None, max_results=100, checkpoint_path=None):
+        self.client = client
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.retry = retry or RetryPolicy()
+        self.max_results = max_results
+        os.makedirs(RAW_DIR, exist_ok=True)
+        self.checkpoint = Checkpoint(checkpoint_path or os.path.join(RAW_DIR, f"checkpoint_{name}.jsonl"))
+        self.requests = 0
+        self.failures = 0
+
+    async def search(self, search_query):
+        kwargs = {"query": search_query, "max_results": self.max_results, "timeout": SCRAPE_TIMEOUT}
+        if inspect.iscoroutinefunction(self.client.search):
+            return await self.client.search(**kwargs)
+        return await asyncio.to_thread(self.client.search, **kwargs)
+
+    async def run_job(self, job):
+        for attempt in range(self.retry.attempts):
+            await self.bucket.acquire()
+            self.requests += 1
+            try:
+                response = await self.search(job.search_query)
+                break
+            except Exception as e:
+                if attempt + 1 == self.retry.attempts:
+                    self.failures += 1
+                    print(f"Giving up on {job.source} for '{job.query}': {e}")
+                    return
+                delay = self.retry.delay(attempt)
+                print(f"Error scraping {job.source} for '{job.query}' ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        # Save raw results for inspection
+        with open(job.raw_path(self.name), "w") as rawf:
+            json.dump(response, rawf, indent=2)
+        tips = extract_tips(response)
+        self.checkpoint.record(job, tips)
+        print(f"Scraped {job.source} for '{job.query}': {len(tips)} tips")
+
+    async def run(self, jobs):
+        """Run the jobs not in the checkpoint; returns the tips of every finished job, old and new."""
+        pending = [job for job in jobs if job.key not in self.checkpoint.done]
+        print(f"{len(jobs) - len(pending)} of {len(jobs)} searches already done, {len(pending)} to go.")
+        queue = asyncio.Queue()
+        for job in pending:
+            queue.put_nowait(job)
+
+        async def worker():
+            while not queue.empty():
+                await self.run_job(queue.get_nowait())
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+        keys = [job.key for job in jobs]
+        return [tip for key in keys for tip in self.checkpoint.done.get(key, [])]
+
+def scrape(client, name, jobs, data_path=GUIDES_PATH, **options):
+    """Run the jobs, merge their tips into data_path and clear the checkpoint once all are done."""
+    start = time.perf_counter()
+    scraper = Scraper(client, name, **options)
+    tips = asyncio.run(scraper.run(jobs))
+    print(f"Total tips scraped: {len(tips)} ({scraper.requests} requests, {scraper.failures} failed searches, "
+          f"{time.perf_counter() - start:.1f}s)")
+    added = merge_guides(tips, data_path)
+    print(f"Added {added} new tips to {data_path}")
+    if not scraper.failures:
+        # Everything is in the guides file now; the next run starts fresh
+        os.remove(scraper.checkpoint.path)
+    return tips
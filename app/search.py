@@ -0,0 +1,203 @@
+"""Full-text search over chat history with SQLite FTS5.
+
+Two external-content FTS5 tables index messages.content and
+conversations.title; they store only the index, reading the text from the
+tables themselves. Triggers keep them in step with every insert, update
+and delete, including the per-message deletes of a conversation delete.
+Words are stemmed (porter), so "pacing" also finds "paced".
+
+init_db() creates the index and, the first time, fills it from the
+messages already in the database; an index never seen by the delete
+trigger would otherwise be corrupted by deletes of unindexed rows. It can
+be rebuilt from scratch at any time (after restoring a backup, say) with
+
+    python -m app.search --backfill
+"""
+import argparse
+import html
+import os
+import re
+import time
+
+from sqlalchemy import bindparam, text
+
+# Matches ranked by bm25 per query. A query matching more rows than this
+# ranks only the newest of them, so a search for a common word costs the
+# same at a million messages as at ten thousand.
+RANK_WINDOW = int(os.getenv("FORGE_SEARCH_RANK_WINDOW", "10000"))
+
+# Words of context around the matches in a snippet
+SNIPPET_WORDS = 16
+# Unprintable markers around matched words, swapped for <mark> tags once the snippet is HTML-escaped
+_MATCH_START, _MATCH_END = "\x02", "\x03"
+WORD_RE = re.compile(r"\w+")
+
+SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content, content='messages', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+        title, content='conversations', content_rowid='id', tokenize='porter unicode61')""",
+    # An external-content index is told what to forget with the old values
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS conversations_fts_insert AFTER INSERT ON conversations BEGIN
+        INSERT INTO conversations_fts(rowid, title) VALUES (new.id, new.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS conversations_fts_delete AFTER DELETE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS conversations_fts_update AFTER UPDATE OF title ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO conversations_fts(rowid, title) VALUES (new.id, new.title);
+    END""",
+]
+
+# Walking the matches newest first stops early; bm25() then scores only the rows above the floor
+FLOOR_SQL = "SELECT rowid FROM {table} WHERE {table} MATCH :query ORDER BY rowid DESC LIMIT 1 OFFSET :window"
+RANK_SQL = """
+SELECT rowid, bm25({table}) AS score FROM {table}
+WHERE {table} MATCH :query AND rowid > :floor
+ORDER BY score, rowid DESC LIMIT :limit
+"""
+
+# Details and snippets, for the rows of one page only
+MESSAGE_HITS_SQL = f"""
+SELECT m.id AS message_id, m.conversation_id, c.title, m.role, m.created_at,
+       snippet(messages_fts, 0, char(2), char(3), '…', {SNIPPET_WORDS}) AS snippet
+FROM messages_fts
+JOIN messages m ON m.id = messages_fts.rowid
+JOIN conversations c ON c.id = m.conversation_id
+WHERE messages_fts MATCH :query AND messages_fts.rowid IN :ids
+"""
+CONVERSATION_HITS_SQL = f"""
+SELECT c.id AS conversation_id, c.title, c.updated_at AS created_at,
+       snippet(conversations_fts, 0, char(2), char(3), '…', {SNIPPET_WORDS}) AS snippet
+FROM conversations_fts
+JOIN conversations c ON c.id = conversations_fts.rowid
+WHERE conversations_fts MATCH :query AND conversations_fts.rowid IN :ids
+"""
+
+def create_search_index(connection):
+    """Create the FTS tables and triggers if missing, backfilling a newly created index.
+
+    Returns False where the database is not SQLite or SQLite lacks FTS5.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    options = {row[0] for row in connection.exec_driver_sql("PRAGMA compile_options")}
+    if "ENABLE_FTS5" not in options:
+        print("SQLite was built without FTS5; /search is unavailable")
+        return False
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    ).first()
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        start = time.perf_counter()
+        rebuild_search_index(connection)
+        print(f"Built the chat search index in {time.perf_counter() - start:.1f}s")
+    return True
+
+def rebuild_search_index(connection):
+    """Index every existing message and title from scratch."""
+    connection.exec_driver_sql("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    connection.exec_driver_sql("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+    # Merge the index into as few b-trees as possible for faster queries
+    connection.exec_driver_sql("INSERT INTO messages_fts(messages_fts) VALUES ('optimize')")
+    connection.exec_driver_sql("INSERT INTO conversations_fts(conversations_fts) VALUES ('optimize')")
+
+def to_match_query(query):
+    """FTS5 query for free text: every word must appear (stemmed, so "paced" matches "pacing").
+
+    Words are quoted, so input such as `"`, `-`, AND or NEAR( is never parsed
+    as FTS5 syntax. There is no prefix matching: a prefix term makes FTS5
+    merge the doclists of every word it covers again for each snippet, which
+    cost tens of milliseconds per page at 200k messages.
+    """
+    words = WORD_RE.findall(query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words)
+
+def render_snippet(snippet):
+    """HTML-escape a snippet and wrap the matched words in <mark>."""
+    return html.escape(snippet or "").replace(_MATCH_START, "<mark>").replace(_MATCH_END, "</mark>")
+
+def _ranked(db, table, kind, query, limit):
+    """(kind, rowid, bm25) of the best `limit` matches in an FTS table."""
+    params = {"query": query, "window": RANK_WINDOW, "limit": limit}
+    floor = db.execute(text(FLOOR_SQL.format(table=table)), params).scalar() or 0
+    rows = db.execute(text(RANK_SQL.format(table=table)), dict(params, floor=floor)).all()
+    return [(kind, row_id, score) for row_id, score in rows]
+
+def _details(db, sql, query, ids):
+    if not ids:
+        return {}
+    statement = text(sql).bindparams(bindparam("ids", expanding=True))
+    rows = db.execute(statement, {"query": query, "ids": ids}).mappings().all()
+    return {row["message_id"] if "message_id" in row else row["conversation_id"]: row for row in rows}
+
+def search(db, query, limit=20, offset=0):
+    """One page of matches, best first; returns (hits, next_offset or None).
+
+    A hit is a message (with its conversation) or a conversation whose title matched.
+    """
+    match = to_match_query(query)
+    if match is None:
+        return [], None
+    ranked = sorted(
+        _ranked(db, "messages_fts", "message", match, offset + limit + 1)
+        + _ranked(db, "conversations_fts", "conversation", match, offset + limit + 1),
+        key=lambda hit: (hit[2], -hit[1]),
+    )[offset:]
+    page = ranked[:limit]
+    messages = _details(db, MESSAGE_HITS_SQL, match, [row_id for kind, row_id, _ in page if kind == "message"])
+    conversations = _details(db, CONVERSATION_HITS_SQL, match,
+                             [row_id for kind, row_id, _ in page if kind == "conversation"])
+    hits = []
+    for kind, row_id, score in page:
+        row = (messages if kind == "message" else conversations).get(row_id)
+        if row is None:
+            # Deleted between the two queries
+            continue
+        hits.append({
+            "kind": kind,
+            "conversation_id": row["conversation_id"],
+            "title": row["title"],
+            "message_id": row.get("message_id"),
+            "role": row.get("role"),
+            "created_at": row["created_at"],
+            "snippet": render_snippet(row["snippet"]),
+            "score": score,
+        })
+    return hits, (offset + limit if len(ranked) > limit else None)
+
+if __name__ == "__main__":
+    from app.database import engine, init_db
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backfill", action="store_true", help="index all existing messages and titles")
+    parser.add_argument("query", nargs="?", help="search and print the first page of matches")
+    args = parser.parse_args()
+    init_db()
+    if args.backfill:
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            rebuild_search_index(connection)
+            messages = connection.exec_driver_sql("SELECT count(*) FROM messages").scalar()
+        print(f"Indexed {messages} messages in {time.perf_counter() - start:.1f}s")
+    if args.query:
+        from app.database import SessionLocal
+        with SessionLocal() as db:
+            hits, _ = search(db, args.query)
+        for hit in hits:
+            print(f"[{hit['kind']} in #{hit['conversation_id']} {hit['title']!r}] {hit['snippet']}")
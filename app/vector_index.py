@@ -0,0 +1,131 @@
+"""In-process vector index for the guides corpus.
+
+The corpus is about a thousand short tips, so an exact search is one
+matrix-vector product. ingest.py writes the embeddings as a contiguous,
+L2-normalised float32 matrix (.npy) plus a JSON sidecar with the documents;
+serving memory-maps the matrix, so it is paged in on demand and shared
+between processes. A re-run of ingest.py replaces both files, and the
+index maps the new ones at its next search.
+"""
+import hashlib
+import json
+import os
+from typing import Any, List
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+INDEX_PATH = "data/guides_index.npy"
+INDEX_DOCS_PATH = "data/guides_index.json"
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def matrix_digest(matrix):
+    return hashlib.sha256(np.ascontiguousarray(matrix).tobytes()).hexdigest()
+
+def write_index(embeddings, documents, metadatas, path=INDEX_PATH, docs_path=INDEX_DOCS_PATH):
+    """Write the matrix and sidecar; each file is swapped in atomically.
+
+    The sidecar records the matrix's digest, so a reader can tell a pair
+    written together from a new matrix next to the old sidecar.
+    """
+    matrix = np.ascontiguousarray(normalize(embeddings) if len(embeddings) else np.zeros((0, 0), dtype=np.float32))
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, matrix)
+    with open(docs_path + ".tmp", "w") as f:
+        json.dump({"documents": documents, "metadatas": metadatas, "matrix_sha256": matrix_digest(matrix)}, f)
+    os.replace(path + ".tmp", path)
+    os.replace(docs_path + ".tmp", docs_path)
+
+def file_identity(path):
+    # os.replace gives the new file a new inode, so this changes with every write_index
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns
+
+class VectorIndex:
+    def __init__(self, path=INDEX_PATH, docs_path=INDEX_DOCS_PATH):
+        self.path = path
+        self.docs_path = docs_path
+        self.identity = None
+        self.load()
+
+    def load(self):
+        identity = (file_identity(self.path), file_identity(self.docs_path))
+        matrix = np.load(self.path, mmap_mode="r")
+        with open(self.docs_path, "r") as f:
+            sidecar = json.load(f)
+        # Indexes written before the digest was recorded only have their lengths to compare
+        expected = sidecar.get("matrix_sha256")
+        if len(matrix) != len(sidecar["documents"]) or (expected and matrix_digest(matrix) != expected):
+            if self.identity is None:
+                raise ValueError(f"{self.path} and {self.docs_path} were not written together; "
+                                 "re-run python -m app.ingest")
+            # Caught between write_index's two replaces: keep the old pair until the next search
+            return
+        self.matrix = matrix
+        self.documents = [
+            Document(page_content=content, metadata=metadata or {})
+            for content, metadata in zip(sidecar["documents"], sidecar["metadatas"])
+        ]
+        self.identity = identity
+
+    def refresh(self):
+        """Map the files again if ingest.py has replaced them since they were loaded."""
+        try:
+            if (file_identity(self.path), file_identity(self.docs_path)) != self.identity:
+                self.load()
+        except OSError:
+            # Missing for a moment; the loaded files stay mapped
+            return
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query_vectors, k=3):
+        """Top-k (index, score) lists, best first, for each row of query_vectors."""
+        self.refresh()
+        queries = normalize(np.atleast_2d(query_vectors))
+        if not len(self.documents):
+            return [[] for _ in queries]
+        k = min(k, len(self.documents))
+        scores = queries @ self.matrix.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates])]
+            results.append([(int(i), float(row[i])) for i in ranked])
+        return results
+
+    def search_documents(self, query_vectors, k=3):
+        return [[self.documents[i] for i, _ in hits] for hits in self.search(query_vectors, k)]
+
+class VectorIndexRetriever(BaseRetriever):
+    """LangChain retriever over a VectorIndex; embeds queries with `embeddings`."""
+
+    index: Any
+    embeddings: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.index.search_documents(self.embeddings.embed_query(query), self.k)[0]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        return self.index.search_documents(await self.embeddings.aembed_query(query), self.k)[0]
+
+    def batch_search(self, queries: List[str]) -> List[List[Document]]:
+        """Embed several queries and search them with one matrix product."""
+        vectors = [self.embeddings.embed_query(query) for query in queries]
+        return self.index.search_documents(vectors, self.k)
+
+    async def abatch_search(self, queries: List[str]) -> List[List[Document]]:
+        """Async batch_search; the cached embeddings request all uncached queries at once."""
+        if hasattr(self.embeddings, "aembed_queries"):
+            vectors = await self.embeddings.aembed_queries(queries)
+        else:
+            vectors = [await self.embeddings.aembed_query(query) for query in queries]
+        return self.index.search_documents(vectors, self.k)
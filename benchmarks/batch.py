@@ -0,0 +1,76 @@
+"""Workshop throughput: drafts per minute posted one at a time to /submit against one /submit/batch job.
+
+A workshop's drafts arrive together. The one-at-a-time client posts each
+to /submit and waits for the reply before sending the next; the batch
+client posts them all to /submit/batch and streams the results. The fake
+model runs `--parallel` generations at once, like Ollama with
+OLLAMA_NUM_PARALLEL, and the scheduler and batch pool are sized to match.
+
+    python -m benchmarks.batch --drafts 40 --parallel 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+
+from app import batch, main
+from app.scheduler import LLMScheduler
+from benchmarks.fakes import FakeChatModel, FakeRetriever
+
+def draft(i):
+    sentence = f"Student {i} wrote about the lighthouse keeper who counted ships until the fog came in. "
+    return (sentence * 6).strip()
+
+async def one_at_a_time(client, texts):
+    for text in texts:
+        response = await client.post("/submit", json={"text": text})
+        response.raise_for_status()
+
+async def as_batch(client, texts):
+    response = await client.post("/submit/batch", json={"texts": texts})
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    async with client.stream("GET", f"/submit/batch/{job_id}/stream") as stream:
+        async for line in stream.aiter_lines():
+            if line and json.loads(line)["type"] == "done":
+                done = json.loads(line)
+    assert done["status"] == "done" and done["completed"] == len(texts), done
+
+async def run(args):
+    # The in-process transport does not run the lifespan, so install the agents directly
+    main.coach = main.AgentCCoach(FakeChatModel(
+        latency=args.llm_latency, tokens=args.reply_tokens, tokens_per_second=args.token_rate, parallel=args.parallel,
+    ))
+    main.librarian = main.AgentBLibrarian(FakeRetriever(latency=0.05))
+    main.llm_scheduler = LLMScheduler(concurrency=args.parallel)
+    batch.BATCH_CONCURRENCY = args.parallel
+    texts = [draft(i) for i in range(args.drafts)]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        rows = []
+        for name, mode in (("one at a time", one_at_a_time), ("batch", as_batch)):
+            start = time.perf_counter()
+            await mode(client, texts)
+            elapsed = time.perf_counter() - start
+            rows.append((name, elapsed, args.drafts / elapsed * 60))
+
+    print(f"{args.drafts} drafts, model runs {args.parallel} at once")
+    print(f"{'mode':>14} {'seconds':>8} {'drafts/min':>11}")
+    for name, elapsed, per_minute in rows:
+        print(f"{name:>14} {elapsed:>8.2f} {per_minute:>11.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drafts", type=int, default=40)
+    parser.add_argument("--parallel", type=int, default=2, help="generations the fake model runs at once")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--token-rate", type=float, default=100)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,106 @@
+"""Chat history search: FTS5 /search against the client-side scan of every message it replaces.
+
+Fills a scratch database with `--messages` critique-like messages (the
+FTS triggers indexing them as they are written), then times:
+
+- the write cost of the triggers, as messages/s inserted with and without them;
+- a full backfill (`python -m app.search --backfill`);
+- /search's query for a few queries, rare to common, against loading every
+  message (what GET /chats hands the client) and filtering in Python.
+
+    python -m benchmarks.chat_search --messages 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app import models
+from app.database import SessionLocal, engine, init_db
+from app.search import rebuild_search_index, search
+from benchmarks.fakes import percentile
+
+WORDS = ("pacing dialogue tension scene character voice opening ending chapter paragraph sentence rhythm "
+         "description detail conflict motive setting mood tone verb adjective adverb metaphor image reader "
+         "draft revision stakes arc flashback prologue narrator perspective").split()
+FILLER = "the a your this that with and but in of to is feels reads could might".split()
+QUERIES = ["xylophone", "flashback prologue", "dialogue pacing", "the"]
+
+def message(rng):
+    words = [rng.choice(WORDS) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(rng.randint(20, 120))]
+    return " ".join(words).capitalize() + "."
+
+def fill(connection, rng, count, per_conversation=20):
+    """Insert about `count` messages; returns messages inserted per second, or None if there were none."""
+    now = datetime.utcnow().isoformat(sep=" ")
+    start = connection.exec_driver_sql("SELECT coalesce(max(id), 0) FROM conversations").scalar()
+    conversations = [(start + i + 1, f"Draft {start + i + 1}", now, now) for i in range(count // per_conversation)]
+    if not conversations:
+        # executemany needs at least one row
+        return None
+    connection.exec_driver_sql(
+        "INSERT INTO conversations (id, title, created_at, updated_at) VALUES (?, ?, ?, ?)", conversations)
+    rows = [(conversation_id, "user" if i % 2 == 0 else "assistant", message(rng), now)
+            for conversation_id, *_ in conversations for i in range(per_conversation)]
+    started = time.perf_counter()
+    connection.exec_driver_sql(
+        "INSERT INTO messages (conversation_id, role, content, created_at) VALUES (?, ?, ?, ?)", rows)
+    return len(rows) / (time.perf_counter() - started)
+
+def client_scan(db, query):
+    """What the frontend does today: every message of every chat, filtered on the client."""
+    words = query.lower().split()
+    return [m for m in db.query(models.Message).all() if all(word in (m.content or "").lower() for word in words)]
+
+def main(args):
+    init_db()
+    rng = random.Random(0)
+    sample = min(args.messages, 20000)
+    with engine.begin() as connection:
+        with_triggers = fill(connection, rng, sample)
+    with engine.begin() as connection:
+        triggers = connection.exec_driver_sql(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_fts_%'").all()
+        for name, _ in triggers:
+            connection.exec_driver_sql(f"DROP TRIGGER {name}")
+        without_triggers = fill(connection, rng, args.messages - sample)
+        for _, sql in triggers:
+            connection.exec_driver_sql(sql)
+    rates = [f"{rate:,.0f} messages/s {label}" for rate, label in
+             [(with_triggers, "with the FTS triggers"), (without_triggers, "without")] if rate is not None]
+    print(f"inserts: {', '.join(rates) or 'none'}")
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        rebuild_search_index(connection)
+    print(f"backfill of {args.messages:,} messages: {time.perf_counter() - start:.2f}s")
+
+    # One planted needle for the rare query
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE messages SET content = content || ' A xylophone in the opening.' "
+                                   "WHERE id = (SELECT max(id) FROM messages)")
+
+    print(f"{'query':>20} {'matches':>8} {'search p50 ms':>14} {'p95 ms':>8} {'client scan ms':>15}")
+    with SessionLocal() as db:
+        for query in QUERIES:
+            latencies = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                hits, _ = search(db, query, limit=20)
+                latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            matches = len(client_scan(db, query))
+            scan = time.perf_counter() - start
+            db.expunge_all()
+            print(f"{query:>20} {matches:>8} {percentile(latencies, 50) * 1000:>14.1f} "
+                  f"{percentile(latencies, 95) * 1000:>8.1f} {scan * 1000:>15.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of each search")
+    main(parser.parse_args())
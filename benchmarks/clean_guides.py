@@ -0,0 +1,97 @@
+"""Cleaning throughput and near-duplicate removal on a synthetic scrape.
+
+Writes raw scraper files in which a share of tips are near-duplicates of
+others (a changed word, a tracking URL, different spacing), then cleans them
+with the previous single-process loop (substring scan per phrase, exact
+deduplication) and with the pipeline at each worker count.
+
+    python -m benchmarks.clean_guides --files 200 --per-file 50 --workers 1 4
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from app import clean_guides
+
+WORDS = ("character scene dialogue draft chapter reader tension plot voice detail conflict ending opening "
+         "sentence verb image pacing setting motive secret").split()
+
+def legacy_is_valid_tip(tip):
+    """clean_guides.is_valid_tip as it was before the precompiled matchers."""
+    title = tip.get("title", "").strip().lower()
+    content = tip.get("content", "").strip().lower()
+    if not content or content in clean_guides.GENERIC or len(content) < 15:
+        return False
+    if title in clean_guides.GENERIC and len(content) < 30:
+        return False
+    for phrase in clean_guides.GENERIC_PHRASES:
+        if phrase in content:
+            return False
+    if not any(verb in content for verb in clean_guides.ACTION_VERBS):
+        if len(content) < 40:
+            return False
+    return True
+
+def run_legacy(raw_dir):
+    tips = []
+    for path in sorted(os.listdir(raw_dir)):
+        for entry in clean_guides.read_unit(("file", os.path.join(raw_dir, path))):
+            tip = clean_guides.entry_to_tip(entry)
+            if legacy_is_valid_tip(tip):
+                tips.append(tip)
+    seen = set()
+    return [tip for tip in tips if not (tip["content"] in seen or seen.add(tip["content"]))]
+
+def make_tip(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 60))) + "."
+
+def write_corpus(raw_dir, args):
+    rng = random.Random(0)
+    originals = []
+    for i in range(args.files):
+        results = []
+        for j in range(args.per_file):
+            if originals and rng.random() < args.duplicate_share:
+                words = rng.choice(originals).split()
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+                content = " ".join(words) + rng.choice(["", " https://example.com/?ref=1", "  "])
+            else:
+                content = "Try this: " + make_tip(rng)
+                originals.append(content)
+            results.append({"title": f"Tip {i}-{j}", "content": content})
+        with open(os.path.join(raw_dir, f"raw_web_{i}.json"), "w") as f:
+            json.dump({"query": "writing tips", "results": results}, f)
+    return len(originals)
+
+def main(args):
+    workdir = tempfile.mkdtemp()
+    raw_dir = os.path.join(workdir, "raw")
+    os.makedirs(raw_dir)
+    originals = write_corpus(raw_dir, args)
+    total = args.files * args.per_file
+    print(f"{total} scraped tips, {originals} distinct, {total - originals} near-duplicates")
+
+    rows = []
+    start = time.perf_counter()
+    kept = run_legacy(raw_dir)
+    rows.append(("legacy", time.perf_counter() - start, len(kept)))
+    for workers in args.workers:
+        guides_path = os.path.join(workdir, f"guides_{workers}.jsonl")
+        start = time.perf_counter()
+        kept = clean_guides.main(raw_dir, guides_path, workers)
+        rows.append((f"pipeline x{workers}", time.perf_counter() - start, len(kept)))
+
+    print(f"{'mode':>12} {'seconds':>8} {'tips/s':>8} {'kept':>6}")
+    for name, seconds, kept in rows:
+        print(f"{name:>12} {seconds:>8.2f} {total / seconds:>8.0f} {kept:>6}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--per-file", type=int, default=50)
+    parser.add_argument("--duplicate-share", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    main(parser.parse_args())
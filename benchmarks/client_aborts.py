@@ -0,0 +1,170 @@
+"""/submit with clients that give up: capacity recovered by cancelling work on disconnect.
+
+Serves the app against benchmarks/fake_ollama.py (as benchmarks.e2e does)
+once with FORGE_CANCEL_ON_DISCONNECT=1 and once with it off. `--concurrency`
+clients send 500-word submissions back to back; a fraction `--abort-rate`
+of them give up after `--abort-after` seconds and close the connection,
+like a closed tab or an impatient resubmit. For the clients that wait, it
+reports replies per second and p50/p95 latency; from the fake Ollama, the
+tokens generated in all and the generations cut off mid-reply.
+
+Last, the app is loaded in this process and sent `--stream-aborts`
+/submit/stream requests whose client is gone by the time the headers are
+sent (the send fails, as under an ASGI 2.4 server). None may still hold an
+LLM slot afterwards, and each message must have a non-blank reply (the
+interrupted marker) saved after it; the run exits with status 1 otherwise.
+
+    python -m benchmarks.client_aborts --requests 60 --concurrency 8 --abort-rate 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.e2e import ROOT, prose, start_servers, stop_servers
+from benchmarks.fakes import percentile
+
+async def drive(args, app_url, ollama_url):
+    rng = random.Random(args.seed)
+    plan = [(prose(rng, 500), rng.random() < args.abort_rate) for _ in range(args.requests)]
+    pending = iter(plan)
+    latencies, aborted, errors = [], 0, 0
+
+    async with httpx.AsyncClient(base_url=app_url, timeout=None) as client:
+        async def client_loop():
+            nonlocal aborted, errors
+            for text, abort in pending:
+                start = time.perf_counter()
+                try:
+                    # Giving up closes the connection, which the server sees as a disconnect
+                    response = await client.post("/submit", json={"text": text},
+                                                 timeout=args.abort_after if abort else None)
+                except httpx.TimeoutException:
+                    aborted += 1
+                    continue
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        # Let cut-off work finish or be cancelled before reading the counters
+        await asyncio.sleep(2)
+        ollama = (await client.get(f"{ollama_url}/fake/stats")).json()
+        scheduler = (await client.get("/health")).json()["scheduler"]
+    return latencies, aborted, errors, elapsed, ollama, scheduler
+
+def run(args, cancel):
+    os.environ["FORGE_CANCEL_ON_DISCONNECT"] = "1" if cancel else "0"
+    workdir = tempfile.mkdtemp(prefix="forge-aborts-")
+    try:
+        processes, app_url, ollama_url = start_servers(args, workdir)
+        try:
+            return asyncio.run(drive(args, app_url, ollama_url))
+        finally:
+            stop_servers(processes)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+async def send_and_hang_up(app, text):
+    """One /submit/stream request straight through ASGI, with the client gone before the headers."""
+    body = json.dumps({"text": text}).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        raise OSError("Connection reset by peer")
+
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+             "method": "POST", "scheme": "http", "path": "/submit/stream", "raw_path": b"/submit/stream",
+             "root_path": "", "query_string": b"", "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+             "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]}
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        pass
+
+def abort_streams(args):
+    """Returns (slots still held, messages without a non-blank reply) after the stream aborts."""
+    workdir = tempfile.mkdtemp(prefix="forge-aborts-")
+    try:
+        processes, _, ollama_url = start_servers(args, workdir)
+        try:
+            os.environ.update(FORGE_OLLAMA_URL=ollama_url, FORGE_DATABASE_URL=f"sqlite:///{workdir}/forge.db",
+                              FORGE_EMBED_CACHE_PATH=os.path.join(workdir, "embedding_cache.db"),
+                              FORGE_RESPONSE_CACHE_PATH=os.path.join(workdir, "response_cache.db"),
+                              FORGE_GUIDES_PATH=os.path.abspath(args.guides), FORGE_RETRIEVER_BACKEND=args.retriever)
+            # The app reads the index ingest wrote relative to its working directory
+            os.chdir(workdir)
+            from app import main, models
+            from app.database import SessionLocal
+
+            async def drive_aborts():
+                await main.initialize_components()
+                rng = random.Random(args.seed)
+                for _ in range(args.stream_aborts):
+                    await send_and_hang_up(main.app, prose(rng, 500))
+                # Let the fire-and-forget saves land
+                await asyncio.sleep(1)
+                stats = main.llm_scheduler.stats()
+                return stats["active"] + stats["queued"]
+
+            slots = asyncio.run(drive_aborts())
+            db = SessionLocal()
+            try:
+                last = {}
+                for message in db.query(models.Message).order_by(models.Message.id):
+                    last[message.conversation_id] = message
+            finally:
+                db.close()
+            return slots, sum(1 for message in last.values()
+                              if message.role == "user" or not (message.content or "").strip())
+        finally:
+            os.chdir(ROOT)
+            stop_servers(processes)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main(args):
+    print(f"{args.requests} submissions, {args.concurrency} clients, {args.abort_rate:.0%} give up after "
+          f"{args.abort_after}s; replies of {args.reply_tokens} tokens at {args.token_rate}/s, "
+          f"{args.parallel} at once")
+    print(f"{'cancel':>6} {'replies/s':>9} {'p50 s':>6} {'p95 s':>6} {'aborted':>7} {'errors':>6} "
+          f"{'tokens':>7} {'cut off':>7} {'cancelled':>9}")
+    for cancel in (False, True):
+        latencies, aborted, errors, elapsed, ollama, scheduler = run(args, cancel)
+        tokens = ollama["completion_tokens"] + ollama["aborted_tokens"]
+        print(f"{'on' if cancel else 'off':>6} {len(latencies) / elapsed:>9.2f} {percentile(latencies, 50):>6.2f} "
+              f"{percentile(latencies, 95):>6.2f} {aborted:>7} {errors:>6} {tokens:>7} {ollama['aborted']:>7} "
+              f"{scheduler.get('cancelled', 0):>9}")
+    slots, unanswered = abort_streams(args)
+    print(f"/submit/stream with the client gone before the headers, {args.stream_aborts} times: "
+          f"{slots} LLM slots still held, {unanswered} messages without a reply or with a blank one")
+    if slots or unanswered:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--abort-rate", type=float, default=0.3, help="fraction of clients that give up")
+    parser.add_argument("--abort-after", type=float, default=1.0, help="seconds before they give up")
+    parser.add_argument("--stream-aborts", type=int, default=8, help="streams whose client is gone before the headers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--guides", default=os.path.join(ROOT, "data", "guides.json"))
+    parser.add_argument("--retriever", default="numpy", choices=["chroma", "numpy"])
+    parser.add_argument("--parallel", type=int, default=2, help="generations the fake Ollama runs at once")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--token-rate", type=float, default=40)
+    parser.add_argument("--prompt-token-rate", type=float, default=5000)
+    main(parser.parse_args())
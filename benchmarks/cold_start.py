@@ -0,0 +1,54 @@
+"""Cold start benchmark: time from launching the server to the first served request.
+
+Starts `uvicorn app.main:app` in a subprocess and polls /health, reporting
+when the first request was served and when every component finished
+starting (ready or failed), plus the per-component times from /health.
+
+    python -m benchmarks.cold_start --mode background
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+def measure(mode, port, timeout):
+    env = dict(os.environ, FORGE_STARTUP_MODE=mode)
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_served = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                health = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).json()
+            except httpx.HTTPError:
+                time.sleep(0.02)
+                continue
+            if first_served is None:
+                first_served = time.perf_counter() - start
+            if "pending" not in health["components"].values():
+                return first_served, time.perf_counter() - start, health
+            time.sleep(0.02)
+        raise TimeoutError(f"server not settled after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["background", "blocking"], nargs="+", default=["background", "blocking"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    for mode in args.mode:
+        first_served, settled, health = measure(mode, args.port, args.timeout)
+        print(f"{mode}: first request served after {first_served:.2f}s, all components settled after {settled:.2f}s")
+        for name, status in health["components"].items():
+            seconds = health["startup_seconds"].get(name)
+            print(f"  {name:<16} {status:<12} {'' if seconds is None else f'{seconds:.2f}s after process start'}")
@@ -0,0 +1,298 @@
+"""End-to-end benchmark: the real server against a fake Ollama, with mixed traffic and baselines.
+
+Starts benchmarks/fake_ollama.py, ingests the guides into a scratch
+directory through it, then serves `app.main:app` with uvicorn pointed at the
+fake (FORGE_OLLAMA_URL) and drives it over HTTP with a mix of greetings,
+500-word submissions, 10k-word chapters and chat-list reads. Every /submit
+asks for its timing breakdown, so besides throughput and p50/p95/p99 per
+kind of request the report has p50/p95/p99 per stage (plan, history,
+retrieval, queue_wait, generate, save, ...; a stage that runs several times
+in one request, such as a chapter's section critiques, is summed).
+
+`--save-baseline` writes the results to `--baseline`; without it they are
+compared with the baseline there, and any latency more than `--tolerance`
+slower (and `--min-delta` seconds slower) or throughput more than
+`--tolerance` lower is flagged as a regression and the run exits with
+status 1, so CI can gate on it.
+
+    python -m benchmarks.e2e --requests 150 --concurrency 8
+    python -m benchmarks.e2e --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fakes import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "e2e.json")
+KINDS = ("greeting", "submission", "chapter", "chats")
+GREETINGS = ["hi", "Hello!", "hey there", "Good morning, Forge!", "What can you do?", "How does Forge work?"]
+
+NAMES = ["Mara", "Tobias", "the keeper", "her brother", "the old captain", "Ines"]
+ACTIONS = ["counted the boats", "watched the fog roll in", "mended the nets", "climbed the stairs",
+           "read the letter again", "listened for the bell", "lit the lamp", "argued with the wind"]
+PLACES = ["by the harbour", "at the top of the tower", "in the kitchen", "on the cold beach",
+          "under the bridge", "behind the chapel"]
+FEELINGS = ["and felt nothing", "though her hands shook", "as if it mattered", "without a word",
+            "and remembered the summer", "while the kettle boiled"]
+
+def prose(rng, words):
+    """Deterministic, varied prose of about `words` words, in paragraphs."""
+    paragraphs, sentences, count = [], [], 0
+    while count < words:
+        sentence = (f"{rng.choice(NAMES).capitalize()} {rng.choice(ACTIONS)} "
+                    f"{rng.choice(PLACES)} {rng.choice(FEELINGS)}.")
+        sentences.append(sentence)
+        count += len(sentence.split())
+        if len(sentences) == 6:
+            paragraphs.append(" ".join(sentences))
+            sentences = []
+    paragraphs.append(" ".join(sentences))
+    return "\n\n".join(p for p in paragraphs if p)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until_up(url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with status {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def start_servers(args, workdir):
+    """Start the fake Ollama, ingest the guides through it and start the app; returns (processes, app URL, Ollama URL)."""
+    ollama_port, app_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        FORGE_OLLAMA_URL=f"http://127.0.0.1:{ollama_port}",
+        FORGE_DATABASE_URL=f"sqlite:///{workdir}/forge.db",
+        FORGE_EMBED_CACHE_PATH=os.path.join(workdir, "embedding_cache.db"),
+        FORGE_RESPONSE_CACHE_PATH=os.path.join(workdir, "response_cache.db"),
+        FORGE_GUIDES_PATH=os.path.abspath(args.guides),
+        FORGE_RETRIEVER_BACKEND=args.retriever,
+        FORGE_STARTUP_MODE="blocking",
+    )
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(ollama_port),
+        "--latency", str(args.llm_latency), "--tokens", str(args.reply_tokens),
+        "--tokens-per-second", str(args.token_rate), "--prompt-tokens-per-second", str(args.prompt_token_rate),
+        "--parallel", str(args.parallel),
+    ], cwd=ROOT, env=env)
+    processes = [fake]
+    try:
+        wait_until_up(f"{env['FORGE_OLLAMA_URL']}/", fake)
+        # The app reads data/chroma_db relative to its working directory
+        subprocess.run([sys.executable, "-m", "app.ingest"], cwd=workdir, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        server = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port), "--log-level", "warning",
+        ], cwd=workdir, env=env)
+        processes.append(server)
+        wait_until_up(f"http://127.0.0.1:{app_port}/health", server)
+    except BaseException:
+        stop_servers(processes)
+        raise
+    return processes, f"http://127.0.0.1:{app_port}", env["FORGE_OLLAMA_URL"]
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def make_requests(args):
+    """The (kind, text) of every request, in order, drawn from the mix with a fixed seed."""
+    rng = random.Random(args.seed)
+    weights = [args.mix[kind] for kind in KINDS]
+    requests = []
+    for kind in rng.choices(KINDS, weights=weights, k=args.warmup + args.requests):
+        if kind == "greeting":
+            text = rng.choice(GREETINGS)
+        elif kind == "submission":
+            text = prose(rng, 500)
+        elif kind == "chapter":
+            text = prose(rng, 10000)
+        else:
+            text = None
+        requests.append((kind, text))
+    return requests
+
+async def drive(client, args, requests):
+    """Send the requests with `--concurrency` clients.
+
+    Returns latencies, summed stage seconds per request, errors and the
+    seconds from the first measured request to the last reply.
+    """
+    latencies = {kind: [] for kind in KINDS}
+    stages = {}
+    errors = {kind: 0 for kind in KINDS}
+    pending = iter(enumerate(requests))
+    measured_from = []
+
+    async def one(index, kind, text):
+        start = time.perf_counter()
+        if index == args.warmup:
+            measured_from.append(start)
+        if kind == "chats":
+            response = await client.get("/chats/summary", params={"limit": 50})
+        else:
+            response = await client.post("/submit", json={"text": text, "timings": True})
+        elapsed = time.perf_counter() - start
+        if index < args.warmup:
+            return
+        if response.status_code != 200:
+            errors[kind] += 1
+            return
+        latencies[kind].append(elapsed)
+        if kind != "chats":
+            totals = {}
+            for item in response.json()["timings"]["spans"]:
+                totals[item["stage"]] = totals.get(item["stage"], 0.0) + item["seconds"]
+            for stage, seconds in totals.items():
+                stages.setdefault(f"{kind}/{stage}", []).append(seconds)
+
+    async def client_loop():
+        for index, (kind, text) in pending:
+            await one(index, kind, text)
+
+    await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+    return latencies, stages, errors, time.perf_counter() - measured_from[0]
+
+def summarize(values):
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99)}
+
+def results_for(args, latencies, stages, errors, elapsed):
+    completed = sum(len(values) for values in latencies.values())
+    return {
+        "config": {name: getattr(args, name) for name in (
+            "requests", "concurrency", "mix", "seed", "retriever", "parallel", "llm_latency", "reply_tokens",
+            "token_rate", "prompt_token_rate")},
+        "throughput": completed / elapsed,
+        "requests": {
+            kind: dict(summarize(values), count=len(values), errors=errors[kind], throughput=len(values) / elapsed)
+            for kind, values in latencies.items() if values or errors[kind]
+        },
+        "stages": {stage: dict(summarize(values), count=len(values)) for stage, values in sorted(stages.items())},
+    }
+
+def compare(results, baseline, tolerance, min_delta):
+    """Regressions of results against baseline, as printable lines."""
+    regressions = []
+    if results["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['throughput']:.2f} -> {results['throughput']:.2f} req/s")
+    for section in ("requests", "stages"):
+        for name, current in results[section].items():
+            previous = baseline.get(section, {}).get(name)
+            if previous is None:
+                continue
+            for pct in ("p50", "p95", "p99"):
+                before, after = previous[pct], current[pct]
+                if after > before * (1 + tolerance) and after - before > min_delta:
+                    regressions.append(f"{name} {pct} {before * 1000:.1f} -> {after * 1000:.1f} ms")
+    return regressions
+
+def report(results, ollama_stats):
+    print(f"{results['throughput']:.2f} requests/s overall; Ollama served {ollama_stats}")
+    print(f"{'request':>28} {'count':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for kind, row in results["requests"].items():
+        print(f"{kind:>28} {row['count']:>6} {row['errors']:>6} {row['throughput']:>7.2f} "
+              f"{row['p50'] * 1000:>9.1f} {row['p95'] * 1000:>9.1f} {row['p99'] * 1000:>9.1f}")
+    print(f"{'stage':>28} {'count':>6} {'':>6} {'':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, row in results["stages"].items():
+        print(f"{stage:>28} {row['count']:>6} {'':>6} {'':>7} "
+              f"{row['p50'] * 1000:>9.1f} {row['p95'] * 1000:>9.1f} {row['p99'] * 1000:>9.1f}")
+
+def parse_mix(value):
+    mix = dict.fromkeys(KINDS, 0.0)
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in mix:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}; expected one of {', '.join(KINDS)}")
+        mix[kind] = float(weight)
+    return mix
+
+async def run(args, app_url, ollama_url):
+    requests = make_requests(args)
+    async with httpx.AsyncClient(base_url=app_url, timeout=None,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        latencies, stages, errors, elapsed = await drive(client, args, requests)
+        ollama_stats = (await client.get(f"{ollama_url}/fake/stats")).json()
+    return results_for(args, latencies, stages, errors, elapsed), ollama_stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=150)
+    parser.add_argument("--warmup", type=int, default=10, help="requests sent first and left out of the results")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients sending requests back to back")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("greeting=0.3,submission=0.4,chapter=0.05,chats=0.25"),
+                        help="relative weights of greeting, submission, chapter and chats requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--guides", default=os.path.join(ROOT, "data", "guides.json"))
+    parser.add_argument("--retriever", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--parallel", type=int, default=2, help="generations the fake Ollama runs at once")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--token-rate", type=float, default=200)
+    parser.add_argument("--prompt-token-rate", type=float, default=5000)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="seconds of slowdown always tolerated")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="forge-e2e-")
+    try:
+        processes, app_url, ollama_url = start_servers(args, workdir)
+        try:
+            results, ollama_stats = asyncio.run(run(args, app_url, ollama_url))
+        finally:
+            stop_servers(processes)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report(results, ollama_stats)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print("Warning: the baseline was recorded with different settings; the comparison is not like for like")
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print(f"{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
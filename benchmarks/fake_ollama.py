@@ -0,0 +1,197 @@
+"""Fake Ollama HTTP server: Ollama's API with configurable latency, token rates and deterministic embeddings.
+
+Serves the endpoints Forge calls (/api/chat, /api/generate, /api/embed and
+/api/embeddings, plus /api/tags and /api/version) so the real app, ingest
+and LangChain clients can run without a model. Generation waits
+`--latency` seconds, then evaluates the prompt at `--prompt-tokens-per-second`
+(words stand in for tokens) and streams `--tokens` tokens at
+`--tokens-per-second`. Like Ollama with OLLAMA_NUM_PARALLEL, only
+`--parallel` generations run at once and the rest queue. Embeddings hash the
+words of the text into a fixed vector, so the same text always gets the same
+vector and texts sharing words land close together. Like Ollama, a chat or
+generate request with a "format" other than "json" or a schema gets a 400.
+GET /fake/stats reports the requests served.
+
+    python -m benchmarks.fake_ollama --port 11435 --tokens-per-second 30
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+# A critique-shaped reply: no story markers and no copied text, so Forge's guardrails let it through
+REPLY_WORDS = (
+    "Your pacing holds in the opening, but the middle section lingers on description. "
+    "Consider trimming adjectives, letting dialogue carry the tension, and showing the character's "
+    "fear through action rather than naming it. The ending lands because the earlier details pay off."
+).split()
+
+def embed_text(text, dimensions):
+    """Deterministic unit vector: each word adds a signed count to a hashed coordinate."""
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dimensions] += 1.0 if value >> 63 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        # Empty text still gets a valid vector
+        vector[0], norm = 1.0, 1.0
+    return [x / norm for x in vector]
+
+def prompt_words(payload):
+    if "messages" in payload:
+        return sum(len(str(m.get("content", "")).split()) for m in payload["messages"])
+    return len(str(payload.get("prompt") or "").split())
+
+def create_app(latency=0.05, tokens_per_second=200.0, tokens=40, prompt_tokens_per_second=5000.0, parallel=2,
+               embed_latency=0.005, dimensions=1024):
+    app = FastAPI(title="Fake Ollama")
+    slots = asyncio.Semaphore(parallel)
+    stats = {"chat": 0, "generate": 0, "embed": 0, "texts_embedded": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             # Generations the client closed before the last token, and the tokens they produced
+             "aborted": 0, "aborted_tokens": 0, "bad_requests": 0}
+
+    def now():
+        return datetime.now(timezone.utc).isoformat()
+
+    async def generate(payload, key):
+        """Yields (token, final metadata or None) after waiting for a slot and evaluating the prompt."""
+        options = payload.get("options") or {}
+        count = options.get("num_predict") or tokens
+        count = tokens if count < 0 else count
+        seed = int(hashlib.sha256(json.dumps(payload.get(key), sort_keys=True).encode()).hexdigest(), 16)
+        evaluated = prompt_words(payload)
+        started = time.perf_counter()
+        async with slots:
+            loaded = time.perf_counter()
+            await asyncio.sleep(latency + evaluated / prompt_tokens_per_second)
+            prompt_done = time.perf_counter()
+            produced = 0
+            try:
+                for i in range(count):
+                    await asyncio.sleep(1 / tokens_per_second)
+                    produced += 1
+                    word = REPLY_WORDS[(seed + i) % len(REPLY_WORDS)]
+                    yield (word if i == 0 else " " + word), None
+            finally:
+                if produced < count:
+                    # Closed by a disconnected client, as Ollama stops generating then
+                    stats["aborted"] += 1
+                    stats["aborted_tokens"] += produced
+        finished = time.perf_counter()
+        stats["prompt_tokens"] += evaluated
+        stats["completion_tokens"] += count
+        yield "", {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((finished - started) * 1e9),
+            "load_duration": int((loaded - started) * 1e9),
+            "prompt_eval_count": evaluated,
+            "prompt_eval_duration": int((prompt_done - loaded) * 1e9),
+            "eval_count": count,
+            "eval_duration": int((finished - prompt_done) * 1e9),
+        }
+
+    async def respond(payload, chunks, wrap):
+        if payload.get("stream", True):
+            async def lines():
+                async for token, final in chunks:
+                    yield json.dumps(dict(wrap(token), model=payload.get("model"), created_at=now(),
+                                          **(final or {"done": False}))) + "\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        text = []
+        async for token, final in chunks:
+            text.append(token)
+        return JSONResponse(dict(wrap("".join(text)), model=payload.get("model"), created_at=now(), **final))
+
+    def bad_request(payload):
+        if payload.get("format") in (None, "", "json") or isinstance(payload.get("format"), dict):
+            return None
+        stats["bad_requests"] += 1
+        return JSONResponse({"error": f"invalid format: {payload['format']}"}, status_code=400)
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        payload = await request.json()
+        stats["chat"] += 1
+        rejected = bad_request(payload)
+        if rejected is not None:
+            return rejected
+        return await respond(payload, generate(payload, "messages"),
+                             lambda text: {"message": {"role": "assistant", "content": text}})
+
+    @app.post("/api/generate")
+    async def generate_endpoint(request: Request):
+        payload = await request.json()
+        stats["generate"] += 1
+        rejected = bad_request(payload)
+        if rejected is not None:
+            return rejected
+        if not payload.get("prompt"):
+            # An empty prompt only loads the model
+            return JSONResponse({"model": payload.get("model"), "created_at": now(), "response": "",
+                                 "done": True, "done_reason": "load"})
+        return await respond(payload, generate(payload, "prompt"), lambda text: {"response": text})
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        payload = await request.json()
+        texts = payload.get("input") or []
+        texts = [texts] if isinstance(texts, str) else texts
+        stats["embed"] += 1
+        stats["texts_embedded"] += len(texts)
+        await asyncio.sleep(embed_latency * max(len(texts), 1))
+        return {"model": payload.get("model"), "embeddings": [embed_text(text, dimensions) for text in texts]}
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        # The older single-text endpoint
+        payload = await request.json()
+        stats["embed"] += 1
+        stats["texts_embedded"] += 1
+        await asyncio.sleep(embed_latency)
+        return {"embedding": embed_text(payload.get("prompt", ""), dimensions)}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name, "model": name} for name in ("phi3:latest", "mxbai-embed-large:latest")]}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-fake"}
+
+    @app.get("/")
+    async def root():
+        return PlainTextResponse("Ollama is running")
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        return stats
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before prompt evaluation starts")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--tokens", type=int, default=40, help="tokens per reply unless the request sets num_predict")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=5000)
+    parser.add_argument("--parallel", type=int, default=2, help="generations run at once (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="seconds per embedded text")
+    parser.add_argument("--dimensions", type=int, default=1024, help="embedding size (mxbai-embed-large: 1024)")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.tokens_per_second, args.tokens, args.prompt_tokens_per_second,
+                           args.parallel, args.embed_latency, args.dimensions),
+                host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,130 @@
+"""Stand-ins for Ollama-backed components so benchmarks run without a model server."""
+import asyncio
+import random
+import time
+from typing import List
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.retrievers import BaseRetriever
+
+class FakeChatModel:
+    """Mimics ChatOllama.ainvoke/astream with a fixed first-token latency and token rate.
+
+    With prompt_tokens_per_second set, prompt evaluation adds latency in
+    proportion to the prompt length (words stand in for tokens), and
+    `parallel` bounds how many requests the fake server runs at once.
+    With prefix_cache, like Ollama, each of `cache_slots` slots keeps a
+    prompt; a request reuses the slot sharing the longest prefix with it and
+    only the rest of its prompt is evaluated (and counted).
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=50.0, tokens=40, prompt_tokens_per_second=None, parallel=None,
+                 prefix_cache=False, cache_slots=1):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.slots = asyncio.Semaphore(parallel) if parallel else None
+        self.prefix_cache = prefix_cache
+        # Least recently used first
+        self.cached_prompts = [[] for _ in range(cache_slots)]
+        self.calls = 0
+
+    def prompt_tokens(self, messages):
+        """Words of the prompt as a chat template would render it, role markers included."""
+        tokens = []
+        for m in messages:
+            tokens.append(f"<|{m.type}|>")
+            tokens.extend(str(m.content).split())
+            tokens.append("<|end|>")
+        return tokens
+
+    async def astream(self, messages):
+        if self.slots is None:
+            async for chunk in self._generate(messages):
+                yield chunk
+            return
+        async with self.slots:
+            async for chunk in self._generate(messages):
+                yield chunk
+
+    async def _generate(self, messages):
+        delay = self.latency
+        prompt = self.prompt_tokens(messages)
+        evaluated = len(prompt)
+        if self.prefix_cache:
+            def shared(cached):
+                count = 0
+                for cached_token, token in zip(cached, prompt):
+                    if cached_token != token:
+                        break
+                    count += 1
+                return count
+            best = max(range(len(self.cached_prompts)), key=lambda i: shared(self.cached_prompts[i]))
+            reused = shared(self.cached_prompts[best])
+            evaluated -= reused
+            # Like Ollama's runner, a prompt that extends a cached one takes its
+            # slot; otherwise the shared prefix is copied into the least
+            # recently used slot, so the longer cached prompt survives
+            self.cached_prompts.pop(best if reused == len(self.cached_prompts[best]) else 0)
+            self.cached_prompts.append(prompt)
+        if self.prompt_tokens_per_second:
+            delay += evaluated / self.prompt_tokens_per_second
+        started = time.perf_counter()
+        await asyncio.sleep(delay)
+        prompt_done = time.perf_counter()
+        self.calls += 1
+        for i in range(self.tokens):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            # Replies differ between calls, as a sampled model's would
+            yield AIMessageChunk(content=f"reply{self.calls} " if i == 0 else f"word{i} ")
+        # Final chunk with the usage fields Ollama reports (durations in nanoseconds)
+        yield AIMessageChunk(content="", response_metadata={
+            "prompt_eval_count": evaluated,
+            "prompt_eval_duration": int((prompt_done - started) * 1e9),
+            "eval_count": self.tokens,
+            "eval_duration": int((time.perf_counter() - prompt_done) * 1e9),
+            "load_duration": 0,
+        })
+
+    async def ainvoke(self, messages):
+        chunks = [chunk async for chunk in self.astream(messages)]
+        return AIMessage(content="".join(chunk.content for chunk in chunks),
+                         response_metadata=chunks[-1].response_metadata)
+
+class FakeRetriever(BaseRetriever):
+    """Synchronous retriever that blocks like a Chroma search plus embedding call."""
+
+    latency: float = 0.05
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.latency)
+        return [Document(page_content=f"Tip about {query}")]
+
+class FakeSearchClient:
+    """Blocking stand-in for TavilyClient.search with fixed latency and a share of failed calls."""
+
+    def __init__(self, latency=0.5, failure_rate=0.0, results=5, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.results = results
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def search(self, query, max_results=5, timeout=30):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.random.random() < self.failure_rate:
+            raise RuntimeError("429 Too Many Requests")
+        return {"query": query, "response_time": self.latency, "results": [
+            {"title": f"{query} #{i}", "url": f"https://example.com/{i}", "content": f"Tip {i} about {query}"}
+            for i in range(min(self.results, max_results))
+        ]}
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,80 @@
+"""Latency of greetings and questions about Forge with the fast path off, on templates, and on the answer cache.
+
+Sends a mix of greetings, questions about Forge, conversation and draft
+submissions to /submit at a fixed concurrency, against a fake model with
+phi3-like latency that runs `--parallel` generations at once, and reports
+latency per classification and the share of replies served without the
+model.
+
+    python -m benchmarks.fast_path --requests 120 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+
+from app import main
+from app.fast_path import FastPathResponder
+from app.scheduler import LLMScheduler
+from benchmarks.fakes import FakeChatModel, FakeRetriever, percentile
+
+MESSAGES = {
+    "greeting": ["hi", "Hello!", "hey there", "Good morning, Forge!", "hello, how are you?"],
+    "question_about_forge": ["What can you do?", "Who are you?", "How does Forge work?", "Tell me about yourself."],
+    "conversation": ["How do I make my villain more convincing?", "Hi, can you help me with a flashback?",
+                     "What is the difference between a prologue and a first chapter?"],
+    "submission": [" ".join(["The rain kept falling on the quiet town while Mara counted the boats."] * 5)],
+}
+
+async def run_mode(client, args, mode):
+    main.fast_path = FastPathResponder(mode=mode)
+    main.llm_scheduler = LLMScheduler(concurrency=args.parallel, max_depth=args.requests)
+    rng = random.Random(0)
+    weights = [args.greeting_share / 2, args.greeting_share / 2, (1 - args.greeting_share) / 2, (1 - args.greeting_share) / 2]
+    kinds = rng.choices(list(MESSAGES), weights=weights, k=args.requests)
+    latencies = {kind: [] for kind in MESSAGES}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(kind):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/submit", json={"text": rng.choice(MESSAGES[kind])})
+            response.raise_for_status()
+            assert response.json()["plan"]["classification"] == kind
+            latencies[kind].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(kind) for kind in kinds))
+    return latencies, time.perf_counter() - start, main.fast_path.stats()["without_llm_share"]
+
+async def run(args):
+    # The in-process transport does not run the lifespan, so install the agents directly
+    main.coach = main.AgentCCoach(FakeChatModel(latency=args.llm_latency, tokens=20, tokens_per_second=100,
+                                                parallel=args.parallel))
+    main.librarian = main.AgentBLibrarian(FakeRetriever(latency=0.0))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = {mode: await run_mode(client, args, mode) for mode in ("off", "cache", "templates")}
+
+    print(f"{args.requests} requests, {args.greeting_share:.0%} greetings and questions about Forge, "
+          f"concurrency {args.concurrency}")
+    print(f"{'mode':>10} {'class':>21} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, (latencies, elapsed, share) in results.items():
+        for kind, values in latencies.items():
+            print(f"{mode:>10} {kind:>21} {percentile(values, 50) * 1000:>8.1f} {percentile(values, 95) * 1000:>8.1f}")
+        print(f"{mode:>10} {'total':>21} {elapsed:>7.2f}s, {share:.0%} served without the model")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--greeting-share", type=float, default=0.3)
+    parser.add_argument("--parallel", type=int, default=2, help="generations the fake model runs at once")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake model's time to first token")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,53 @@
+"""Guardrail micro-benchmark: old difflib check against the shingle-based engine.
+
+For user submissions from 100 to 20k words, times one full guardrail check
+of a ~400-word critique, with and without a copied 40-word passage, and
+shows whether each engine flags the copy, and whether it wrongly blocks the
+clean critique.
+
+    python -m benchmarks.guardrails
+"""
+import difflib
+import random
+import timeit
+
+from app.guardrails import CopyDetector, PhraseMatcher
+
+STORY_INDICATORS = ["once upon a time", "there lived", "one day,", "long ago,",
+                    "in a land", "the end.", "chapter 1", "chapter one"]
+MATCHER = PhraseMatcher(STORY_INDICATORS)
+CRITIQUE_WORDS = ("your pacing slows when the scene shifts to the harbor and the dialogue "
+                  "could carry more subtext consider showing her fear through action").split()
+
+def legacy_check(user_text, output):
+    if difflib.SequenceMatcher(None, user_text, output).quick_ratio() > 0.5:
+        return False
+    output_lower = output.lower()
+    return not any(indicator in output_lower for indicator in STORY_INDICATORS)
+
+def new_check(user_text, output):
+    detector = CopyDetector(user_text)
+    detector.feed(output)
+    detector.finish()
+    return not detector.is_rewrite() and MATCHER.search(output) is None
+
+def make_texts(words, rng):
+    vocabulary = [line.strip() for line in open(__file__) if line.strip()]
+    vocabulary = " ".join(vocabulary).split()
+    user_words = [rng.choice(vocabulary) for _ in range(words)]
+    critique = " ".join(rng.choice(CRITIQUE_WORDS) for _ in range(400))
+    start = rng.randrange(0, max(1, words - 40))
+    copied = critique + " " + " ".join(user_words[start:start + 40])
+    return " ".join(user_words), critique, copied
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    print(f"{'words':>6} {'legacy ms':>10} {'new ms':>8} {'legacy: copy/clean':>19} {'new: copy/clean':>16}")
+    for words in [100, 1000, 5000, 20000]:
+        user_text, critique, copied = make_texts(words, rng)
+        runs = 20
+        legacy = timeit.timeit(lambda: legacy_check(user_text, critique), number=runs) / runs
+        new = timeit.timeit(lambda: new_check(user_text, critique), number=runs) / runs
+        legacy_flags = f"{not legacy_check(user_text, copied)}/{not legacy_check(user_text, critique)}"
+        new_flags = f"{not new_check(user_text, copied)}/{not new_check(user_text, critique)}"
+        print(f"{words:>6} {legacy * 1000:>10.2f} {new * 1000:>8.2f} {legacy_flags:>19} {new_flags:>16}")
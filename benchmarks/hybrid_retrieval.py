@@ -0,0 +1,124 @@
+"""Hybrid retrieval: how often the tips match the submission, and retrieval latency under a slow embedder.
+
+Each synthetic submission is a few hundred words of the sample
+submissions in data/persona_dataset.json with `--planted` words of one
+guide mixed in; it "hits" when that guide is among the tips returned.
+The modes compared are:
+
+- dimensions: the fixed dimension queries (the behaviour before hybrid mode);
+- lexical: hybrid mode with the embedding always late, so BM25 alone;
+- hybrid: BM25 and the submission's vector search, fused by RRF.
+
+Embeddings are fake_ollama's hashed bag of words, so vector search sees
+words, not meaning. Latency is then measured with the embedder answering
+in each of `--embed-latency` seconds, against FORGE_RETRIEVAL_BUDGET.
+
+    python -m benchmarks.hybrid_retrieval --submissions 200 --embed-latency 0.01 0.1 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, List
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app import main
+from app.guides import GUIDES_PATH, guide_text, iter_guides
+from app.hybrid import BM25Index, tokenize
+from benchmarks.fake_ollama import embed_text
+from benchmarks.fakes import percentile
+
+DIMENSIONS = ["Pacing", "Dialogue", "Show-Don't-Tell"]
+PERSONA_PATH = "data/persona_dataset.json"
+
+class HashedRetriever(BaseRetriever):
+    """Exact search over fake_ollama's hashed embeddings, with a delay standing in for the embedding call."""
+
+    texts: List[str]
+    matrix: Any
+    dimensions: int = 256
+    latency: float = 0.0
+    k: int = 3
+
+    def ranked(self, query):
+        scores = self.matrix @ np.asarray(embed_text(query, self.dimensions), dtype=np.float32)
+        return [Document(page_content=self.texts[i]) for i in np.argsort(-scores)[:self.k]]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.latency)
+        return self.ranked(query)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return self.ranked(query)
+
+def submission(rng, prose_pieces, guide, words, planted):
+    """`words` words of sample submissions with `planted` words of guide spread through them."""
+    prose = []
+    while len(prose) < words:
+        prose += rng.choice(prose_pieces).split()
+    vocabulary = list(dict.fromkeys(tokenize(guide)))
+    for word in rng.sample(vocabulary, min(planted, len(vocabulary))):
+        prose.insert(rng.randrange(len(prose)), word)
+    return " ".join(prose)
+
+async def measure(librarian, cases, use_text=True):
+    hits, latencies = 0, []
+    for guide, text in cases:
+        start = time.perf_counter()
+        tips = await librarian.aretrieve_tips(DIMENSIONS, text if use_text else None)
+        latencies.append(time.perf_counter() - start)
+        hits += guide in tips
+    return hits / len(cases), latencies
+
+async def run(args):
+    texts = list(dict.fromkeys(guide_text(item) for item in iter_guides(GUIDES_PATH)))
+    matrix = np.asarray([embed_text(text, args.dim) for text in texts], dtype=np.float32)
+    retriever = HashedRetriever(texts=texts, matrix=matrix, dimensions=args.dim)
+    lexical = BM25Index(texts)
+    with open(PERSONA_PATH) as f:
+        prose_pieces = [example["input"] for example in json.load(f)]
+    rng = random.Random(0)
+    cases = [(guide, submission(rng, prose_pieces, guide, args.words, args.planted))
+             for guide in rng.choices(texts, k=args.submissions)]
+    print(f"{len(texts)} guides, {args.submissions} submissions of ~{args.words} words, "
+          f"{args.planted} planted words, budget {main.RETRIEVAL_BUDGET}s")
+
+    modes = [
+        ("dimensions", main.AgentBLibrarian(retriever), False),
+        ("lexical", main.AgentBLibrarian(retriever.model_copy(update={"latency": 10.0}), lexical=lexical), True),
+        ("hybrid", main.AgentBLibrarian(retriever, lexical=lexical), True),
+    ]
+    print(f"{'mode':>10} {'hit rate':>9} {'tips':>5}")
+    for name, librarian, use_text in modes:
+        await librarian.warm(DIMENSIONS)
+        hit_rate, _ = await measure(librarian, cases[:args.relevance_sample], use_text)
+        tips = await librarian.aretrieve_tips(DIMENSIONS, cases[0][1] if use_text else None)
+        print(f"{name:>10} {hit_rate:>9.0%} {len(tips):>5}")
+
+    print(f"{'embed s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'late':>5} {'hit rate':>9}")
+    for latency in args.embed_latency:
+        librarian = main.AgentBLibrarian(retriever.model_copy(update={"latency": latency}), lexical=lexical)
+        await librarian.warm(DIMENSIONS)
+        hit_rate, latencies = await measure(librarian, cases)
+        print(f"{latency:>8} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+              f"{max(latencies) * 1000:>8.1f} {librarian.late_searches:>5} {hit_rate:>9.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--relevance-sample", type=int, default=200, help="submissions scored per mode")
+    parser.add_argument("--words", type=int, default=300, help="words of prose per submission")
+    parser.add_argument("--planted", type=int, default=4, help="words of the guide per submission")
+    parser.add_argument("--dim", type=int, default=256, help="fake embedding size")
+    parser.add_argument("--embed-latency", type=float, nargs="+", default=[0.01, 0.1, 1.0])
+    asyncio.run(run(parser.parse_args()))
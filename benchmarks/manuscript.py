@@ -0,0 +1,86 @@
+"""Manuscript mode benchmark: chunked map-reduce critique against the single-shot path.
+
+Critiques a generated 10k-word chapter with a fake model whose latency grows
+with prompt length (prompt evaluation) and which serves a fixed number of
+requests in parallel, as Ollama does with OLLAMA_NUM_PARALLEL. Reports
+wall time, time to the first streamed result and the largest prompt sent,
+and whether that prompt fits the model's context window (phi3 defaults to
+4k tokens; Ollama silently truncates longer prompts, so the single-shot
+critique only sees part of the chapter).
+
+    python -m benchmarks.manuscript --words 10000 --parallel 2
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.main import AgentBLibrarian, AgentCCoach
+from app.manuscript import ManuscriptCritic, split_into_chunks, word_count
+from benchmarks.fakes import FakeChatModel, FakeRetriever
+
+def make_chapter(words, rng):
+    vocabulary = "the rain fell on the harbor as she waited for a ship that never came".split()
+    paragraphs = []
+    while sum(len(p.split()) for p in paragraphs) < words:
+        sentences = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 20))).capitalize() + "."
+                     for _ in range(rng.randint(3, 7))]
+        if rng.random() < 0.3:
+            sentences.append('"Where is it?" she asked.')
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+class RecordingModel(FakeChatModel):
+    largest_prompt = 0
+
+    async def _generate(self, messages):
+        prompt_words = sum(len(str(m.content).split()) for m in messages)
+        self.largest_prompt = max(self.largest_prompt, prompt_words)
+        async for chunk in super()._generate(messages):
+            yield chunk
+
+async def single_shot(coach, text, tips):
+    start = time.perf_counter()
+    first = None
+    async for item in coach.stream_chat(text, tips, []):
+        if first is None:
+            first = time.perf_counter() - start
+    return time.perf_counter() - start, first
+
+async def chunked(coach, librarian, text, dimensions):
+    start = time.perf_counter()
+    first = None
+    async for item in ManuscriptCritic(coach, librarian).stream(text, dimensions):
+        if first is None and item["type"] in ("section", "token"):
+            first = time.perf_counter() - start
+    return time.perf_counter() - start, first
+
+async def run(args):
+    text = make_chapter(args.words, random.Random(3))
+    dimensions = ["Pacing", "Dialogue", "Show-Don't-Tell"]
+    print(f"{word_count(text)} words, {len(split_into_chunks(text))} chunks, "
+          f"prompt eval {args.prompt_tps:.0f} tok/s, {args.parallel} parallel slots")
+    print(f"{'mode':>12} {'total s':>8} {'first s':>8} {'max prompt':>11} {'fits ctx':>9}")
+    for mode in ["single-shot", "chunked"]:
+        model = RecordingModel(latency=0.1, tokens=args.tokens, tokens_per_second=args.gen_tps,
+                               prompt_tokens_per_second=args.prompt_tps, parallel=args.parallel)
+        coach = AgentCCoach(model)
+        librarian = AgentBLibrarian(FakeRetriever(latency=0.02))
+        if mode == "single-shot":
+            tips = await librarian.aretrieve_tips(dimensions)
+            total, first = await single_shot(coach, text, tips)
+        else:
+            total, first = await chunked(coach, librarian, text, dimensions)
+        # Roughly 1.3 tokens per English word
+        fits = model.largest_prompt * 1.3 <= args.num_ctx
+        print(f"{mode:>12} {total:>8.2f} {first:>8.2f} {model.largest_prompt:>11} {str(fits):>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--parallel", type=int, default=2, help="requests the fake model serves at once")
+    parser.add_argument("--prompt-tps", type=float, default=2000, help="prompt evaluation speed")
+    parser.add_argument("--gen-tps", type=float, default=200, help="generation speed")
+    parser.add_argument("--tokens", type=int, default=60, help="tokens generated per reply")
+    parser.add_argument("--num-ctx", type=int, default=4096, help="model context window in tokens")
+    asyncio.run(run(parser.parse_args()))
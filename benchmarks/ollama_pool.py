@@ -0,0 +1,116 @@
+"""Chat throughput over a pool of 1, 2, 4... fake Ollama servers, and failover when servers die.
+
+Starts `max(--backends)` instances of benchmarks/fake_ollama.py, each
+running one generation at a time, and sends `--requests` chat calls
+through PooledChatModel (the real ChatOllama clients) at a fixed
+concurrency, for each pool size. The failover run adds an address nothing
+listens on and kills one live server halfway through; every call should
+still succeed, each retried on another server. Last, calls the servers
+refuse with a 400 (an invalid "format") must fail at once, on one server,
+without taking any server out of the pool; the run exits with status 1
+otherwise.
+
+    python -m benchmarks.ollama_pool --backends 1 2 4 --requests 48 --concurrency 16
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+from langchain_community.chat_models import ChatOllama
+from langchain_core.messages import HumanMessage
+
+from app.ollama_pool import OllamaPool, PooledChatModel
+from benchmarks.e2e import ROOT, free_port, stop_servers, wait_until_up
+
+def start_backends(args, count):
+    processes, urls = [], []
+    for _ in range(count):
+        port = free_port()
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(port), "--parallel", "1",
+            "--latency", str(args.llm_latency), "--tokens", str(args.reply_tokens),
+            "--tokens-per-second", str(args.token_rate),
+        ], cwd=ROOT))
+        urls.append(f"http://127.0.0.1:{port}")
+    for process, url in zip(processes, urls):
+        wait_until_up(f"{url}/", process)
+    return processes, urls
+
+async def drive(model, args, on_halfway=None):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    done = []
+    errors = []
+
+    async def one(i):
+        async with semaphore:
+            try:
+                await model.ainvoke([HumanMessage(content=f"Critique draft {i}: the fog came in over the harbour.")])
+                done.append(i)
+            except Exception as e:
+                errors.append(e)
+            if on_halfway and len(done) + len(errors) == args.requests // 2:
+                on_halfway()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return len(done) / (time.perf_counter() - start), len(errors)
+
+def chat_model(pool, **settings):
+    return PooledChatModel(pool, lambda url: ChatOllama(base_url=url, model="phi3", **settings))
+
+async def bad_requests(urls, count):
+    """Send `count` calls every server refuses; returns (calls that raised, attempts made, servers ejected)."""
+    async def refused():
+        async with httpx.AsyncClient() as client:
+            return sum([(await client.get(f"{url}/fake/stats")).json()["bad_requests"] for url in urls])
+
+    pool = OllamaPool(urls)
+    model = chat_model(pool, format="yaml")
+    before, raised = await refused(), 0
+    for i in range(count):
+        try:
+            await model.ainvoke([HumanMessage(content=f"Critique draft {i}.")])
+        except Exception:
+            raised += 1
+    return raised, await refused() - before, sum(1 for backend in pool.backends if not backend.available)
+
+async def run(args, urls, processes):
+    print(f"{'backends':>8} {'calls/s':>8} {'errors':>6}  served per backend")
+    for count in args.backends:
+        pool = OllamaPool(urls[:count])
+        rate, errors = await drive(chat_model(pool), args)
+        print(f"{count:>8} {rate:>8.2f} {errors:>6}  {[backend.served for backend in pool.backends]}")
+
+    # An address nothing listens on, plus one server killed halfway through
+    live = urls[:max(args.backends)]
+    pool = OllamaPool(live + [f"http://127.0.0.1:{free_port()}"])
+    rate, errors = await drive(chat_model(pool), args, on_halfway=processes[0].kill)
+    print(f"failover: {len(live)} live + 1 dead, one killed halfway: {rate:.2f} calls/s, {errors} errors")
+    for backend in pool.backends:
+        print(f"  {backend.url} served {backend.served}, failures {backend.failures}, "
+              f"available {backend.available}")
+
+    # The killed server is out of the pool now
+    raised, attempts, ejected = await bad_requests(urls[1:max(args.backends)], args.bad_requests)
+    print(f"400 responses: {raised} of {args.bad_requests} calls raised, {attempts} attempts, {ejected} servers ejected")
+    if raised != args.bad_requests or attempts != args.bad_requests or ejected:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bad-requests", type=int, default=8, help="calls the servers refuse with a 400")
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--reply-tokens", type=int, default=20)
+    parser.add_argument("--token-rate", type=float, default=50)
+    args = parser.parse_args()
+    processes, urls = start_backends(args, max(args.backends))
+    try:
+        asyncio.run(run(args, urls, processes))
+    finally:
+        stop_servers(processes)
@@ -0,0 +1,79 @@
+"""Overload benchmark for the LLM scheduler: /submit latency when offered more than the model can serve.
+
+Requests arrive at a fixed rate above the fake model's capacity (it runs
+`--parallel` generations at once, like Ollama) and give up after
+`--client-timeout` seconds. Without admission control the backlog grows
+until every request times out; with it, excess requests get an immediate
+429 and the ones admitted finish in bounded time.
+
+    python -m benchmarks.overload --rate 20 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+
+from app import main
+from app.scheduler import LLMScheduler
+from benchmarks.fakes import FakeChatModel, FakeRetriever, percentile
+
+SUBMISSION = " ".join(["The rain kept falling on the quiet town."] * 8)
+
+async def run_mode(client, args):
+    latencies, rejected, timed_out = [], [], 0
+
+    async def one():
+        nonlocal timed_out
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.post("/submit", json={"text": SUBMISSION}), args.client_timeout)
+        except asyncio.TimeoutError:
+            timed_out += 1
+            return
+        if response.status_code in (429, 503):
+            rejected.append(time.perf_counter() - start)
+        else:
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    for _ in range(int(args.rate * args.duration)):
+        tasks.append(asyncio.ensure_future(one()))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*tasks)
+    return latencies, rejected, timed_out
+
+async def run(args):
+    # The in-process transport does not run the lifespan, so install the agents directly
+    main.coach = main.AgentCCoach(FakeChatModel(latency=args.llm_latency, tokens=1, parallel=args.parallel))
+    main.librarian = main.AgentBLibrarian(FakeRetriever(latency=0.0))
+    modes = {
+        "unbounded": LLMScheduler(concurrency=10 ** 6, max_depth=10 ** 6, timeout=3600),
+        "scheduled": LLMScheduler(concurrency=args.parallel, max_depth=args.queue_depth, timeout=args.client_timeout),
+    }
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'mode':>10} {'ok':>5} {'429/503':>8} {'timeout':>8} {'p50 ms':>8} {'p99 ms':>8} {'reject ms':>10}")
+        for name, scheduler in modes.items():
+            main.llm_scheduler = scheduler
+            latencies, rejected, timed_out = await run_mode(client, args)
+            # Let abandoned generations drain before the next mode
+            await asyncio.sleep(args.llm_latency * args.rate * args.duration / args.parallel)
+            print(f"{name:>10} {len(latencies):>5} {len(rejected):>8} {timed_out:>8} "
+                  f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+                  f"{percentile(rejected, 50) * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=20, help="requests per second offered")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--parallel", type=int, default=2, help="generations the fake model runs at once")
+    parser.add_argument("--queue-depth", type=int, default=8)
+    parser.add_argument("--client-timeout", type=float, default=3.0)
+    asyncio.run(run(parser.parse_args()))
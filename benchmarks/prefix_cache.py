@@ -0,0 +1,134 @@
+"""Prompt evaluation saved by a cache-friendly prompt layout on repeated turns.
+
+Ollama keeps the evaluated prompt of its last request and only evaluates
+the part of a new prompt after the prefix the two share. The fake model
+does the same, so this drives /submit through conversations that alternate
+pasted drafts (which get tips) with follow-up questions, and compares:
+
+- "tips-first": the previous layout, with tips and summary appended to the
+  system prompt and the summary updated after every exchange;
+- "prefix-stable": the constant system prompt first, history next, tips
+  last, and the summary folded in blocks.
+
+It also checks the prefix-stable layout's promise: between folds, each
+turn's prompt starts with the previous turn's up to the recent messages it
+sent whole (memory.RECENT_MESSAGES). The run exits with status 1 if one
+does not.
+
+    python -m benchmarks.prefix_cache --turns 12 --conversations 1
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app import main, memory
+from benchmarks.fakes import FakeChatModel, FakeRetriever
+
+def tips_first_messages(coach, user_text, tips, history, summary=None):
+    """AgentCCoach.build_messages as it was before the prefix-stable layout."""
+    system_content = coach.system_prompt
+    if tips:
+        tips_str = "\n".join([f"- {tip}" for tip in tips])
+        system_content += f"\n\nWriting advice context to reference:\n{tips_str}"
+    if summary:
+        system_content += f"\n\nSummary of the earlier conversation:\n{summary}"
+    messages = [SystemMessage(content=system_content)]
+    for msg in coach.history_for_prompt(history, summary):
+        messages.append(HumanMessage(content=msg['content']) if msg['role'] == 'user' else AIMessage(content=msg['content']))
+    messages.append(HumanMessage(content=user_text))
+    return messages
+
+def repeats_previous(previous, current):
+    """Whether the current prompt starts with the previous one up to its recent messages."""
+    messages, had_tips, history = previous
+    shared = messages[:len(messages) - (2 if had_tips else 1) - min(history, memory.RECENT_MESSAGES)]
+    return [(m.type, m.content) for m in current[:len(shared)]] == [(m.type, m.content) for m in shared]
+
+def turn_text(turn, draft_words):
+    if turn % 2 == 0:
+        sentence = f"Draft {turn}: she walked along the harbour wall while the gulls argued over the nets. "
+        return (sentence * (draft_words // 14 + 1)).strip()
+    return f"Thanks! Question {turn}: how would you tighten the pacing of that opening?"
+
+async def run_layout(client, args, layout):
+    coach = main.AgentCCoach(FakeChatModel(
+        latency=0.0, tokens=args.reply_words, tokens_per_second=100000,
+        prompt_tokens_per_second=args.prompt_rate, prefix_cache=True, cache_slots=args.cache_slots,
+    ))
+    # Per conversation, the summary and (messages, had tips, history messages) of its last prompt
+    prompts, current = {}, None
+    repeated, between_folds = 0, 0
+    if layout == "tips-first":
+        coach.build_messages = lambda *a: tips_first_messages(coach, *a)
+        coach.history_window = memory.RECENT_MESSAGES
+        main.memory.fold = 1
+    else:
+        main.memory.fold = memory.FOLD_MESSAGES
+        build_messages = coach.build_messages
+
+        def recording(user_text, tips, history, summary=None):
+            nonlocal repeated, between_folds
+            messages = build_messages(user_text, tips, history, summary)
+            previous = prompts.get(current)
+            if previous is not None and previous[0] == summary:
+                between_folds += 1
+                repeated += repeats_previous(previous[1], messages)
+            # The system prompt, the summary, the new message and the tips are not history
+            history_sent = len(messages) - 2 - bool(summary) - bool(tips)
+            prompts[current] = (summary, (messages, bool(tips), history_sent))
+            return messages
+        coach.build_messages = recording
+    main.coach = coach
+
+    conversations = [None] * args.conversations
+    evaluated, prompt_seconds = [], 0.0
+    for turn in range(args.turns):
+        for i, conversation_id in enumerate(conversations):
+            current = i
+            response = await client.post("/submit", json={
+                "text": turn_text(turn, args.draft_words), "conversation_id": conversation_id, "timings": True,
+            })
+            response.raise_for_status()
+            body = response.json()
+            conversations[i] = body["conversation_id"]
+            evaluated.append(body["timings"]["llm"]["prompt_tokens"])
+            prompt_seconds += body["timings"]["llm"]["prompt_eval_seconds"]
+            # Let the background summary finish, as it would between a writer's turns
+            while main.memory._tasks:
+                await asyncio.sleep(0.01)
+    return evaluated, prompt_seconds, repeated, between_folds
+
+async def run(args):
+    # The in-process transport does not run the lifespan, so install the agents directly
+    main.librarian = main.AgentBLibrarian(FakeRetriever(latency=0.0))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = {layout: await run_layout(client, args, layout) for layout in ("tips-first", "prefix-stable")}
+
+    print(f"{args.conversations} conversation(s) x {args.turns} turns, {args.cache_slots} cache slots, "
+          f"prompt eval {args.prompt_rate:.0f} tok/s")
+    print(f"{'layout':>14} {'tokens evaluated':>17} {'per turn':>9} {'prompt eval s':>14}")
+    for layout, (evaluated, seconds, _, _) in results.items():
+        print(f"{layout:>14} {sum(evaluated):>17} {sum(evaluated) / len(evaluated):>9.0f} {seconds:>14.2f}")
+    before, after = results["tips-first"][1], results["prefix-stable"][1]
+    print(f"prompt evaluation saved: {before - after:.2f}s ({(1 - after / before) * 100:.0f}%)")
+    _, _, repeated, between_folds = results["prefix-stable"]
+    print(f"prefix-stable turns between folds that repeat the previous prompt: {repeated} of {between_folds}")
+    if repeated < between_folds:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--conversations", type=int, default=1, help="conversations interleaved turn by turn")
+    parser.add_argument("--draft-words", type=int, default=300)
+    parser.add_argument("--reply-words", type=int, default=120)
+    parser.add_argument("--prompt-rate", type=float, default=2000, help="prompt tokens the fake model evaluates per second")
+    parser.add_argument("--cache-slots", type=int, default=4, help="prompt caches the fake keeps, like OLLAMA_NUM_PARALLEL")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""Prompt size and latency per turn: raw ten-message history against rolling summaries.
+
+Drives /submit through a conversation that alternates pasted drafts with
+short follow-up questions. The fake model charges prompt evaluation per
+prompt word, so the generate time tracks prompt size as it does on phi3.
+Prompt sizes are the fake's word counts as reported in the timing breakdown.
+
+    python -m benchmarks.prompt_size --turns 12 --draft-words 400
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+
+from app import main, memory
+from benchmarks.fakes import FakeChatModel, FakeRetriever
+
+def turn_text(turn, draft_words):
+    if turn % 2 == 0:
+        sentence = "She walked along the harbour wall while the gulls argued over the nets. "
+        return (sentence * (draft_words // 12 + 1)).strip()
+    return "Thanks! Could you say more about how the pacing of the opening works?"
+
+async def run_mode(client, args, summaries):
+    memory.SUMMARIES_ENABLED = summaries
+    main.AgentCCoach.history_window = memory.RECENT_MESSAGES if summaries else 10
+    main.AgentCCoach.history_token_budget = memory.HISTORY_TOKEN_BUDGET if summaries else None
+
+    conversation_id = None
+    rows = []
+    for turn in range(args.turns):
+        response = await client.post("/submit", json={
+            "text": turn_text(turn, args.draft_words), "conversation_id": conversation_id, "timings": True,
+        })
+        response.raise_for_status()
+        body = response.json()
+        conversation_id = body["conversation_id"]
+        timings = body["timings"]
+        generate = sum(span["seconds"] for span in timings["spans"] if span["stage"] == "generate")
+        rows.append((timings["llm"]["prompt_tokens"], generate))
+        # Let the background summary catch up, as it would between a writer's turns
+        while main.memory._tasks:
+            await asyncio.sleep(0.01)
+    return rows
+
+async def run(args):
+    # The in-process transport does not run the lifespan, so install the agents directly
+    main.coach = main.AgentCCoach(FakeChatModel(
+        latency=0.0, tokens=args.reply_words, tokens_per_second=10000, prompt_tokens_per_second=args.prompt_rate,
+    ))
+    main.librarian = main.AgentBLibrarian(FakeRetriever(latency=0.0))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        raw = await run_mode(client, args, summaries=False)
+        summarized = await run_mode(client, args, summaries=True)
+
+    print(f"{'turn':>4} {'raw words':>10} {'raw ms':>8} {'summary words':>14} {'summary ms':>11}")
+    for turn, ((raw_words, raw_s), (sum_words, sum_s)) in enumerate(zip(raw, summarized), start=1):
+        print(f"{turn:>4} {raw_words:>10} {raw_s * 1000:>8.0f} {sum_words:>14} {sum_s * 1000:>11.0f}")
+    print(f"{'mean':>4} {sum(r[0] for r in raw) / len(raw):>10.0f} {sum(r[1] for r in raw) / len(raw) * 1000:>8.0f} "
+          f"{sum(r[0] for r in summarized) / len(summarized):>14.0f} "
+          f"{sum(r[1] for r in summarized) / len(summarized) * 1000:>11.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--draft-words", type=int, default=400)
+    parser.add_argument("--reply-words", type=int, default=150)
+    parser.add_argument("--prompt-rate", type=float, default=2000, help="prompt words the fake model evaluates per second")
+    asyncio.run(run(parser.parse_args()))
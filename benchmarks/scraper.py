@@ -0,0 +1,83 @@
+"""Scrape time and completeness: the old sequential loop against the shared scraper engine.
+
+Runs the Reddit scraper's searches against a stub search client with fixed
+latency and a share of failed calls (as a rate-limited API returns), all in
+a temporary directory. The sequential loop sleeps 1/rate between searches
+and drops a search that fails; the engine keeps the same average rate but
+overlaps searches and retries failures. The resume row interrupts the
+engine halfway and reruns it from its checkpoint.
+
+    python -m benchmarks.scraper --latency 0.5 --rate 4 --failure-rate 0.1
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app import scraper
+from app.scrape_reddit import reddit_jobs
+from benchmarks.fakes import FakeSearchClient
+
+def run_sequential(client, jobs, args):
+    tips = []
+    for job in jobs:
+        try:
+            tips.extend(scraper.extract_tips(client.search(query=job.search_query, max_results=args.results)))
+            time.sleep(1 / args.rate)
+        except Exception:
+            time.sleep(2 / args.rate)
+    return tips
+
+def make_scraper(client, name, args):
+    return scraper.Scraper(
+        client, name, rate=args.rate, burst=args.burst, concurrency=args.concurrency,
+        retry=scraper.RetryPolicy(base_delay=1 / args.rate), max_results=args.results,
+    )
+
+async def run_interrupted(client, jobs, args):
+    engine = make_scraper(client, "resume", args)
+    task = asyncio.create_task(engine.run(jobs))
+    while len(engine.checkpoint.done) < len(jobs) // 2:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    # A fresh process would reload the checkpoint from disk
+    return await make_scraper(client, "resume", args).run(jobs)
+
+def main(args):
+    os.chdir(tempfile.mkdtemp())
+    jobs = reddit_jobs() * args.repeat
+    jobs = [scraper.ScrapeJob(job.source, f"{job.query} {i}", job.search_query) for i, job in enumerate(jobs)]
+
+    rows = []
+    for name in ("sequential", "engine", "resume"):
+        client = FakeSearchClient(latency=args.latency, failure_rate=args.failure_rate, results=args.results)
+        start = time.perf_counter()
+        if name == "sequential":
+            tips = run_sequential(client, jobs, args)
+        elif name == "engine":
+            tips = asyncio.run(make_scraper(client, name, args).run(jobs))
+        else:
+            tips = asyncio.run(run_interrupted(client, jobs, args))
+        rows.append((name, time.perf_counter() - start, client.calls, len(tips)))
+
+    print(f"{len(jobs)} searches, {args.latency * 1000:.0f}ms each, {args.failure_rate:.0%} failing, "
+          f"{args.rate:.1f} searches/s allowed")
+    print(f"{'mode':>10} {'seconds':>8} {'calls':>6} {'tips':>6}")
+    for name, seconds, calls, tips in rows:
+        print(f"{name:>10} {seconds:>8.2f} {calls:>6} {tips:>6}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stub search")
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--rate", type=float, default=4.0, help="searches per second allowed")
+    parser.add_argument("--burst", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--results", type=int, default=5, help="results per search")
+    parser.add_argument("--repeat", type=int, default=3, help="times the Reddit job list is repeated")
+    main(parser.parse_args())
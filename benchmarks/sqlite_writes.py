@@ -0,0 +1,110 @@
+"""Concurrent chat-write benchmark: SQLite profile and commits per exchange.
+
+Each worker thread plays back chat exchanges against a scratch database,
+either with the old write pattern (a commit for the conversation, the user
+message, and the assistant message plus timestamp) or the batched one used by
+/submit now (two commits). Reports exchanges/second and p99 exchange latency
+over the exchanges that completed; "errors" counts the ones SQLite turned
+away (database is locked). Any other error stops the run.
+
+    python -m benchmarks.sqlite_writes --threads 8 --exchanges 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base, create_db_engine
+from app.main import start_exchange, finish_exchange
+from benchmarks.fakes import percentile
+
+REPLY = "Your pacing slows in the middle section. " * 10
+
+def legacy_exchange(db, text, conversation_id):
+    conversation = None
+    if conversation_id:
+        conversation = db.query(models.Conversation).filter(models.Conversation.id == conversation_id).first()
+    if not conversation:
+        conversation = models.Conversation(title=text[:30] + "...")
+        db.add(conversation)
+        db.commit()
+        db.refresh(conversation)
+    db.add(models.Message(conversation_id=conversation.id, role="user", content=text))
+    db.commit()
+    db.query(models.Message).filter(models.Message.conversation_id == conversation.id).order_by(models.Message.created_at).all()
+    db.add(models.Message(conversation_id=conversation.id, role="assistant", content=REPLY))
+    conversation.updated_at = datetime.utcnow()
+    db.commit()
+    return conversation.id
+
+def batched_exchange(db, text, conversation_id):
+    conversation_id, _, _ = start_exchange(db, text, conversation_id, 11)
+    finish_exchange(db, conversation_id, REPLY)
+    return conversation_id
+
+def run(profile, exchange, threads, exchanges):
+    path = os.path.join(tempfile.mkdtemp(), "writes.db")
+    engine = create_db_engine(f"sqlite:///{path}", profile)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    latencies = []
+    errors = []
+    # Errors that are not lock contention: the benchmark itself is broken
+    failures = []
+
+    def worker(n):
+        conversation_id = None
+        db = Session()
+        try:
+            for i in range(exchanges):
+                start = time.perf_counter()
+                try:
+                    # A new conversation every 5 exchanges, as in real use
+                    if i % 5 == 0:
+                        conversation_id = None
+                    conversation_id = exchange(db, f"Draft {n}-{i}: " + "words " * 80, conversation_id)
+                except OperationalError as e:
+                    db.rollback()
+                    errors.append(e)
+                    continue
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            failures.append(e)
+        finally:
+            db.close()
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    if failures:
+        raise failures[0]
+    return len(latencies) / elapsed, percentile(latencies, 50), percentile(latencies, 99), len(errors)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--exchanges", type=int, default=100, help="exchanges per thread")
+    args = parser.parse_args()
+
+    print(f"{'profile':>12} {'writes':>8} {'exch/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for profile, name, exchange in [
+        ("default", "legacy", legacy_exchange),
+        ("default", "batched", batched_exchange),
+        ("performance", "legacy", legacy_exchange),
+        ("performance", "batched", batched_exchange),
+    ]:
+        rate, p50, p99, errors = run(profile, exchange, args.threads, args.exchanges)
+        print(f"{profile:>12} {name:>8} {rate:>8.1f} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {errors:>7}")
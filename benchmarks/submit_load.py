@@ -0,0 +1,64 @@
+"""Load benchmark for /submit: requests/second and latency at increasing concurrency.
+
+Runs the FastAPI app in-process against a scratch SQLite database, with the
+LLM and retriever replaced by fakes of fixed latency, so the numbers reflect
+how well the request path overlaps work rather than model speed.
+
+    python -m benchmarks.submit_load --requests 64 --concurrency 1 4 16 32
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("FORGE_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+
+from app import main
+from app.scheduler import LLMScheduler
+from benchmarks.fakes import FakeChatModel, FakeRetriever, percentile
+
+SUBMISSION = " ".join(["The rain kept falling on the quiet town."] * 8)
+
+async def run_level(client, concurrency, total):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/submit", json={"text": SUBMISSION})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, percentile(latencies, 50), percentile(latencies, 99)
+
+async def run(args):
+    # The in-process transport does not run the lifespan, so install the agents directly
+    main.coach = main.AgentCCoach(FakeChatModel(latency=args.llm_latency, tokens=1))
+    main.librarian = main.AgentBLibrarian(FakeRetriever(latency=args.retriever_latency))
+    # Measure the request path, not admission control (see benchmarks/overload.py)
+    main.llm_scheduler = LLMScheduler(concurrency=max(args.concurrency), max_depth=args.requests)
+    if args.no_cache:
+        # Every request pays for retrieval, as a non-fixed query would
+        main.librarian.cache.get = lambda query: None
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for concurrency in args.concurrency:
+            rps, p50, p99 = await run_level(client, concurrency, args.requests)
+            print(f"{concurrency:>11} {rps:>8.1f} {p50 * 1000:>8.1f} {p99 * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--retriever-latency", type=float, default=0.05)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the retrieval cache")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""Retriever backend benchmark: Chroma against the memory-mapped numpy index.
+
+Indexes the guides (FORGE_GUIDES_PATH, data/guides.json by default) into a scratch Chroma collection and a numpy index
+using deterministic fake embeddings (so Ollama is not needed and embedding
+time is excluded), then compares search latency per query, batched search
+latency, recall@k against exact search, and resident memory added by
+loading each backend.
+
+    python -m benchmarks.vector_backends --dim 1024 --queries 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.guides import GUIDES_PATH, iter_guides
+from app.ingest import guide_to_document
+from app.vector_index import VectorIndex, normalize, write_index
+from benchmarks.fakes import percentile
+
+def rss_bytes():
+    # Linux only; other platforms report 0
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dim", type=int, default=1024, help="embedding size (mxbai-embed-large: 1024)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=3, help="queries per batched search")
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import Chroma
+
+    documents = [guide_to_document(item) for item in iter_guides(GUIDES_PATH)]
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+    texts = [doc.page_content for doc in documents]
+    # Unit vectors, like Ollama's embeddings: L2 and cosine ranking agree
+    vectors = normalize(embeddings.embed_documents(texts)).tolist()
+    # Queries near real documents, as retrieval queries are
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = normalize([np.asarray(vectors[i]) + rng.normal(0, 1 / np.sqrt(args.dim), args.dim) for i in picks]).tolist()
+    exact = np.argsort(-(np.asarray(queries) @ np.asarray(vectors).T), axis=1)[:, :args.k]
+
+    workdir = tempfile.mkdtemp()
+
+    before = rss_bytes()
+    chroma = Chroma(persist_directory=os.path.join(workdir, "chroma"), embedding_function=embeddings)
+    chroma._collection.upsert(ids=[str(i) for i in range(len(texts))], embeddings=vectors, documents=texts)
+    chroma = Chroma(persist_directory=os.path.join(workdir, "chroma"), embedding_function=embeddings)
+    chroma.similarity_search_by_vector(queries[0], k=args.k)
+    chroma_rss = rss_bytes() - before
+
+    index_path = os.path.join(workdir, "index.npy")
+    docs_path = os.path.join(workdir, "index.json")
+    write_index(vectors, texts, [{} for _ in texts], index_path, docs_path)
+    before = rss_bytes()
+    index = VectorIndex(index_path, docs_path)
+    index.search(queries[0], args.k)
+    numpy_rss = rss_bytes() - before
+
+    content_to_id = {text: i for i, text in enumerate(texts)}
+
+    def recall(found):
+        hits = sum(len(set(row) & set(truth)) for row, truth in zip(found, exact))
+        return hits / (len(exact) * args.k)
+
+    chroma_found = [[content_to_id[d.page_content] for d in chroma.similarity_search_by_vector(q, k=args.k)]
+                    for q in queries]
+    numpy_found = [[i for i, _ in hits] for hits in index.search(queries, args.k)]
+
+    batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+    chroma_single = timed(lambda: chroma.similarity_search_by_vector(queries[0], k=args.k), args.queries)
+    numpy_single = timed(lambda: index.search(queries[0], args.k), args.queries)
+    chroma_batch = timed(lambda: chroma._collection.query(query_embeddings=batches[0], n_results=args.k), len(batches))
+    numpy_batch = timed(lambda: index.search(batches[0], args.k), len(batches))
+
+    print(f"{len(texts)} documents, dim {args.dim}, k={args.k}")
+    print(f"{'backend':>8} {'p50 ms':>8} {'p99 ms':>8} {f'batch of {args.batch} ms':>15} {'recall':>7} {'RSS MiB':>8}")
+    for name, single, batch, found, rss in [
+        ("chroma", chroma_single, chroma_batch, chroma_found, chroma_rss),
+        ("numpy", numpy_single, numpy_batch, numpy_found, numpy_rss),
+    ]:
+        print(f"{name:>8} {percentile(single, 50) * 1000:>8.3f} {percentile(single, 99) * 1000:>8.3f} "
+              f"{percentile(batch, 50) * 1000:>15.3f} {recall(found):>7.3f} {rss / 2**20:>8.1f}")
@@ -6,7 +6,7 @@ import { useState, useRef, useEffect } from "react"
 import { Send, AlertCircle, Leaf } from "lucide-react"
 import CritiqueResult from "@/components/critique-result"
 import MarkdownRenderer from "@/components/markdown-renderer"
-import { submitMessage, getChat } from "@/lib/api"
+import { submitMessage, getChatMessages, type StoredMessage } from "@/lib/api"
 
 interface Message {
   id: string
@@ -36,6 +36,11 @@ export default function ChatInterface({ conversationId, onConversationCreated }:
   const [isLoading, setIsLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [activeConversationId, setActiveConversationId] = useState<number | null>(conversationId)
+  // Cursor for the page of older messages; null once the whole conversation is loaded
+  const [olderBeforeId, setOlderBeforeId] = useState<number | null>(null)
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false)
+  // Set while older messages are prepended, so the view stays where the reader is
+  const skipScrollRef = useRef(false)
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const textareaRef = useRef<HTMLTextAreaElement>(null)
 
@@ -44,6 +49,10 @@ export default function ChatInterface({ conversationId, onConversationCreated }:
   }
 
   useEffect(() => {
+    if (skipScrollRef.current) {
+      skipScrollRef.current = false
+      return
+    }
     scrollToBottom()
   }, [messages])
 
@@ -54,25 +63,25 @@ export default function ChatInterface({ conversationId, onConversationCreated }:
       loadChatHistory(conversationId)
     } else {
       setMessages([])
+      setOlderBeforeId(null)
     }
   }, [conversationId])
 
+  const toMessage = (msg: StoredMessage): Message => ({
+    id: msg.id.toString(),
+    type: msg.role === "assistant" ? "coach" : "user",
+    // Backend stores string content; history is displayed as text/markdown
+    content: msg.content,
+    timestamp: new Date(msg.created_at),
+  })
+
   const loadChatHistory = async (id: number) => {
     try {
       setIsLoading(true)
-      const chat = await getChat(id)
-      if (chat.messages) {
-        const formattedMessages: Message[] = chat.messages.map((msg: any) => ({
-            id: msg.id.toString(),
-            type: msg.role === "assistant" ? "coach" : "user",
-            content: msg.content, // Note: Backend currently stores string content. If it was a critique, it's stored as string.
-            // Ideally we should store structured data or parse it.
-            // For now, let's assume it's text. If we want to restore critique UI for history, we'd need to store that metadata.
-            // Given the constraints, we'll display history as text/markdown.
-            timestamp: new Date(msg.created_at)
-        }))
-        setMessages(formattedMessages)
-      }
+      // Only the newest page; older messages load on demand
+      const page = await getChatMessages(id)
+      setMessages(page.items.map(toMessage))
+      setOlderBeforeId(page.next_before_id)
     } catch (error) {
       console.error("Failed to load chat", error)
       setError("Failed to load chat history")
@@ -81,6 +90,22 @@ export default function ChatInterface({ conversationId, onConversationCreated }:
     }
   }
 
+  const loadOlderMessages = async () => {
+    if (!activeConversationId || !olderBeforeId) return
+    try {
+      setIsLoadingOlder(true)
+      const page = await getChatMessages(activeConversationId, olderBeforeId)
+      skipScrollRef.current = true
+      setMessages((prev) => [...page.items.map(toMessage), ...prev])
+      setOlderBeforeId(page.next_before_id)
+    } catch (error) {
+      console.error("Failed to load older messages", error)
+      setError("Failed to load older messages")
+    } finally {
+      setIsLoadingOlder(false)
+    }
+  }
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault()
     setError(null)
@@ -98,10 +123,28 @@ export default function ChatInterface({ conversationId, onConversationCreated }:
     setMessages((prev) => [...prev, userMessage])
     setInput("")
 
-    // Call the API
+    // Call the API, showing tokens as they stream in
     setIsLoading(true)
+    const coachMessageId = (Date.now() + 1).toString()
+    const showCoachText = (content: string) => {
+      setIsLoading(false)
+      setMessages((prev) => {
+        const coachMessage: Message = { id: coachMessageId, type: "coach", content, timestamp: new Date() }
+        return prev.some((m) => m.id === coachMessageId)
+          ? prev.map((m) => (m.id === coachMessageId ? coachMessage : m))
+          : [...prev, coachMessage]
+      })
+    }
     try {
-      const result = await submitMessage(text, activeConversationId || undefined)
+      let sectionsDone = 0
+      const result = await submitMessage(text, activeConversationId || undefined, {
+        onSection: (_index, total, _critique) => {
+          sectionsDone += 1
+          showCoachText(`Reviewing your manuscript: ${sectionsDone} of ${total} sections critiqued...`)
+        },
+        onToken: (_token, responseSoFar) => showCoachText(responseSoFar),
+        onBlocked: (replacement) => showCoachText(replacement),
+      })
 
       // Update conversation ID if a new one was created
       if (result.conversation_id && result.conversation_id !== activeConversationId) {
@@ -109,36 +152,7 @@ export default function ChatInterface({ conversationId, onConversationCreated }:
         onConversationCreated?.(result.conversation_id)
       }
 
-      let coachMessage: Message
-      if (result.critique) {
-        // Critique flow
-        coachMessage = {
-          id: (Date.now() + 1).toString(),
-          type: "coach",
-          content: {
-            plan: result.plan,
-            tips: result.tips,
-            critique: result.critique,
-          },
-          timestamp: new Date(),
-        }
-      } else if (result.response) {
-        // Question/short answer flow
-        coachMessage = {
-          id: (Date.now() + 1).toString(),
-          type: "coach",
-          content: result.response,
-          timestamp: new Date(),
-        }
-      } else {
-        coachMessage = {
-          id: (Date.now() + 1).toString(),
-          type: "coach",
-          content: "No response from coach.",
-          timestamp: new Date(),
-        }
-      }
-      setMessages((prev) => [...prev, coachMessage])
+      showCoachText(result.response || "No response from coach.")
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to connect to the writing coach.")
     } finally {
@@ -178,6 +192,18 @@ export default function ChatInterface({ conversationId, onConversationCreated }:
             </div>
           ) : (
             <>
+              {olderBeforeId && (
+                <div className="mb-6 text-center">
+                  <button
+                    type="button"
+                    onClick={loadOlderMessages}
+                    disabled={isLoadingOlder}
+                    className="px-4 py-2 text-sm text-cyan-400 glass rounded-xl border border-cyan-500/30 hover:bg-cyan-500/10 disabled:opacity-50 transition-all duration-300"
+                  >
+                    {isLoadingOlder ? "Loading..." : "Load earlier messages"}
+                  </button>
+                </div>
+              )}
               {messages.map((message) => (
                 <div key={message.id} className={`mb-6 ${message.type === "user" ? "text-right" : "text-left"}`}>
                   {message.type === "user" ? (
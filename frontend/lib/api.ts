@@ -12,16 +12,70 @@ export interface Message {
   content: string
 }
 
-export async function getChats(): Promise<Chat[]> {
-  const response = await fetch(`${API_BASE_URL}/chats`)
+export interface ChatPage {
+  items: Chat[]
+  next_cursor: string | null
+}
+
+// Sidebar listing: summaries only, newest first, one keyset page at a time
+export async function getChatSummaries(cursor?: string, limit: number = 50): Promise<ChatPage> {
+  const params = new URLSearchParams({ limit: limit.toString() })
+  if (cursor) params.set("cursor", cursor)
+  const response = await fetch(`${API_BASE_URL}/chats/summary?${params}`)
   if (!response.ok) {
     throw new Error("Failed to fetch chats")
   }
   return response.json()
 }
 
-export async function getChat(id: number): Promise<Chat & { messages: Message[] }> {
-  const response = await fetch(`${API_BASE_URL}/chats/${id}`)
+export interface SearchHit {
+  kind: "message" | "conversation"
+  conversation_id: number
+  title: string | null
+  message_id: number | null
+  role: string | null
+  created_at: string | null
+  // HTML-escaped by the server, matched words wrapped in <mark>
+  snippet: string
+  score: number
+}
+
+export interface SearchPage {
+  items: SearchHit[]
+  next_offset: number | null
+}
+
+// Full-text search over messages and titles, best match first
+export async function searchChats(q: string, offset: number = 0, limit: number = 20): Promise<SearchPage> {
+  const params = new URLSearchParams({ q, offset: offset.toString(), limit: limit.toString() })
+  const response = await fetch(`${API_BASE_URL}/search?${params}`)
+  if (!response.ok) {
+    throw new Error("Failed to search chats")
+  }
+  return response.json()
+}
+
+export async function getChats(): Promise<Chat[]> {
+  const page = await getChatSummaries(undefined, 100)
+  return page.items
+}
+
+export interface StoredMessage extends Message {
+  id: number
+  created_at: string
+}
+
+export interface MessagePage {
+  // Oldest first within the page
+  items: StoredMessage[]
+  next_before_id: number | null
+}
+
+// A conversation's newest messages; pass next_before_id back as beforeId to load older ones
+export async function getChatMessages(id: number, beforeId?: number, limit: number = 50): Promise<MessagePage> {
+  const params = new URLSearchParams({ limit: limit.toString() })
+  if (beforeId) params.set("before_id", beforeId.toString())
+  const response = await fetch(`${API_BASE_URL}/chats/${id}/messages?${params}`)
   if (!response.ok) {
     throw new Error("Failed to fetch chat")
   }
@@ -49,14 +103,87 @@ export async function deleteChat(id: number): Promise<void> {
   }
 }
 
-export async function submitMessage(text: string, conversationId?: number) {
-  const response = await fetch(`${API_BASE_URL}/submit`, {
+export interface SubmitResult {
+  conversation_id: number
+  plan?: { input: string; classification: string; dimensions: string[] }
+  tips?: string[]
+  response: string
+}
+
+export interface SubmitHandlers {
+  onConversation?: (conversationId: number) => void
+  onPlan?: (plan: SubmitResult["plan"]) => void
+  onTips?: (tips: string[]) => void
+  onToken?: (token: string, responseSoFar: string) => void
+  onBlocked?: (replacement: string) => void
+  // Manuscript mode: one call per section critique, in completion order
+  onSection?: (index: number, total: number, critique: string) => void
+}
+
+// Streams /submit/stream (newline-delimited JSON) and resolves with the full result
+export async function submitMessage(
+  text: string,
+  conversationId?: number,
+  handlers: SubmitHandlers = {},
+): Promise<SubmitResult> {
+  const response = await fetch(`${API_BASE_URL}/submit/stream`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ text, conversation_id: conversationId }),
   })
-  if (!response.ok) {
-    throw new Error("Failed to submit message")
+  if (!response.ok || !response.body) {
+    // 429/503 from the scheduler carry a message worth showing
+    const detail = await response.json().catch(() => null)
+    throw new Error(detail?.error ?? "Failed to submit message")
   }
-  return response.json()
+
+  const result: SubmitResult = { conversation_id: conversationId ?? 0, response: "" }
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ""
+
+  const handleEvent = (event: any) => {
+    switch (event.type) {
+      case "conversation":
+        result.conversation_id = event.conversation_id
+        handlers.onConversation?.(event.conversation_id)
+        break
+      case "plan":
+        result.plan = event.plan
+        handlers.onPlan?.(event.plan)
+        break
+      case "tips":
+        result.tips = event.tips
+        handlers.onTips?.(event.tips)
+        break
+      case "token":
+        result.response += event.content
+        handlers.onToken?.(event.content, result.response)
+        break
+      case "section":
+        handlers.onSection?.(event.index, event.total, event.content)
+        break
+      case "blocked":
+        result.response = event.content
+        handlers.onBlocked?.(event.content)
+        break
+      case "done":
+        result.response = event.response
+        break
+    }
+  }
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split("\n")
+    buffer = lines.pop() ?? ""
+    for (const line of lines) {
+      if (line.trim()) handleEvent(JSON.parse(line))
+    }
+  }
+  if (buffer.trim()) handleEvent(JSON.parse(buffer))
+
+  return result
 }